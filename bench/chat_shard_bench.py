@@ -0,0 +1,129 @@
+# chat_shard_bench.py
+"""
+채팅 DB 분리/샤딩 구성별 쓰기 처리량 비교 벤치마크입니다.
+
+    python bench/chat_shard_bench.py                       # main, 1, 2, 4, 8 샤드
+    python bench/chat_shard_bench.py --shards 1,4 --writers 16 --duration 10
+
+구성마다 임시 디렉터리에 새 SQLite 파일을 만들고, writer 프로세스 --writers개가
+--duration초 동안 repository.create_chat_message를 반복 호출합니다.
+(엔진은 import 시점의 CHAT_DATABASE_URL/CHAT_SHARDS로 만들어지므로 구성마다 프로세스를 새로 실행)
+  - main : 이전 방식 (채팅을 market.db에 저장)
+  - N    : CHAT_DATABASE_URL=sqlite:///chat-{shard}.db, CHAT_SHARDS=N
+메시지의 약 10%는 전역 채팅, 나머지는 --users명 사이의 1:1 채팅입니다.
+같은 시간 동안 core writer 프로세스 하나가 market.db에 로그인 실패 횟수 갱신(update_failed_attempts)을
+반복해, 채팅 쓰기가 지갑/로그인 쓰기와 쓰기 잠금을 다투는지도 함께 보여 줍니다.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+
+def scenario_env(name, work_dir):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'market.db')}")
+    env.pop('CHAT_DATABASE_URL', None)
+    env.pop('CHAT_SHARDS', None)
+    if name != 'main':
+        env['CHAT_DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'chat-{shard}.db')}"
+        env['CHAT_SHARDS'] = name
+    return env
+
+def load_repository():
+    sys.path.insert(0, SRC_DIR)
+    import repository
+    return repository
+
+def chat_writer(index, user_ids, duration, seed, start, results):
+    repository = load_repository()
+    rng = random.Random(seed + index)
+    count = 0
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        sender_id = rng.choice(user_ids)
+        recipient_id = 'global' if rng.random() < 0.1 else rng.choice(user_ids)
+        repository.create_chat_message(sender_id, recipient_id, 'bench')
+        count += 1
+    results.put(('chat', count))
+
+def core_writer(user_ids, duration, start, results):
+    repository = load_repository()
+    count = 0
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        repository.update_failed_attempts(user_ids[0], count % 5)
+        count += 1
+    results.put(('core', count))
+
+def run_worker(args):
+    """자식 프로세스: 현재 환경 변수의 구성으로 쓰기 처리량을 측정해 JSON으로 출력합니다."""
+    repository = load_repository()
+    repository.init_db()
+    user_ids = [repository.create_user(f"bench{i}", 'x') for i in range(args.users)]
+    repository.engine.dispose()
+
+    # 한 프로세스의 스레드는 GIL 때문에 ORM 처리 시간에 묶이므로 writer마다 프로세스를 사용
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    # 모든 프로세스가 repository를 불러온 뒤 동시에 측정을 시작
+    start = context.Barrier(args.writers + 1)
+    processes = [context.Process(target=chat_writer, args=(index, user_ids, args.duration, args.seed, start, results))
+                 for index in range(args.writers)]
+    processes.append(context.Process(target=core_writer, args=(user_ids, args.duration, start, results)))
+    for process in processes:
+        process.start()
+    totals = {'chat': 0, 'core': 0}
+    for _ in processes:
+        kind, count = results.get()
+        totals[kind] += count
+    for process in processes:
+        process.join()
+    print(json.dumps({
+        'chat_writes_per_s': totals['chat'] / args.duration,
+        'core_writes_per_s': totals['core'] / args.duration,
+        'chats': repository.get_dashboard_stats()['totals']['chats'],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='채팅 DB 샤드 수별 쓰기 처리량 비교')
+    parser.add_argument('--shards', default='main,1,2,4,8', help='실행할 구성 (쉼표 구분, main은 market.db에 저장)')
+    parser.add_argument('--writers', type=int, default=8, help='채팅 writer 프로세스 수')
+    parser.add_argument('--duration', type=float, default=5.0, help='구성별 측정 시간(초)')
+    parser.add_argument('--users', type=int, default=200, help='대화에 참여하는 사용자 수')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"== {args.writers} chat writer processes + 1 core writer, {args.duration:g}s per scenario")
+    print(f"  {'scenario':<10}{'chat writes/s':>16}{'core writes/s':>16}")
+    baseline = None
+    for name in args.shards.split(','):
+        work_dir = tempfile.mkdtemp(prefix=f"chat-shard-bench-{name}-")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', '--writers', str(args.writers),
+             '--duration', str(args.duration), '--users', str(args.users), '--seed', str(args.seed)],
+            env=scenario_env(name, work_dir), cwd=work_dir, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result['chat_writes_per_s']
+        print(f"  {name:<10}{result['chat_writes_per_s']:>16,.0f}{result['core_writes_per_s']:>16,.0f}"
+              f"   x{result['chat_writes_per_s'] / baseline:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# id_bench.py
+"""
+기본 키 형식별 삽입/조회 성능 비교 벤치마크입니다.
+
+    python bench/id_bench.py                    # chat 테이블에 1,000,000행
+    python bench/id_bench.py --rows 200000      # 빠르게 확인
+
+임시 디렉터리에 방식마다 별도 SQLite 파일을 만들고 chat 테이블(운영과 같은 스키마와 인덱스)에 행을 채웁니다.
+  - uuid4+ix_id : 이전 방식 (무작위 uuid4 + 기본 키와 중복되는 ix_chat_id 인덱스)
+  - uuid4       : 무작위 uuid4, 중복 인덱스 없음
+  - uuid7       : utils.new_id()의 시간순 UUIDv7, 중복 인덱스 없음
+삽입 처리량(전체/마지막 10%), id 단건 조회 지연 시간(중앙값), 파일 크기를 출력합니다.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+# repository를 불러오면 market.db 엔진이 만들어지므로 임시 디렉터리에서 실행합니다.
+WORK_DIR = tempfile.mkdtemp(prefix='id-bench-')
+os.chdir(WORK_DIR)
+os.environ['DATABASE_URL'] = 'sqlite:///market.db'
+sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import create_engine, insert, select, Index
+import repository
+from utils import new_id
+
+SCENARIOS = {
+    'uuid4+ix_id': (lambda: str(uuid.uuid4()), True),
+    'uuid4': (lambda: str(uuid.uuid4()), False),
+    'uuid7': (new_id, False),
+}
+
+
+def make_engine(name):
+    engine = create_engine(f"sqlite:///{os.path.join(WORK_DIR, name + '.db')}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+    return engine
+
+def run_scenario(name, rows, batch_size, lookups):
+    make_id, legacy_index = SCENARIOS[name]
+    engine = make_engine(name)
+    table = repository.Chat.__table__
+    table.create(bind=engine)
+    if legacy_index:
+        Index('ix_chat_id', table.c.id).create(bind=engine)
+
+    now = datetime.utcnow()
+    sampled_ids = []
+    tail_start = rows - rows // 10
+    tail_rows, tail_elapsed = 0, 0.0
+    started = time.perf_counter()
+    for start in range(0, rows, batch_size):
+        batch = [{'id': make_id(), 'sender_id': 'bench', 'recipient_id': 'global',
+                  'message': 'bench', 'timestamp': now} for _ in range(min(batch_size, rows - start))]
+        sampled_ids.append(batch[0]['id'])
+        batch_started = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(table), batch)
+        if start >= tail_start:
+            tail_rows += len(batch)
+            tail_elapsed += time.perf_counter() - batch_started
+    elapsed = time.perf_counter() - started
+
+    samples = []
+    with engine.connect() as conn:
+        for _ in range(lookups):
+            chat_id = random.choice(sampled_ids)
+            lookup_started = time.perf_counter()
+            conn.execute(select(table.c.message).where(table.c.id == chat_id)).first()
+            samples.append((time.perf_counter() - lookup_started) * 1e6)
+    engine.dispose()
+
+    size = sum(os.path.getsize(os.path.join(WORK_DIR, name + suffix))
+               for suffix in ('.db', '.db-wal') if os.path.exists(os.path.join(WORK_DIR, name + suffix)))
+    return {
+        'insert_rows_per_s': rows / elapsed,
+        'tail_rows_per_s': tail_rows / tail_elapsed if tail_elapsed else 0.0,
+        'lookup_us': statistics.median(samples) if samples else 0.0,
+        'size_mb': size / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='기본 키 형식별 삽입/조회 성능 비교')
+    parser.add_argument('--rows', type=lambda value: int(float(value)), default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=100, help='트랜잭션당 삽입 행 수')
+    parser.add_argument('--lookups', type=int, default=5000, help='id 단건 조회 횟수')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='실행할 방식 (쉼표 구분)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"== chat, {args.rows:,} rows, {args.batch_size} rows/transaction ({WORK_DIR})")
+    print(f"  {'scenario':<14}{'insert/s':>12}{'tail insert/s':>16}{'lookup us':>12}{'size MB':>10}")
+    for name in args.scenarios.split(','):
+        result = run_scenario(name, args.rows, args.batch_size, args.lookups)
+        print(f"  {name:<14}{result['insert_rows_per_s']:>12,.0f}{result['tail_rows_per_s']:>16,.0f}"
+              f"{result['lookup_us']:>12.1f}{result['size_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
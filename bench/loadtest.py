@@ -0,0 +1,382 @@
+# loadtest.py
+"""
+HTTP + Socket.IO 부하 테스트 도구입니다.
+
+    python bench/seed.py --reset
+    python bench/loadtest.py --users 20 --duration 30 --save
+    python bench/loadtest.py --users 20 --duration 30 --baseline bench/results/<이전 결과>.json
+    python bench/loadtest.py --mode asgi --baseline bench/results/<eventlet 결과>.json   # 서버 방식 비교
+    DATABASE_URL=postgresql+psycopg2://... python bench/loadtest.py --baseline <SQLite 결과>  # DB 비교
+
+기본적으로 deploy.sh와 같은 방식(gunicorn + eventlet 워커 1개, --mode asgi면 uvicorn)으로 앱을 로컬에서 실행한 뒤,
+가상 사용자마다 로그인 -> 대시보드/상품 검색/상품 조회/지갑/송금/전역 채팅/1:1 채팅을
+가중치에 따라 무작위로 반복합니다. --url을 지정하면 이미 실행 중인 서버를 대상으로 합니다.
+라우트/이벤트별 처리량과 p50/p95/p99 지연 시간을 출력하고 JSON으로 저장해 기준 결과와 비교할 수 있습니다.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+# 인자로 받은 상대 경로는 실행 위치 기준으로 해석합니다.
+INVOKED_FROM = os.getcwd()
+
+os.chdir(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# 앱과 같은 DB를 사용하도록 src/.env의 DATABASE_URL도 읽어 옵니다.
+from dotenv import load_dotenv
+load_dotenv(os.path.join(SRC_DIR, '.env'))
+
+import requests
+from sqlalchemy import select
+import repository
+from seed import SEED_USERNAME_PREFIX, SEED_PASSWORD, WORDS
+
+try:
+    import socketio
+except ImportError:  # python-socketio 클라이언트가 없으면 채팅 시나리오는 건너뜀
+    socketio = None
+
+# 시나리오별 기본 가중치
+DEFAULT_MIX = {
+    'login': 2,
+    'dashboard': 25,
+    'search': 20,
+    'view_product': 15,
+    'wallet': 10,
+    'transfer': 5,
+    'global_chat': 15,
+    'private_chat': 8,
+}
+CHAT_SCENARIOS = ('global_chat', 'private_chat')
+SOCKET_TIMEOUT = 5.0
+
+CSRF_PATTERN = re.compile(r'name="csrf_token" value="([^"]+)"')
+USER_ID_PATTERN = re.compile(r'data-user-id="([^"]+)"')
+
+
+class Stats:
+    """라우트/이벤트별 지연 시간과 오류 수를 스레드 안전하게 수집합니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok=True):
+        with self.lock:
+            if ok:
+                self.latencies[name].append(seconds)
+            else:
+                self.errors[name] += 1
+
+    def timed(self, name, func):
+        started = time.perf_counter()
+        try:
+            ok = func()
+        except Exception:
+            ok = False
+        self.record(name, time.perf_counter() - started, ok is not False)
+
+    def summary(self, duration):
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies[name])
+            result[name] = {
+                'count': len(samples),
+                'errors': self.errors[name],
+                'throughput': len(samples) / duration if duration else 0.0,
+                'mean_ms': (sum(samples) / len(samples) * 1000) if samples else None,
+                'p50_ms': percentile(samples, 50),
+                'p95_ms': percentile(samples, 95),
+                'p99_ms': percentile(samples, 99),
+            }
+        return result
+
+
+def percentile(sorted_samples, pct):
+    """nearest-rank 방식의 백분위 값(ms)을 반환합니다."""
+    if not sorted_samples:
+        return None
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[rank] * 1000
+
+
+class VirtualUser(threading.Thread):
+    """한 명의 사용자 세션(HTTP 쿠키 + Socket.IO 연결)을 흉내 냅니다."""
+
+    def __init__(self, base_url, username, targets, mix, stats, deadline):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.username = username
+        self.targets = targets
+        self.scenarios = list(mix)
+        self.weights = [mix[name] for name in self.scenarios]
+        self.stats = stats
+        self.deadline = deadline
+        self.http = requests.Session()
+        self.csrf_token = None
+        self.user_id = None
+        self.sio = None
+        self.pending = {}
+
+    # --------------------- HTTP ---------------------
+
+    def url(self, path):
+        return self.base_url + path
+
+    def get(self, path, **kwargs):
+        response = self.http.get(self.url(path), allow_redirects=False, timeout=30, **kwargs)
+        return response.status_code == 200
+
+    def login(self):
+        page = self.http.get(self.url('/login'), timeout=30)
+        match = CSRF_PATTERN.search(page.text)
+        self.csrf_token = match.group(1) if match else ''
+        response = self.http.post(self.url('/login'), data={
+            'csrf_token': self.csrf_token, 'username': self.username, 'password': SEED_PASSWORD
+        }, allow_redirects=False, timeout=30)
+        return response.status_code == 302 and 'jwt' in self.http.cookies
+
+    def dashboard(self):
+        response = self.http.get(self.url('/dashboard'), allow_redirects=False, timeout=30)
+        match = USER_ID_PATTERN.search(response.text)
+        if match:
+            self.user_id = match.group(1)
+        return response.status_code == 200
+
+    def search(self):
+        return self.get('/product/search', params={'q': random.choice(WORDS)})
+
+    def view_product(self):
+        return self.get(f"/product/{random.choice(self.targets['product_ids'])}")
+
+    def wallet(self):
+        return self.get('/wallet')
+
+    def transfer(self):
+        recipient_id = random.choice(self.targets['user_ids'])
+        response = self.http.post(self.url(f"/user/{recipient_id}/transfer"), data={
+            'csrf_token': self.csrf_token, 'amount': '10'
+        }, allow_redirects=False, timeout=30)
+        return response.status_code == 302
+
+    # --------------------- Socket.IO ---------------------
+
+    def connect_socket(self):
+        self.sio = socketio.Client(reconnection=False)
+
+        def on_message(data):
+            # 자신이 보낸 메시지가 돌아오는 시점까지를 지연 시간으로 측정
+            token = data.get('message', '') if isinstance(data, dict) else ''
+            event = self.pending.pop(token, None)
+            if event:
+                event.set()
+
+        def on_messages(batch):
+            # 서버가 묶어서 보낸 전역 채팅 메시지 (CHAT_BROADCAST_WINDOW_MS)
+            for data in batch:
+                on_message(data)
+
+        self.sio.on('message', on_message)
+        self.sio.on('messages', on_messages)
+        self.sio.on('private_message', on_message)
+        cookie = f"jwt={self.http.cookies.get('jwt')}"
+        self.sio.connect(self.base_url, headers={'Cookie': cookie}, transports=['websocket'])
+        self.sio.emit('join', {'user_id': self.user_id})
+
+    def chat(self, event_name, payload):
+        token = f"lt-{self.username}-{random.getrandbits(48):x}"
+        done = threading.Event()
+        self.pending[token] = done
+        payload['message'] = token
+        self.sio.emit(event_name, payload)
+        received = done.wait(SOCKET_TIMEOUT)
+        self.pending.pop(token, None)
+        return received
+
+    def global_chat(self):
+        return self.chat('send_message', {'sender_id': self.user_id})
+
+    def private_chat(self):
+        return self.chat('private_message', {
+            'sender_id': self.user_id, 'recipient_id': random.choice(self.targets['user_ids'])
+        })
+
+    # --------------------- 실행 ---------------------
+
+    def run(self):
+        self.stats.timed('login', self.login)
+        self.stats.timed('dashboard', self.dashboard)
+        if socketio is not None and self.user_id:
+            try:
+                self.connect_socket()
+            except Exception:
+                self.stats.record('socket_connect', 0, ok=False)
+                self.sio = None
+        while time.time() < self.deadline:
+            name = random.choices(self.scenarios, weights=self.weights)[0]
+            if name in CHAT_SCENARIOS and self.sio is None:
+                continue
+            self.stats.timed(name, getattr(self, name))
+        if self.sio is not None:
+            self.sio.disconnect()
+
+
+def load_targets(limit=1000):
+    """시드된 사용자/상품 ID를 DB에서 읽어 옵니다."""
+    with repository.engine.connect() as conn:
+        users = conn.execute(
+            select(repository.User.id, repository.User.username)
+            .where(repository.User.username.like(f"{SEED_USERNAME_PREFIX}%")).limit(limit)
+        ).all()
+        product_ids = conn.execute(select(repository.Product.id).limit(limit)).scalars().all()
+    if not users or not product_ids:
+        raise SystemExit("시드 데이터가 없습니다. 먼저 bench/seed.py를 실행하세요.")
+    return {
+        'usernames': [row.username for row in users],
+        'user_ids': [row.id for row in users],
+        'product_ids': list(product_ids),
+    }
+
+# deploy.sh의 SERVER_MODE별 실행 명령
+SERVER_COMMANDS = {
+    'eventlet': lambda port: ['gunicorn', '-b', f'127.0.0.1:{port}', '--worker-class', 'eventlet', '-w', '1', 'app:app'],
+    'asgi': lambda port: ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+}
+
+def start_server(port, mode='eventlet', extra_env=None):
+    """deploy.sh와 같은 설정(mode에 따라 gunicorn + eventlet 워커 1개 또는 uvicorn)으로 앱을 실행합니다."""
+    env = dict(os.environ)
+    env.setdefault('ADMIN_JWT_SECRET_KEY', 'loadtest-admin-secret-key-0123456789')
+    env.setdefault('CLIENT_JWT_SECRET_KEY', 'loadtest-client-secret-key-0123456789')
+    env.setdefault('SECRET_KEY', 'loadtest-secret-key-0123456789')
+    env['RATELIMIT_ENABLED'] = 'false'
+    env['SERVER_MODE'] = mode
+    env.update(extra_env or {})
+    command = SERVER_COMMANDS[mode](port)
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("서버를 시작하지 못했습니다.")
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        for item in text.split(','):
+            name, weight = item.split('=')
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"알 수 없는 시나리오: {name}")
+            mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def print_summary(summary, baseline=None):
+    header = f"{'name':<14}{'count':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δp95':>9}{'Δreq/s':>9}"
+    print(header)
+    for name, row in summary.items():
+        line = f"{name:<14}{row['count']:>8}{row['errors']:>6}{row['throughput']:>9.1f}"
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            line += f"{row[key]:>9.1f}" if row[key] is not None else f"{'-':>9}"
+        base = (baseline or {}).get(name)
+        if base:
+            line += f"{delta(row['p95_ms'], base['p95_ms']):>9}{delta(row['throughput'], base['throughput']):>9}"
+        print(line)
+
+def delta(current, previous):
+    if not current or not previous:
+        return '-'
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP + Socket.IO 부하 테스트')
+    parser.add_argument('--url', help='이미 실행 중인 서버 주소 (지정하지 않으면 로컬에서 서버를 시작)')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--mode', choices=SERVER_COMMANDS, default='eventlet',
+                        help='로컬에서 시작할 서버 방식 (deploy.sh의 SERVER_MODE)')
+    parser.add_argument('--users', type=int, default=20, help='동시 가상 사용자 수')
+    parser.add_argument('--duration', type=float, default=30.0, help='측정 시간(초)')
+    parser.add_argument('--mix', help='시나리오 가중치 (예: search=40,global_chat=0)')
+    parser.add_argument('--label', default='default', help='결과 파일에 기록할 실행 이름')
+    parser.add_argument('--save', action='store_true', help='결과를 bench/results에 JSON으로 저장')
+    parser.add_argument('--baseline', help='비교할 기준 결과 JSON 파일')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    targets = load_targets()
+    if socketio is None:
+        print("python-socketio 클라이언트가 없어 채팅 시나리오를 건너뜁니다.")
+
+    print(f"database: {repository.engine.url.render_as_string(hide_password=True)}")
+    process = None
+    base_url = args.url
+    if not base_url:
+        process = start_server(args.port, args.mode)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    stats = Stats()
+    try:
+        started = time.time()
+        deadline = started + args.duration
+        workers = [
+            VirtualUser(base_url, targets['usernames'][i % len(targets['usernames'])], targets, mix, stats, deadline)
+            for i in range(args.users)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    summary = stats.summary(elapsed)
+    baseline = None
+    if args.baseline:
+        with open(os.path.join(INVOKED_FROM, args.baseline)) as f:
+            baseline = json.load(f)['routes']
+    print_summary(summary, baseline)
+
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        filename = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{args.label}.json"
+        path = os.path.join(RESULTS_DIR, filename)
+        with open(path, 'w') as f:
+            json.dump({
+                'label': args.label,
+                'created_at': datetime.utcnow().isoformat(),
+                'config': {'users': args.users, 'duration': args.duration, 'mix': mix, 'url': base_url,
+                           'mode': args.mode, 'database': repository.engine.dialect.name},
+                'routes': summary,
+            }, f, indent=2)
+        print(f"saved {path}")
+
+
+if __name__ == '__main__':
+    main()
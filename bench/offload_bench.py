@@ -0,0 +1,140 @@
+# offload_bench.py
+"""
+eventlet 서버에서 무거운 관리자 조회가 실행되는 동안의 채팅 저장 지연 시간 벤치마크입니다.
+
+    python bench/offload_bench.py                          # 상품 50,000개, 구성별 5초
+    python bench/offload_bench.py --products 200000 --duration 10
+
+앱과 같이 eventlet.monkey_patch()를 적용한 프로세스에서, 임시 디렉터리의 새 SQLite 파일에
+상품 --products개를 넣은 뒤 구성마다 --duration초 동안 측정합니다.
+  - idle        : 채팅 green thread만 실행
+  - DB_OFFLOAD=off : 다른 green thread가 get_all_products를 반복 (sqlite3 호출이 허브를 막음)
+  - DB_OFFLOAD=on  : 같은 부하에서 repository 호출을 db_offload로 tpool에 옮김
+  - export, DB_OFFLOAD=off/on : 다른 green thread가 /admin/export/chats와 같은 CSV 내보내기를 반복
+    (채팅 --products개, admin_service를 앱처럼 offload 설치 전에 불러옴)
+채팅 green thread는 --interval초마다 create_global_chat_message를 호출하고, 호출할 시각부터
+저장이 끝날 때까지의 시간(허브가 막혀 늦게 시작한 시간 포함)을 기록합니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+CHUNK_SIZE = 10000
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_worker(args):
+    """자식 프로세스: 구성별 채팅 저장 지연 시간을 측정해 JSON으로 출력합니다."""
+    import eventlet
+    eventlet.monkey_patch()
+    sys.path.insert(0, SRC_DIR)
+    from sqlalchemy import insert
+    import repository
+    import db_offload
+    from utils import new_id
+
+    repository.init_db()
+    user_id = repository.create_user('bench', 'x')
+    rows = [{'id': new_id(), 'title': f"bench product {i}", 'description': 'bench ' * 20,
+             'price': 1000 + i, 'seller_id': user_id} for i in range(args.products)]
+    for start in range(0, len(rows), CHUNK_SIZE):
+        with repository.engine.begin() as conn:
+            conn.execute(insert(repository.Product.__table__), rows[start:start + CHUNK_SIZE])
+    chats = [{'id': new_id(), 'sender_id': user_id, 'recipient_id': 'global', 'message': f"bench chat {i}"}
+             for i in range(args.products)]
+    for start in range(0, len(chats), CHUNK_SIZE):
+        repository.bulk_insert_chats(chats[start:start + CHUNK_SIZE])
+    del rows, chats
+    # app.py처럼 관리자 서비스를 먼저 불러온 뒤 offload를 설치
+    import admin_service
+    db_offload.install(repository, db_offload.public_functions(
+        repository, exclude=('init_db', 'close_db', 'close_write_queues')))
+
+    def list_products():
+        repository.get_all_products()
+
+    def export_chats():
+        for _ in admin_service.render_export('chats', admin_service.export_rows('chats'), 'csv'):
+            pass
+
+    def measure(heavy):
+        stop = time.perf_counter() + args.duration
+        latencies, heavy_calls, done = [], [0], []
+
+        def heavy_reader():
+            # 관리자 페이지 요청이 끊이지 않는 상황 (요청 사이에는 다른 green thread로 넘어감)
+            while not done:
+                heavy()
+                heavy_calls[0] += 1
+                eventlet.sleep(0)
+
+        reader = eventlet.spawn(heavy_reader) if heavy else None
+        eventlet.sleep(0)
+        due = time.perf_counter()
+        while time.perf_counter() < stop:
+            repository.create_global_chat_message(user_id, 'bench')
+            # 메시지가 도착한 시각(due)부터 저장이 끝날 때까지 (허브가 막혀 늦게 시작한 시간 포함)
+            latencies.append((time.perf_counter() - due) * 1000)
+            due = time.perf_counter() + args.interval
+            eventlet.sleep(args.interval)
+        done.append(True)
+        if reader:
+            reader.wait()
+        return {
+            'p50_ms': percentile(latencies, 0.5), 'p95_ms': percentile(latencies, 0.95),
+            'max_ms': max(latencies), 'chats': len(latencies), 'heavy_calls': heavy_calls[0],
+        }
+
+    results = {}
+    db_offload.configure('off')
+    results['idle'] = measure(heavy=None)
+    results['DB_OFFLOAD=off'] = measure(heavy=list_products)
+    results['export, off'] = measure(heavy=export_chats)
+    db_offload.configure('on', args.threads)
+    results['DB_OFFLOAD=on'] = measure(heavy=list_products)
+    results['export, on'] = measure(heavy=export_chats)
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='무거운 조회 중 채팅 저장 지연 시간 (DB_OFFLOAD off/on)')
+    parser.add_argument('--products', type=int, default=50000, help='get_all_products가 읽을 상품 수 (내보낼 채팅 수도 같음)')
+    parser.add_argument('--duration', type=float, default=5.0, help='구성별 측정 시간(초)')
+    parser.add_argument('--interval', type=float, default=0.02, help='채팅 저장 간격(초)')
+    parser.add_argument('--threads', type=int, default=5, help='DB_OFFLOAD_THREADS')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix='offload-bench-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'market.db')}")
+    for name in ('CHAT_DATABASE_URL', 'CHAT_SHARDS', 'WRITE_QUEUE'):
+        env.pop(name, None)
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', '--products', str(args.products),
+         '--duration', str(args.duration), '--interval', str(args.interval), '--threads', str(args.threads)],
+        env=env, cwd=work_dir, check=True, capture_output=True, text=True
+    ).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+
+    print(f"== chat save latency, {args.products:,} products, {args.duration:g}s per scenario")
+    print(f"  {'scenario':<18}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'chats':>8}{'heavy calls':>13}")
+    for name, result in results.items():
+        print(f"  {name:<18}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['max_ms']:>10.1f}"
+              f"{result['chats']:>8}{result['heavy_calls']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# read_model_bench.py
+"""
+목록 조회를 ORM 객체로 읽을 때와 읽기 모델(namedtuple, 필요한 컬럼만)로 읽을 때의 시간/메모리 비교 벤치마크입니다.
+
+    python bench/read_model_bench.py                 # 테이블마다 10,000행
+    python bench/read_model_bench.py --rows 100000 --repeat 5
+
+임시 디렉터리의 새 SQLite 파일에 사용자/상품/신고/전역 채팅을 --rows개씩 넣은 뒤 목록마다 측정합니다.
+  - orm        : session.query(Model).all() (읽기 모델 도입 전의 구현)
+  - read model : repository의 목록 함수 (get_all_users 등)
+시간은 --repeat회 중 중앙값, 메모리는 tracemalloc으로 잰 호출 중 최대 할당량과 반환 후에도 남는 결과의 크기이며
+모두 10,000행 기준으로 환산해 출력합니다.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+# 운영 DB를 건드리지 않도록 임시 디렉터리의 SQLite 파일로 repository를 불러옵니다.
+WORK_DIR = tempfile.mkdtemp(prefix='read-model-bench-')
+os.chdir(WORK_DIR)
+os.environ['DATABASE_URL'] = 'sqlite:///market.db'
+os.environ.pop('CHAT_DATABASE_URL', None)
+os.environ.pop('CHAT_SHARDS', None)
+os.environ.pop('WRITE_QUEUE', None)
+sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import insert  # noqa: E402
+import repository  # noqa: E402
+from utils import new_id  # noqa: E402
+
+PER_ROWS = 10000
+SEED_CHUNK_SIZE = 10000
+
+
+def seed(rows):
+    now = datetime.utcnow()
+    for start in range(0, rows, SEED_CHUNK_SIZE):
+        chunk = range(start, min(rows, start + SEED_CHUNK_SIZE))
+        users = [{'id': new_id(), 'username': f"user{i}", 'password': '$2b$12$' + 'x' * 53, 'bio': f"bio {i}",
+                  'status': 'active', 'wallet': 5000, 'failed_attempts': 0} for i in chunk]
+        products = [{'id': new_id(), 'title': f"product {i}", 'description': 'description ' * 20,
+                     'price': i % 1000, 'seller_id': users[0]['id']} for i in chunk]
+        reports = [{'id': new_id(), 'reporter_id': users[0]['id'], 'target_id': users[-1]['id'],
+                    'reason': 'spam', 'timestamp': now - timedelta(seconds=i)} for i in chunk]
+        chats = [{'id': new_id(), 'sender_id': users[0]['id'], 'recipient_id': 'global',
+                  'message': f"message {i}", 'timestamp': now - timedelta(seconds=i)} for i in chunk]
+        with repository.engine.begin() as conn:
+            conn.execute(insert(repository.User.__table__), users)
+            conn.execute(insert(repository.Product.__table__), products)
+            conn.execute(insert(repository.Report.__table__), reports)
+        with repository.chat_engines[0].begin() as conn:
+            conn.execute(insert(repository.Chat.__table__), chats)
+
+def orm_query(model, chat=False, **filters):
+    """읽기 모델 도입 전의 구현: ORM 객체 전체를 읽은 뒤 세션을 닫음 (객체는 분리됨)"""
+    def run():
+        session = (repository.ChatSessions[0] if chat else repository.SessionLocal)()
+        try:
+            query = session.query(model)
+            for name, value in filters.items():
+                query = query.filter(getattr(model, name) == value)
+            return query.all()
+        finally:
+            session.close()
+    return run
+
+def measure(func, repeat):
+    func()  # 워밍업 (쿼리 컴파일 캐시)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak, retained, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ORM 객체와 읽기 모델의 목록 조회 시간/메모리 비교')
+    parser.add_argument('--rows', type=int, default=PER_ROWS, help='테이블마다 넣을 행 수')
+    parser.add_argument('--repeat', type=int, default=5, help='시간 측정 반복 횟수')
+    args = parser.parse_args()
+
+    repository.init_db()
+    seed(args.rows)
+    cases = [
+        ('users', orm_query(repository.User), repository.get_all_users),
+        ('products', orm_query(repository.Product), repository.get_all_products),
+        ('reports', orm_query(repository.Report), repository.get_all_reports),
+        ('global chats', orm_query(repository.Chat, chat=True, recipient_id='global'),
+         lambda: repository.get_global_chat_history(args.rows)),
+    ]
+    scale = PER_ROWS / args.rows
+    print(f"== {args.rows:,} rows per table, per {PER_ROWS:,} rows")
+    print(f"  {'list':<14}{'variant':<12}{'ms':>9}{'peak MB':>10}{'kept MB':>10}{'speedup':>9}{'memory':>8}")
+    for name, orm_func, read_func in cases:
+        orm = measure(orm_func, args.repeat)
+        read = measure(read_func, args.repeat)
+        assert orm[3] == read[3], (name, orm[3], read[3])
+        for variant, (seconds, peak, retained, _) in (('orm', orm), ('read model', read)):
+            ratios = f"{orm[0] / read[0]:>8.1f}x{orm[1] / read[1]:>7.1f}x" if variant == 'read model' else ''
+            print(f"  {name:<14}{variant:<12}{seconds * 1000 * scale:>9.1f}{peak * scale / 2 ** 20:>10.2f}"
+                  f"{retained * scale / 2 ** 20:>10.2f}{ratios}")
+
+
+if __name__ == '__main__':
+    main()
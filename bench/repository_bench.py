@@ -0,0 +1,319 @@
+# repository_bench.py
+"""
+repository.py 함수별 확장성(scaling) 마이크로벤치마크와 쿼리 플랜 회귀 검사입니다.
+
+    python bench/repository_bench.py                       # 10^3, 10^5, 10^7 행
+    python bench/repository_bench.py --sizes 1e3,1e5       # 빠르게 확인
+    python bench/repository_bench.py --plans-only          # 쿼리 플랜 검사만 (CI용)
+
+임시 디렉터리의 별도 market.db에 테이블마다 지정한 행 수를 채운 뒤 repository.py의 모든 함수를 실행합니다.
+  - 각 크기별 함수 지연 시간(중앙값)을 출력하고 --output으로 JSON 저장
+  - 핫 경로 조회 함수의 지연 시간이 행 수에 대해 준선형(sub-linear)으로 증가하는지 검사
+  - 실행된 모든 쿼리의 EXPLAIN QUERY PLAN에서 전체 테이블 스캔이 발견되면 실패 (종료 코드 1)
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import inspect
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+INVOKED_FROM = os.getcwd()
+
+# 운영 DB를 건드리지 않도록 임시 디렉터리의 SQLite 파일로 repository를 불러옵니다.
+# (쿼리 플랜 검사가 SQLite의 EXPLAIN QUERY PLAN을 사용하므로 환경 변수의 DATABASE_URL은 무시)
+# 채팅도 같은 DB 파일에 저장해 모든 쿼리의 플랜을 한 연결에서 검사합니다.
+WORK_DIR = tempfile.mkdtemp(prefix='repository-bench-')
+os.chdir(WORK_DIR)
+os.environ['DATABASE_URL'] = 'sqlite:///market.db'
+os.environ.pop('CHAT_DATABASE_URL', None)
+os.environ.pop('CHAT_SHARDS', None)
+sys.path.insert(0, SRC_DIR)
+
+from sqlalchemy import insert
+import repository
+from utils import new_id
+import query_profiler
+
+# 준선형 검사 대상 핫 경로 조회 함수
+HOT_LOOKUPS = (
+    'get_user_by_username',
+    'get_private_chat_history',
+    'get_wallet_transactions',
+    'create_report',
+    'search_products',
+    'search_products_page',
+    'get_moderation_queue_page',
+    'get_users_page',
+)
+# 지연 시간 ~ rows^exponent 로 근사했을 때 허용하는 최대 지수 (1.0이면 선형)
+MAX_SCALING_EXPONENT = 0.5
+# 전체 목록 조회와 내보내기는 정의상 테이블 전체를 읽으므로 스캔 검사와 벤치마크 측정에서 제외
+FULL_SCAN_ALLOWED = (
+    'get_all_users', 'get_all_products', 'get_all_reports',
+    'iter_reports', 'iter_chats', 'iter_wallet_transactions', 'iter_products', 'recompute_counters',
+    'backfill_moderation_queue',
+)
+# 행 수가 데이터 양과 무관하게 제한되는 집계 테이블은 스캔해도 O(1)
+BOUNDED_TABLES = ('stat_counter', 'stat_activity')
+# 벤치마크 대상이 아닌 함수
+NOT_BENCHMARKED = ('init_db', 'close_db', 'close_write_queues', 'init_product_fts', 'product_fts_available')
+
+SEED_CHUNK_SIZE = 50000
+WORDS = ['bike', 'desk', 'chair', 'lamp', 'phone', 'camera', 'book', 'guitar', 'watch', 'bag']
+
+# EXPLAIN QUERY PLAN 결과에서 전체 스캔을 나타내는 줄 (가상 테이블(FTS) 스캔은 인덱스 조회이므로 제외)
+FULL_SCAN_PATTERN = re.compile(r'^SCAN (\w+)(?!\w)(?! VIRTUAL TABLE)')
+
+
+class Dataset:
+    """시드된 데이터에서 조회 인자로 사용할 키를 보관합니다."""
+
+    def __init__(self):
+        self.rows = 0
+        self.user_ids = []
+        self.usernames = []
+        self.product_ids = []
+        self.product_tokens = []
+
+    def sample(self, values):
+        return random.choice(values)
+
+
+def seed_to(dataset, rows, now):
+    """모든 테이블의 행 수가 rows가 되도록 부족한 만큼 executemany로 추가합니다."""
+    start = dataset.rows
+    with repository.engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+    for chunk_start in range(start, rows, SEED_CHUNK_SIZE):
+        chunk = range(chunk_start, min(rows, chunk_start + SEED_CHUNK_SIZE))
+        user_rows = [{'id': new_id(), 'username': f"u{i}", 'password': 'x', 'status': 'active',
+                      'wallet': 5000, 'failed_attempts': 0} for i in chunk]
+        user_ids = [row['id'] for row in user_rows]
+        # 이후 청크에서 사용할 수 있도록 일부 키만 샘플로 보관 (메모리 절약)
+        dataset.user_ids.extend(user_ids[::max(1, len(user_ids) // 200)])
+        dataset.usernames.extend(row['username'] for row in user_rows[::max(1, len(user_rows) // 200)])
+        # 사용자당 채팅/신고/거래 수가 테이블 크기와 무관하게 일정하도록 같은 청크의 사용자끼리 연결
+        pool = user_ids
+        product_rows = [{'id': new_id(), 'title': f"{random.choice(WORDS)} {uuid.uuid4().hex[:12]}",
+                         'description': 'bench', 'price': i % 1000, 'seller_id': random.choice(pool)}
+                        for i in chunk]
+        sampled_products = product_rows[::max(1, len(product_rows) // 200)]
+        dataset.product_ids.extend(row['id'] for row in sampled_products)
+        dataset.product_tokens.extend(row['title'].split()[1] for row in sampled_products)
+        chat_rows = [{'id': new_id(), 'sender_id': random.choice(pool),
+                      'recipient_id': 'global' if i % 2 else random.choice(pool),
+                      'message': 'bench', 'timestamp': now - timedelta(seconds=i)} for i in chunk]
+        report_rows = [{'id': new_id(), 'reporter_id': random.choice(pool),
+                        'target_id': random.choice(pool), 'reason': 'bench',
+                        'timestamp': now - timedelta(seconds=i)} for i in chunk]
+        moderation_rows = [{'target_id': user_id, 'report_count': 1, 'first_reported_at': now,
+                            'last_reported_at': now, 'score': random.random() * 1000} for user_id in user_ids]
+        transaction_rows = [{'id': new_id(), 'sender_id': random.choice(pool),
+                             'recipient_id': random.choice(pool), 'amount': 10, 'transaction_type': 'transfer',
+                             'timestamp': now - timedelta(seconds=i)} for i in chunk]
+        with repository.engine.begin() as conn:
+            conn.execute(insert(repository.User.__table__), user_rows)
+            conn.execute(insert(repository.Product.__table__), product_rows)
+            conn.execute(insert(repository.Chat.__table__), chat_rows)
+            conn.execute(insert(repository.Report.__table__), report_rows)
+            conn.execute(insert(repository.ModerationQueue.__table__), moderation_rows)
+            conn.execute(insert(repository.WalletTransaction.__table__), transaction_rows)
+    with repository.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+    dataset.rows = rows
+
+
+def argument_factories(dataset, now):
+    """함수 이름 -> 호출 인자를 만드는 함수. 여기에 없는 repository 함수는 '인자 미정의'로 보고됩니다."""
+    user = lambda: dataset.sample(dataset.user_ids)
+    report_limits = repository.ReportLimits(timedelta(days=1), 10 ** 9, 10 ** 9)
+    return {
+        'create_user': lambda: (f"n{uuid.uuid4().hex[:8]}", 'x'),
+        'get_user_by_username': lambda: (dataset.sample(dataset.usernames),),
+        'get_user_by_id': lambda: (user(),),
+        'get_all_users': lambda: (),
+        'update_failed_attempts': lambda: (user(), 0),
+        'set_lockout': lambda: (user(), None),
+        'reset_failed_attempts': lambda: (user(),),
+        'update_user_bio': lambda: (user(), 'bench'),
+        'update_user_status': lambda: (user(), 'active'),
+        'update_user_password': lambda: (user(), 'x'),
+        'create_product': lambda: ('bench product', 'bench', 100, user()),
+        'get_all_products': lambda: (),
+        'get_product_by_id': lambda: (dataset.sample(dataset.product_ids),),
+        'edit_product': lambda: (dataset.sample(dataset.product_ids), 'bike edited', 'bench', 100),
+        'delete_product': lambda: (str(uuid.uuid4()),),
+        'search_products': lambda: (dataset.sample(dataset.product_tokens),),
+        'search_products_page': lambda: ('', 100, 200, 'price_asc'),
+        # 신고 제한 검사 포함 (같은 대상 재신고로 실패하지 않도록 대상은 매번 새로 만듦)
+        'create_report': lambda: (user(), str(uuid.uuid4()), 'bench', report_limits),
+        'get_all_reports': lambda: (),
+        'get_users_page': lambda: (user(),),
+        'get_public_user_fields': lambda: (user(), ('id', 'username')),
+        'get_product_fields': lambda: (dataset.sample(dataset.product_ids), ('id', 'title', 'price')),
+        'get_moderation_queue_page': lambda: ((random.random() * 1000, user()),),
+        'resolve_moderation_target': lambda: (user(),),
+        'get_users_by_ids': lambda: ([user() for _ in range(50)],),
+        'get_products_by_ids': lambda: ([dataset.sample(dataset.product_ids) for _ in range(50)],),
+        'create_chat_message': lambda: (user(), user(), 'bench'),
+        'get_private_chat_history': lambda: (user(), user()),
+        'create_global_chat_message': lambda: (user(), 'bench'),
+        'get_global_chat_history': lambda: (),
+        'delete_chat_message': lambda: (str(uuid.uuid4()),),
+        'bulk_insert_chats': lambda: ([{'id': new_id(), 'sender_id': user(), 'recipient_id': 'global',
+                                        'message': 'bench', 'timestamp': now} for _ in range(100)],),
+        'create_wallet_transaction': lambda: (user(), user(), 10, 'transfer'),
+        'get_wallet_transactions': lambda: (user(),),
+        'transfer_wallet': lambda: (user(), user(), 0),
+        'bulk_create_products': lambda: ([{'title': 'bench', 'description': 'bench', 'price': 1,
+                                           'seller_id': user()} for _ in range(100)],),
+        'iter_reports': lambda: (),
+        'iter_products': lambda: (),
+        'iter_chats': lambda: (),
+        'iter_wallet_transactions': lambda: (),
+        'get_dashboard_stats': lambda: (),
+        'get_usernames_by_ids': lambda: ([user() for _ in range(20)],),
+        'get_chat_history_page': lambda: (user(), user()),
+        'get_chats_before': lambda: ((now - timedelta(days=365)).strftime('%Y-%m-%d %H:%M:%S'),),
+        'delete_chats': lambda: ([str(uuid.uuid4()) for _ in range(10)],),
+        'recompute_counters': lambda: (),
+        'backfill_moderation_queue': lambda: (),
+    }
+
+def repository_functions():
+    """repository 모듈에 정의된 공개 함수 목록"""
+    return [
+        (name, func) for name, func in inspect.getmembers(repository, inspect.isfunction)
+        if func.__module__ == repository.__name__ and not name.startswith('_') and name not in NOT_BENCHMARKED
+    ]
+
+def consume(result):
+    """제너레이터를 반환하는 함수(iter_*)는 끝까지 읽어야 쿼리가 실행됩니다."""
+    if inspect.isgenerator(result):
+        for _ in result:
+            pass
+
+def measure(func, make_args, repeat):
+    """repeat회 실행한 지연 시간의 중앙값(ms)"""
+    samples = []
+    for _ in range(repeat):
+        args = make_args()
+        started = time.perf_counter()
+        consume(func(*args))
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def full_scans(func, make_args):
+    """함수가 실행한 쿼리의 EXPLAIN QUERY PLAN에서 전체 스캔된 테이블 목록을 반환합니다."""
+    with query_profiler.capture('plan') as log:
+        consume(func(*make_args()))
+    scans = set()
+    with repository.engine.connect() as conn:
+        for query in log.queries:
+            statement = query['statement']
+            if not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            parameters = query['parameters']
+            for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+                match = FULL_SCAN_PATTERN.match(row[-1])
+                if match and match.group(1) not in BOUNDED_TABLES:
+                    scans.add(match.group(1))
+    return sorted(scans)
+
+def scaling_exponent(sizes, latencies):
+    """log(latency) = a + b*log(rows)의 최소제곱 기울기 b"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(latency, 1e-6)) for latency in latencies]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='repository.py 확장성 벤치마크 및 쿼리 플랜 검사')
+    parser.add_argument('--sizes', default='1e3,1e5,1e7', help='테이블당 행 수 목록 (쉼표 구분)')
+    parser.add_argument('--repeat', type=int, default=50, help='함수별 반복 실행 횟수')
+    parser.add_argument('--plans-only', action='store_true', help='가장 작은 크기에서 쿼리 플랜 검사만 수행')
+    parser.add_argument('--output', help='결과를 저장할 JSON 파일 경로')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    sizes = sorted(int(float(size)) for size in args.sizes.split(','))
+    if args.plans_only:
+        sizes = sizes[:1]
+
+    repository.init_db()
+    query_profiler.listen(repository.engine)
+    now = datetime.utcnow()
+    dataset = Dataset()
+    factories = argument_factories(dataset, now)
+    functions = repository_functions()
+    failures = []
+
+    missing = [name for name, _ in functions if name not in factories]
+    for name in missing:
+        failures.append(f"{name}: 벤치마크 인자가 정의되지 않았습니다 (argument_factories에 추가하세요)")
+
+    curves = {name: [] for name, _ in functions if name in factories and name not in FULL_SCAN_ALLOWED}
+    for size in sizes:
+        started = time.perf_counter()
+        seed_to(dataset, size, now)
+        print(f"== {size:,} rows (seeded in {time.perf_counter() - started:.1f}s)")
+
+        # 쿼리 플랜 검사 (회귀 게이트)
+        if size == sizes[0]:
+            for name, func in functions:
+                if name in missing or name in FULL_SCAN_ALLOWED:
+                    continue
+                scans = full_scans(func, factories[name])
+                if scans:
+                    failures.append(f"{name}: 전체 테이블 스캔 ({', '.join(scans)})")
+        if args.plans_only:
+            break
+
+        for name, func in functions:
+            if name not in curves:
+                continue
+            latency = measure(func, factories[name], args.repeat)
+            curves[name].append(latency)
+            print(f"  {name:<32}{latency:>10.3f} ms")
+
+    results = {'sizes': sizes, 'functions': {}}
+    if not args.plans_only and len(sizes) > 1:
+        print("== scaling exponent (latency ~ rows^b)")
+        for name, latencies in curves.items():
+            exponent = scaling_exponent(sizes, latencies)
+            results['functions'][name] = {'latency_ms': latencies, 'exponent': exponent}
+            marker = ''
+            if name in HOT_LOOKUPS and exponent > MAX_SCALING_EXPONENT:
+                failures.append(f"{name}: 지연 시간이 준선형이 아닙니다 (b={exponent:.2f} > {MAX_SCALING_EXPONENT})")
+                marker = '  <-- FAIL'
+            print(f"  {name:<32}{exponent:>8.2f}{marker}")
+
+    if args.output:
+        with open(os.path.join(INVOKED_FROM, args.output), 'w') as f:
+            json.dump(dict(results, failures=failures), f, indent=2)
+
+    if failures:
+        print("== FAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("== OK")
+
+
+if __name__ == '__main__':
+    main()
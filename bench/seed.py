@@ -0,0 +1,152 @@
+# seed.py
+"""
+부하 테스트용 데이터셋을 market.db(또는 DATABASE_URL의 DB)에 대량으로 생성합니다.
+
+    python bench/seed.py --users 1000 --products 5000 --chats 20000 --reports 500 --transactions 5000
+
+모든 시드 사용자는 'load' 접두사의 사용자명과 동일한 비밀번호(SEED_PASSWORD)를 사용합니다.
+ORM 객체를 하나씩 만드는 대신 테이블 단위 INSERT를 executemany로 묶어 실행합니다.
+"""
+import os
+import sys
+import random
+import argparse
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+# 앱과 같은 DB 파일(src/market.db)을 사용하도록 src 디렉터리에서 실행합니다.
+os.chdir(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+# 앱과 같은 DB를 사용하도록 src/.env의 DATABASE_URL도 읽어 옵니다.
+from dotenv import load_dotenv
+load_dotenv(os.path.join(SRC_DIR, '.env'))
+
+import bcrypt
+from sqlalchemy import insert, select
+import repository
+from utils import new_id
+
+SEED_USERNAME_PREFIX = 'load'
+SEED_PASSWORD = 'loadtest1'
+CHUNK_SIZE = 10000
+
+# 상품명/검색어로 사용할 단어 목록
+WORDS = [
+    'bike', 'desk', 'chair', 'lamp', 'phone', 'camera', 'book', 'guitar', 'watch', 'bag',
+    'shoes', 'jacket', 'table', 'monitor', 'keyboard', 'mouse', 'speaker', 'sofa', 'mirror', 'tent',
+]
+ADJECTIVES = ['red', 'blue', 'used', 'new', 'small', 'large', 'vintage', 'cheap', 'classic', 'mini']
+
+
+def seed_username(i):
+    return f"{SEED_USERNAME_PREFIX}{i}"
+
+def random_timestamp(now, days=30):
+    return now - timedelta(seconds=random.randint(0, days * 86400))
+
+def bulk_insert(table, rows):
+    """rows를 CHUNK_SIZE 단위 트랜잭션으로 나누어 executemany로 삽입합니다."""
+    for start in range(0, len(rows), CHUNK_SIZE):
+        with repository.engine.begin() as conn:
+            conn.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+def seed(users, products, chats, reports, transactions, reset=False):
+    if reset:
+        repository.Base.metadata.drop_all(bind=repository.engine)
+        # 상품 검색용 FTS 테이블은 ORM 모델이 아니므로 따로 삭제
+        with repository.engine.begin() as conn:
+            conn.exec_driver_sql('DROP TABLE IF EXISTS product_fts')
+        for chat_engine in repository.chat_engines:
+            if chat_engine is not repository.engine:
+                repository.Base.metadata.drop_all(bind=chat_engine, tables=repository._chat_tables())
+    repository.init_db()
+
+    now = datetime.utcnow()
+    # bcrypt는 의도적으로 느리므로 모든 시드 사용자에게 같은 해시를 사용합니다.
+    password_hash = bcrypt.hashpw(SEED_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    with repository.engine.connect() as conn:
+        existing = conn.execute(
+            select(repository.User.username).where(repository.User.username.like(f"{SEED_USERNAME_PREFIX}%"))
+        ).scalars().all()
+    offset = len(existing)
+
+    user_rows = [
+        {'id': new_id(), 'username': seed_username(offset + i), 'password': password_hash,
+         'bio': None, 'status': 'active', 'wallet': 1000000, 'failed_attempts': 0}
+        for i in range(users)
+    ]
+    bulk_insert(repository.User.__table__, user_rows)
+    user_ids = [row['id'] for row in user_rows]
+    if not user_ids:
+        return
+
+    product_rows = [
+        {'id': new_id(),
+         'title': f"{random.choice(ADJECTIVES)} {random.choice(WORDS)} {i}",
+         'description': ' '.join(random.choices(WORDS, k=8)),
+         'price': random.randint(1, 500) * 100,
+         'seller_id': random.choice(user_ids)}
+        for i in range(products)
+    ]
+    bulk_insert(repository.Product.__table__, product_rows)
+
+    chat_rows = []
+    for i in range(chats):
+        sender_id = random.choice(user_ids)
+        # 약 절반은 전역 채팅, 나머지는 1:1 채팅
+        recipient_id = 'global' if random.random() < 0.5 else random.choice(user_ids)
+        chat_rows.append({'id': new_id(), 'sender_id': sender_id, 'recipient_id': recipient_id,
+                          'message': ' '.join(random.choices(WORDS, k=5)), 'timestamp': random_timestamp(now)})
+    # 채팅은 CHAT_DATABASE_URL/CHAT_SHARDS 설정에 따라 대화별 채팅 DB에 삽입
+    for start in range(0, len(chat_rows), CHUNK_SIZE):
+        repository.bulk_insert_chats(chat_rows[start:start + CHUNK_SIZE])
+
+    target_ids = user_ids + [row['id'] for row in product_rows]
+    report_rows = [
+        {'id': new_id(), 'reporter_id': random.choice(user_ids), 'target_id': random.choice(target_ids),
+         'reason': 'load test report', 'timestamp': random_timestamp(now)}
+        for _ in range(reports)
+    ]
+    bulk_insert(repository.Report.__table__, report_rows)
+
+    transaction_rows = []
+    for _ in range(transactions):
+        sender_id, recipient_id = random.sample(user_ids, 2) if len(user_ids) > 1 else (user_ids[0], user_ids[0])
+        transaction_rows.append({'id': new_id(), 'sender_id': sender_id, 'recipient_id': recipient_id,
+                                 'amount': random.randint(1, 100) * 10, 'transaction_type': 'transfer',
+                                 'timestamp': random_timestamp(now)})
+    bulk_insert(repository.WalletTransaction.__table__, transaction_rows)
+    # 대량 삽입은 집계값과 신고 검토 대기열을 거치지 않으므로 다시 계산
+    repository.backfill_moderation_queue()
+    repository.recompute_counters()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='부하 테스트용 데이터셋 생성')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--chats', type=int, default=20000)
+    parser.add_argument('--reports', type=int, default=500)
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--scale', type=float, default=1.0, help='모든 건수에 곱할 배율')
+    parser.add_argument('--reset', action='store_true', help='기존 테이블을 모두 삭제하고 새로 생성')
+    parser.add_argument('--seed', type=int, default=None, help='난수 시드 (재현 가능한 데이터셋)')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    counts = {name: int(getattr(args, name) * args.scale)
+              for name in ('users', 'products', 'chats', 'reports', 'transactions')}
+    started = time.perf_counter()
+    seed(reset=args.reset, **counts)
+    elapsed = time.perf_counter() - started
+    print(f"seeded {counts} in {elapsed:.1f}s ({repository.engine.url.render_as_string(hide_password=True)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# similar_bench.py
+"""
+유사 상품 색인(similar_products)의 재구성 시간과 추천 조회 지연 시간 벤치마크입니다.
+
+    python bench/similar_bench.py                      # 상품 1,000,000개
+    python bench/similar_bench.py --products 200000 --queries 2000
+    python bench/similar_bench.py --products 100000 --dimensions 64,256,1024
+
+DB를 거치지 않고 만든 상품 --products개로 색인을 만든 뒤 측정합니다. 상품은 --category-size개씩 같은 분류이며
+같은 분류의 상품은 분류 고유 단어 6개 중 일부를 공유하고, 나머지는 모든 분류에 공통인 단어입니다.
+  - rebuild      : 벡터화 + (상품이 CLUSTER_MIN_PRODUCTS개 이상이면) k-means 묶음 만들기
+  - clustered    : 묶음 CLUSTER_PROBES개만 비교하는 조회 (실제 사용하는 방식)
+  - full scan    : 같은 색인에서 전체 행렬과 비교하는 조회 (비교용)
+  - add/remove   : 상품 등록/삭제 시 색인 갱신
+precision은 추천 결과 중 같은 분류 상품의 비율(관련성), recall은 전체 비교의 상위 결과 중 묶음 조회가 찾은 비율입니다.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+import similar_products  # noqa: E402
+
+WORDS = ['자전거', '책상', '의자', '조명', '휴대폰', '카메라', '책', '기타', '시계', '가방', '노트북', '모니터',
+         'bike', 'desk', 'chair', 'lamp', 'phone', 'camera', 'book', 'guitar', 'watch', 'bag']
+ADJECTIVES = ['빨간', '파란', '원목', '중고', '새', '튼튼한', '가벼운', '작은', '큰', '빈티지',
+              'red', 'blue', 'used', 'new', 'vintage', 'mini', 'pro', 'classic']
+# 분류 고유 단어를 만들 음절
+SYLLABLES = ['가', '나', '도', '루', '미', '소', '타', '하', 'ka', 'ri', 'mo', 'su', 'ne', 'zo', 'lu', 'pi']
+CATEGORY_WORDS = 6
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def category_of(product_id, category_size):
+    return int(product_id[1:]) // category_size
+
+def product_rows(count, category_size, seed=0, prefix='p'):
+    """상품 번호 // category_size가 분류 (분류마다 고유 단어 CATEGORY_WORDS개)"""
+    rng = random.Random(seed)
+    keywords = {}
+    for number in range(count):
+        category = number // category_size
+        if category not in keywords:
+            keywords[category] = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+                                  for _ in range(CATEGORY_WORDS)]
+        own = keywords[category]
+        title = f"{rng.choice(ADJECTIVES)} {' '.join(rng.sample(own, 2))} {rng.choice(WORDS)}"
+        description = ' '.join(rng.sample(own, 3) + [rng.choice(WORDS + ADJECTIVES) for _ in range(8)])
+        yield f"{prefix}{number}", title, description
+
+def time_queries(index, product_ids, limit):
+    latencies, results = [], []
+    for product_id in product_ids:
+        started = time.perf_counter()
+        results.append(index.similar(product_id, limit))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, results
+
+
+def precision(product_ids, results, category_size):
+    relevant = sum(category_of(found, category_size) == category_of(product_id, category_size)
+                   for product_id, items in zip(product_ids, results) for found in items)
+    return relevant / max(1, sum(len(items) for items in results))
+
+def run(args, dimensions):
+    index = similar_products.SimilarProducts(dimensions)
+    started = time.perf_counter()
+    index.rebuild(product_rows(args.products, args.category_size))
+    rebuild_s = time.perf_counter() - started
+    clusters = 0 if index.centroids is None else len(index.clusters)
+    print(f"== {args.products:,} products, {dimensions} dims, {clusters} clusters ({args.probes} probed), "
+          f"rebuild {rebuild_s:.1f}s, matrix {(index.vectors.nbytes + index.scales.nbytes) / 2 ** 20:.0f}MB")
+
+    rng = random.Random(1)
+    sample = [f"p{rng.randrange(args.products)}" for _ in range(args.queries)]
+    rows = {}
+    rows['clustered'], clustered = time_queries(index, sample, args.limit)
+    centroids = index.centroids
+    index.centroids = None
+    rows['full scan'], exact = time_queries(index, sample, args.limit)
+    index.centroids = centroids
+
+    write_latencies = []
+    for number, (product_id, title, description) in enumerate(
+            product_rows(args.queries, args.category_size, seed=2, prefix='new')):
+        started = time.perf_counter()
+        index.add(product_id, title, description)
+        index.remove(sample[number])
+        write_latencies.append((time.perf_counter() - started) * 1000)
+    rows['add/remove'] = write_latencies
+
+    print(f"  {'operation':<14}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, latencies in rows.items():
+        print(f"  {name:<14}{percentile(latencies, 0.5):>10.2f}{percentile(latencies, 0.95):>10.2f}"
+              f"{max(latencies):>10.2f}")
+    found = sum(len(set(approx) & set(full)) for approx, full in zip(clustered, exact))
+    print(f"  precision@{args.limit} (same category): clustered {precision(sample, clustered, args.category_size):.2f}, "
+          f"full scan {precision(sample, exact, args.category_size):.2f}")
+    print(f"  recall@{args.limit} vs full scan: {found / max(1, sum(len(full) for full in exact)):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='유사 상품 색인 재구성/조회 벤치마크')
+    parser.add_argument('--products', type=int, default=1000000, help='색인할 상품 수')
+    parser.add_argument('--queries', type=int, default=1000, help='측정할 추천 조회 수')
+    parser.add_argument('--limit', type=int, default=similar_products.SIMILAR_LIMIT, help='추천 상품 수')
+    parser.add_argument('--category-size', type=int, default=50, help='분류 하나의 상품 수')
+    parser.add_argument('--dimensions', default=str(similar_products.DIMENSIONS),
+                        help='비교할 벡터 차원 수 (쉼표로 구분)')
+    parser.add_argument('--probes', type=int, default=similar_products.CLUSTER_PROBES, help='조회할 때 비교할 묶음 수')
+    args = parser.parse_args()
+    if not similar_products.available():
+        raise SystemExit("numpy가 설치되어 있지 않습니다.")
+    similar_products.CLUSTER_PROBES = args.probes
+    for dimensions in (int(value) for value in args.dimensions.split(',')):
+        run(args, dimensions)
+
+
+if __name__ == '__main__':
+    main()
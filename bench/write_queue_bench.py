@@ -0,0 +1,101 @@
+# write_queue_bench.py
+"""
+쓰기 묶음 커밋(WRITE_QUEUE) 사용 여부별 쓰기 처리량 비교 벤치마크입니다.
+
+    python bench/write_queue_bench.py                        # 동시 writer 1, 4, 16, 64
+    python bench/write_queue_bench.py --writers 8,32 --duration 10
+
+구성(WRITE_QUEUE off/on x 동시 writer 수)마다 임시 디렉터리에 새 SQLite 파일을 만들고
+별도 프로세스에서 writer 스레드가 --duration초 동안 쓰기 함수를 반복 호출합니다.
+(WRITE_QUEUE는 import 시점에 읽으므로 구성마다 프로세스를 새로 실행)
+쓰기는 채팅 저장(create_chat_message), 로그인 실패 횟수 갱신(update_failed_attempts),
+지갑 거래 기록(create_wallet_transaction)을 번갈아 호출하며, 모두 커밋 완료를 기다립니다.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+
+
+def scenario_env(write_queue, work_dir):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(work_dir, 'market.db')}",
+               WRITE_QUEUE=write_queue)
+    env.pop('CHAT_DATABASE_URL', None)
+    env.pop('CHAT_SHARDS', None)
+    return env
+
+def run_worker(args):
+    """자식 프로세스: 현재 환경 변수의 구성으로 쓰기 처리량을 측정해 JSON으로 출력합니다."""
+    sys.path.insert(0, SRC_DIR)
+    import repository
+    repository.init_db()
+    user_ids = [repository.create_user(f"bench{i}", 'x') for i in range(args.users)]
+
+    operations = [
+        lambda rng: repository.create_chat_message(rng.choice(user_ids), rng.choice(user_ids), 'bench'),
+        lambda rng: repository.update_failed_attempts(rng.choice(user_ids), rng.randint(0, 4)),
+        lambda rng: repository.create_wallet_transaction(rng.choice(user_ids), rng.choice(user_ids), 10, 'transfer'),
+    ]
+    counts = [0] * args.threads
+    start = threading.Barrier(args.threads + 1)
+
+    def writer(index):
+        rng = random.Random(args.seed + index)
+        start.wait()
+        deadline = time.perf_counter() + args.duration
+        count = 0
+        while time.perf_counter() < deadline:
+            operations[count % len(operations)](rng)
+            count += 1
+        counts[index] = count
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    repository.close_write_queues()
+    print(json.dumps({'writes_per_s': sum(counts) / args.duration}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='쓰기 묶음 커밋 사용 여부별 쓰기 처리량 비교')
+    parser.add_argument('--writers', default='1,4,16,64', help='동시 writer 스레드 수 목록 (쉼표 구분)')
+    parser.add_argument('--duration', type=float, default=5.0, help='구성별 측정 시간(초)')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--threads', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"== writes/s (commit awaited), {args.duration:g}s per scenario")
+    print(f"  {'writers':<10}{'WRITE_QUEUE=off':>18}{'WRITE_QUEUE=on':>18}")
+    for writers in args.writers.split(','):
+        results = {}
+        for write_queue in ('off', 'on'):
+            work_dir = tempfile.mkdtemp(prefix=f"write-queue-bench-{write_queue}-{writers}-")
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', '--threads', writers,
+                 '--duration', str(args.duration), '--users', str(args.users), '--seed', str(args.seed)],
+                env=scenario_env(write_queue, work_dir), cwd=work_dir, check=True, capture_output=True, text=True
+            ).stdout
+            results[write_queue] = json.loads(output.strip().splitlines()[-1])['writes_per_s']
+        print(f"  {writers:<10}{results['off']:>18,.0f}{results['on']:>18,.0f}"
+              f"   x{results['on'] / results['off']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
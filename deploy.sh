@@ -1,5 +1,11 @@
 #!/bin/bash
 
 PORT=8081
+# SERVER_MODE=eventlet (기본, gunicorn + eventlet) 또는 asgi (uvicorn + asyncio)
+export SERVER_MODE=${SERVER_MODE:-eventlet}
 cd ./src
-gunicorn -b 127.0.0.1:${PORT} --worker-class eventlet -w 1 app:app
+if [ "${SERVER_MODE}" = "asgi" ]; then
+    uvicorn asgi:app --host 127.0.0.1 --port ${PORT}
+else
+    gunicorn -b 127.0.0.1:${PORT} --worker-class eventlet -w 1 app:app
+fi
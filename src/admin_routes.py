@@ -1,8 +1,10 @@
 import jwt
 from functools import wraps
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort, Response, stream_with_context
 import admin_service as service
+import sampling_profiler
+from admission import priority, CRITICAL, LOW
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -66,6 +68,7 @@ def index():
     return redirect(url_for('admin.login'))
 
 @admin_bp.route('/login', methods=['GET', 'POST'])
+@priority(CRITICAL)
 def login():
     if request.method == 'POST':
         username = request.form['username']
@@ -107,48 +110,23 @@ def logout():
 @admin_bp.route('/dashboard')
 @admin_required
 def dashboard():
-    return render_template('admin_dashboard.html')
+    stats = service.get_dashboard_stats()
+    return render_template('admin_dashboard.html', stats=stats)
 
 # === 신고 관리 ===
 @admin_bp.route('/report')
+@priority(LOW)
 @admin_required
 def report():
-    reports = service.list_reports()
-    enriched_reports = []
-    for report in reports:
-        target_id = report.target_id
-        # 대상이 상품인지 확인 (service.get_product)
-        product = service.get_product(target_id)
-        if product:
-            target_type = 'product'
-            target_name = product.title
-            target_status = None
-        else:
-            # 대상이 유저인 경우 (service.get_user)
-            user = service.get_user(target_id)
-            if user:
-                target_type = 'user'
-                target_name = user.username
-                target_status = user.status
-            else:
-                target_type = 'unknown'
-                target_name = '알 수 없음'
-                target_status = None
-        enriched_reports.append({
-            'id': report.id,
-            'reporter_id': report.reporter_id,
-            'target_id': target_id,
-            'target_type': target_type,
-            'target_name': target_name,
-            'target_status': target_status,
-            'reason': report.reason
-        })
-    return render_template('admin_report.html', reports=enriched_reports)
+    """신고 대상별 검토 대기열 (점수가 높은 순, cursor로 다음 페이지)"""
+    page = service.get_moderation_queue(request.args.get('cursor'))
+    return render_template('admin_report.html', items=page['items'], next_cursor=page['next_cursor'])
 
 @admin_bp.route('/report/product/delete/<product_id>', methods=['POST'])
 @admin_required
 def report_delete_product(product_id):
     service.remove_product(product_id)
+    service.resolve_report_target(product_id)
     flash("상품이 삭제되었습니다.")
     return redirect(url_for('admin.report'))
 
@@ -156,6 +134,7 @@ def report_delete_product(product_id):
 @admin_required
 def report_suspend_user(user_id):
     service.suspend_user(user_id)
+    service.resolve_report_target(user_id)
     flash("유저가 휴먼 상태로 전환되었습니다.")
     return redirect(url_for('admin.report'))
 
@@ -166,8 +145,17 @@ def report_restore_user(user_id):
     flash("유저가 활성 상태로 복구되었습니다.")
     return redirect(url_for('admin.report'))
 
+@admin_bp.route('/report/resolve/<target_id>', methods=['POST'])
+@admin_required
+def report_resolve(target_id):
+    """조치 없이 검토를 마치고 대상을 대기열에서 내립니다."""
+    service.resolve_report_target(target_id)
+    flash("검토 완료로 처리되었습니다.")
+    return redirect(url_for('admin.report'))
+
 # === 상품 관리 ===
 @admin_bp.route('/products')
+@priority(LOW)
 @admin_required
 def products():
     products = service.list_products()
@@ -182,6 +170,7 @@ def delete_product(product_id):
 
 # === 유저 관리 ===
 @admin_bp.route('/users')
+@priority(LOW)
 @admin_required
 def users():
     users = service.get_user_list()
@@ -203,6 +192,7 @@ def restore_user(user_id):
 
 # === 채팅 관리 ===
 @admin_bp.route('/chats')
+@priority(LOW)
 @admin_required
 def chats():
     chats = service.get_global_chats()
@@ -214,3 +204,81 @@ def delete_chat(chat_id):
     service.remove_chat_message(chat_id)
     flash("채팅 메시지가 삭제되었습니다.")
     return redirect(url_for('admin.chats'))
+
+# === 데이터 내보내기 ===
+@admin_bp.route('/export/<kind>')
+@priority(LOW)
+@admin_required
+def export(kind):
+    """
+    신고/채팅/지갑 거래 내역을 CSV 또는 JSONL로 스트리밍합니다.
+      - since, until: 기간 필터 (ISO 날짜, 날짜만 준 until은 그 날까지 포함)
+      - cursor: 이전 내보내기의 마지막 행 cursor 값 (그 다음 행부터 이어받기)
+    """
+    if kind not in service.EXPORT_KINDS:
+        abort(404)
+    file_format = request.args.get('format', 'csv')
+    if file_format not in service.EXPORT_FORMATS:
+        abort(400)
+    since = service.parse_export_time(request.args.get('since'))
+    until = service.parse_export_time(request.args.get('until'), end=True)
+    after = service.parse_export_cursor(request.args.get('cursor'))
+    rows = service.export_rows(kind, since, until, after)
+    body = service.render_export(kind, rows, file_format)
+    filename = f"{kind}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{file_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=service.EXPORT_FORMATS[file_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+# === 프로파일링 ===
+@admin_bp.route('/profile')
+@admin_required
+def profile():
+    session = sampling_profiler.current()
+    return render_template('admin_profile.html', session=session.status() if session else None,
+                           targets=sampling_profiler.targets(current_app),
+                           default_requests=sampling_profiler.DEFAULT_REQUESTS,
+                           default_interval_ms=sampling_profiler.DEFAULT_INTERVAL_MS)
+
+@admin_bp.route('/profile/start', methods=['POST'])
+@admin_required
+def profile_start():
+    """대상(엔드포인트, URL 규칙 또는 socket:이벤트)과 일치하는 다음 N개 요청의 샘플링 프로파일을 시작합니다."""
+    target = sampling_profiler.resolve_target(current_app, request.form.get('target', '').strip())
+    try:
+        requests = int(request.form.get('requests', sampling_profiler.DEFAULT_REQUESTS))
+        interval_ms = float(request.form.get('interval_ms', sampling_profiler.DEFAULT_INTERVAL_MS))
+    except ValueError:
+        requests = interval_ms = 0
+    if target is None:
+        flash("알 수 없는 프로파일 대상입니다.")
+    elif not 1 <= requests <= 1000 or not 1 <= interval_ms <= 1000:
+        flash("요청 수는 1~1000, 샘플 간격은 1~1000ms 사이여야 합니다.")
+    else:
+        sampling_profiler.start(current_app._get_current_object(), target, requests, interval_ms)
+        flash(f"{target}의 다음 {requests}개 요청을 프로파일합니다.")
+    return redirect(url_for('admin.profile'))
+
+@admin_bp.route('/profile/stop', methods=['POST'])
+@admin_required
+def profile_stop():
+    sampling_profiler.stop(current_app._get_current_object())
+    flash("프로파일을 중지했습니다.")
+    return redirect(url_for('admin.profile'))
+
+@admin_bp.route('/profile/download')
+@admin_required
+def profile_download():
+    """모은 스택을 collapsed stack 형식(flamegraph.pl, speedscope 입력)으로 내려받습니다."""
+    session = sampling_profiler.current()
+    if session is None:
+        abort(404)
+    target = session.target.replace(':', '-')
+    filename = f"profile-{target}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.folded"
+    return Response(
+        session.collapsed(),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
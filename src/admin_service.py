@@ -1,6 +1,18 @@
 # service.py
+import io
+import csv
+import json
+from datetime import datetime, timedelta
+from flask import abort
 import repository
-from utils import sanitize_input, safe_int
+import recent_chats
+import similar_products
+from utils import sanitize_input, safe_int, encode_cursor, decode_cursor
+
+# === 대시보드 관련 서비스 ===
+
+def get_dashboard_stats():
+    return repository.get_dashboard_stats()
 
 # === 사용자 관련 서비스 ===
 
@@ -36,11 +48,57 @@ def remove_product(product_id):
     product_id = sanitize_input(product_id)
     
     repository.delete_product(product_id)
+    similar_products.index.remove(product_id)
 
 # === 신고 관련 서비스 ===
 
-def list_reports():
-    return repository.get_all_reports()
+# 신고 관리 화면의 검토 대기열 페이지 크기
+MODERATION_PAGE_SIZE = 50
+
+def get_moderation_queue(cursor=None):
+    """
+    검토 대기 중인 신고 대상을 점수가 높은 순으로 한 페이지 반환합니다.
+    cursor: 이전 페이지의 next_cursor (형식이 잘못되면 400)
+    """
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        # 커서는 (점수, 대상 ID)
+        if (not after or len(after) != 2 or not isinstance(after[1], str)
+                or not isinstance(after[0], (int, float)) or isinstance(after[0], bool)):
+            abort(400)
+        after = tuple(after)
+    entries, next_after = repository.get_moderation_queue_page(after, MODERATION_PAGE_SIZE)
+    target_ids = [entry.target_id for entry in entries]
+    # 대상이 상품인지 사용자인지 한 번씩만 조회 (대상마다 조회하지 않음)
+    products = repository.get_products_by_ids(target_ids)
+    users = repository.get_users_by_ids(target_ids)
+    items = []
+    for entry in entries:
+        product = products.get(entry.target_id)
+        user = users.get(entry.target_id)
+        if product:
+            target_type, target_name, target_status = 'product', product.title, None
+        elif user:
+            target_type, target_name, target_status = 'user', user.username, user.status
+        else:
+            target_type, target_name, target_status = 'unknown', '알 수 없음', None
+        items.append({
+            'target_id': entry.target_id,
+            'target_type': target_type,
+            'target_name': target_name,
+            'target_status': target_status,
+            'report_count': entry.report_count,
+            'first_reported_at': entry.first_reported_at,
+            'last_reported_at': entry.last_reported_at,
+            'last_reason': entry.last_reason,
+        })
+    return {'items': items, 'next_cursor': encode_cursor(*next_after) if next_after else None}
+
+def resolve_report_target(target_id):
+    target_id = sanitize_input(target_id)
+
+    repository.resolve_moderation_target(target_id)
 
 # === 채팅 관련 서비스 ===
 
@@ -53,5 +111,85 @@ def remove_chat_message(chat_id):
     chat_id = f'{chat_id}' # chat_id를 문자열로 변환
     
     repository.delete_chat_message(chat_id)
+    recent_chats.global_chats.remove(chat_id)
+
+# === 지갑 관련 서비스 ===
+
+# === 내보내기 관련 서비스 ===
+
+# 내보내기 종류 -> (repository의 행 제너레이터 이름, 출력 컬럼)
+# (함수는 호출할 때 찾음: app.py가 blueprint를 불러온 뒤 db_offload로 바꾼 함수를 사용하도록)
+EXPORT_KINDS = {
+    'reports': ('iter_reports', ['id', 'reporter_id', 'target_id', 'reason', 'timestamp']),
+    'chats': ('iter_chats', ['id', 'sender_id', 'recipient_id', 'message', 'timestamp']),
+    'wallet_transactions': ('iter_wallet_transactions',
+                            ['id', 'sender_id', 'recipient_id', 'amount', 'transaction_type', 'timestamp']),
+}
+EXPORT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# 응답 청크 하나에 담을 행 수
+EXPORT_FLUSH_ROWS = 500
+# 스프레드시트에서 수식으로 해석될 수 있는 시작 문자 (CSV injection 방지)
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def parse_export_time(value, end=False):
+    """
+    ISO 형식(예: 2024-01-31 또는 2024-01-31T09:00) 날짜를 DB 비교용 문자열로 변환합니다.
+    end=True이면 기간의 끝(미포함 상한)으로 해석해, 날짜만 준 경우 그 날 전체가 포함되도록 다음 날 0시를 반환합니다.
+    """
+    value = sanitize_input(value).strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_export_cursor(token):
+    """이어받기용 커서를 (timestamp, id)로 변환합니다."""
+    token = sanitize_input(token).strip()
+    if not token:
+        return None
+    values = decode_cursor(token)
+    if not values or len(values) != 2 or not all(isinstance(value, str) for value in values):
+        abort(400)
+    return tuple(values)
+
+def export_rows(kind, since=None, until=None, after=None):
+    """내보낼 행을 dict로 하나씩 반환합니다. 각 행의 cursor 값으로 다음 내보내기를 이어받을 수 있습니다."""
+    name, fields = EXPORT_KINDS[kind]
+    for row in getattr(repository, name)(since, until, after):
+        record = {field: getattr(row, field) for field in fields}
+        record['timestamp'] = row.timestamp.isoformat() if row.timestamp else None
+        record['cursor'] = encode_cursor(row.cursor_timestamp, row.id)
+        yield record
+
+def _csv_safe(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
 
-# === 지갑 관련 서비스 ===
\ No newline at end of file
+def render_export(kind, rows, file_format):
+    """행 제너레이터를 CSV/JSONL 텍스트 청크 제너레이터로 변환합니다."""
+    fields = EXPORT_KINDS[kind][1] + ['cursor']
+    buffer = io.StringIO()
+    if file_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+    pending = 0
+    for record in rows:
+        if file_format == 'csv':
+            writer.writerow([_csv_safe(record[field]) for field in fields])
+        else:
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write('\n')
+        pending += 1
+        if pending >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,167 @@
+# admission.py
+"""
+전역 동시 요청 수 제한(admission control)과 과부하 시 요청 거절(load shedding).
+
+limiter/socketio_rate_limit는 사용자(키)별 제한이라, 많은 사용자가 동시에 몰리면 모든 요청을 받아들이고
+모두의 응답 시간이 함께 늘어납니다. 이 모듈은 HTTP 요청 전체의 동시 실행 수를 ADMISSION_MAX_CONCURRENCY로
+제한하고, 나머지는 대기열에서 기다리게 하며, 감당할 수 없으면 바로 503(Retry-After)으로 거절합니다.
+
+  - 대기열은 ADMISSION_MAX_QUEUE개까지, 대기 시간은 ADMISSION_QUEUE_TIMEOUT_MS까지
+  - 대기 시간의 이동 평균이 ADMISSION_TARGET_WAIT_MS를 넘으면 LOW 요청은, 두 배를 넘으면 NORMAL 요청도
+    대기열에 넣지 않고 바로 거절
+  - 우선순위가 낮을수록 쓸 수 있는 실행 슬롯/대기열이 적고, 슬롯이 나면 높은 우선순위 대기 요청이 먼저 실행
+라우트 우선순위는 @priority(...)로 지정하며, 지정하지 않은 라우트는 NORMAL입니다.
+소켓 이벤트와 정적 파일은 제한하지 않습니다.
+"""
+import time
+import threading
+from collections import Counter
+from flask import request, g
+from werkzeug.exceptions import ServiceUnavailable
+
+# 우선순위 (값이 작을수록 나중에 거절)
+CRITICAL = 0  # 로그인, 송금
+NORMAL = 1
+LOW = 2       # 검색, 관리자 목록/내보내기
+PRIORITY_NAMES = {CRITICAL: 'critical', NORMAL: 'normal', LOW: 'low'}
+
+# 우선순위별로 사용할 수 있는 실행 슬롯과 대기열의 비율
+PRIORITY_SHARE = {CRITICAL: 1.0, NORMAL: 0.75, LOW: 0.5}
+# 대기 시간 이동 평균의 가중치
+WAIT_EWMA_ALPHA = 0.2
+
+
+class Overloaded(ServiceUnavailable):
+    """서버가 감당할 수 있는 요청 수를 넘어 거절할 때 발생합니다. (503, Retry-After)"""
+
+
+def priority(level):
+    """라우트의 우선순위를 지정합니다. (route 데코레이터 바로 아래에 사용)"""
+    def decorator(func):
+        func.admission_priority = level
+        return func
+    return decorator
+
+
+class AdmissionController:
+    """
+    max_concurrency개까지 동시에 실행하고, 나머지는 max_queue개까지 queue_timeout_ms 동안 기다리게 합니다.
+    max_concurrency가 0이면 모든 요청을 받아들입니다.
+    """
+
+    def __init__(self, max_concurrency=0, max_queue=None, queue_timeout_ms=500, target_wait_ms=50, retry_after=1):
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = Counter()
+        self.wait_ewma_ms = 0.0
+        self.admitted = Counter()
+        self.rejected = Counter()
+        self.configure(max_concurrency, max_queue, queue_timeout_ms, target_wait_ms, retry_after)
+
+    def configure(self, max_concurrency, max_queue=None, queue_timeout_ms=500, target_wait_ms=50, retry_after=1):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_concurrency * 2 if max_queue is None else max_queue
+        self.queue_timeout_ms = queue_timeout_ms
+        self.target_wait_ms = target_wait_ms
+        self.retry_after = retry_after
+
+    @property
+    def enabled(self):
+        return self.max_concurrency > 0
+
+    def _slots(self, level):
+        return max(1, int(self.max_concurrency * PRIORITY_SHARE[level]))
+
+    def _can_run(self, level):
+        # 슬롯이 있어도 더 높은 우선순위 요청이 기다리고 있으면 양보
+        return (self.in_flight < self._slots(level)
+                and not any(self.waiting[other] for other in self.waiting if other < level))
+
+    def _shed(self, level):
+        """대기 시간이 목표를 넘으면 낮은 우선순위부터 대기열에 넣지 않고 거절"""
+        if level == CRITICAL or not self.target_wait_ms:
+            return False
+        return self.wait_ewma_ms > self.target_wait_ms * (1 if level == LOW else 2)
+
+    def _record_wait(self, wait_ms):
+        self.wait_ewma_ms += WAIT_EWMA_ALPHA * (wait_ms - self.wait_ewma_ms)
+
+    def acquire(self, level=NORMAL):
+        """실행 슬롯을 얻으면 True, 거절해야 하면 False를 반환합니다. (True면 release를 호출해야 함)"""
+        if not self.enabled:
+            return True
+        started = time.monotonic()
+        with self.condition:
+            if not self._can_run(level):
+                queue_limit = int(self.max_queue * PRIORITY_SHARE[level])
+                if self._shed(level) or sum(self.waiting.values()) >= queue_limit:
+                    self.rejected[level] += 1
+                    return False
+                deadline = started + self.queue_timeout_ms / 1000
+                self.waiting[level] += 1
+                try:
+                    while not self._can_run(level):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self.condition.wait(remaining):
+                            if self._can_run(level):
+                                break
+                            self._record_wait((time.monotonic() - started) * 1000)
+                            self.rejected[level] += 1
+                            return False
+                finally:
+                    self.waiting[level] -= 1
+            self.in_flight += 1
+            self.admitted[level] += 1
+            self._record_wait((time.monotonic() - started) * 1000)
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'in_flight': self.in_flight,
+                'waiting': sum(self.waiting.values()),
+                'wait_ewma_ms': round(self.wait_ewma_ms, 1),
+                'admitted': {PRIORITY_NAMES[level]: count for level, count in self.admitted.items()},
+                'rejected': {PRIORITY_NAMES[level]: count for level, count in self.rejected.items()},
+            }
+
+
+controller = AdmissionController()
+
+
+def register_admission_control(app):
+    """
+    app.config 설정으로 전역 admission control을 활성화합니다.
+      - ADMISSION_MAX_CONCURRENCY: 동시에 실행할 최대 요청 수 (0이면 사용하지 않음)
+      - ADMISSION_MAX_QUEUE: 대기열 길이 (기본 동시 실행 수의 2배)
+      - ADMISSION_QUEUE_TIMEOUT_MS: 대기열에서 기다릴 최대 시간
+      - ADMISSION_TARGET_WAIT_MS: 대기 시간 목표 (넘으면 낮은 우선순위부터 거절, 0이면 사용하지 않음)
+      - ADMISSION_RETRY_AFTER: 거절 응답의 Retry-After(초)
+    """
+    max_queue = app.config.get('ADMISSION_MAX_QUEUE')
+    controller.configure(
+        int(app.config.get('ADMISSION_MAX_CONCURRENCY') or 0),
+        int(max_queue) if max_queue else None,
+        float(app.config.get('ADMISSION_QUEUE_TIMEOUT_MS') or 500),
+        float(app.config.get('ADMISSION_TARGET_WAIT_MS') or 0),
+        int(app.config.get('ADMISSION_RETRY_AFTER') or 1),
+    )
+
+    @app.before_request
+    def admit_request():
+        if not controller.enabled or request.endpoint in (None, 'static'):
+            return
+        view = app.view_functions.get(request.endpoint)
+        if not controller.acquire(getattr(view, 'admission_priority', NORMAL)):
+            raise Overloaded(retry_after=controller.retry_after)
+        g._admission_slot = True
+
+    @app.teardown_request
+    def release_request(exception):
+        if g.pop('_admission_slot', False):
+            controller.release()
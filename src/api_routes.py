@@ -0,0 +1,141 @@
+# api_routes.py
+"""
+JSON API (/api/v1). 템플릿 없이 필요한 필드만 JSON으로 반환합니다.
+
+  - 인증: Authorization: Bearer <jwt> 헤더 또는 jwt 쿠키 (실패하면 401 JSON)
+  - 목록은 {'data': [...], 'next_cursor': ...} 형식이며, next_cursor를 cursor 파라미터로 넘기면 다음 페이지
+  - fields=id,title,price 처럼 필드를 고르면 repository가 해당 컬럼만 조회 (id는 항상 포함)
+    채팅은 최근 메시지 버퍼/보관 파일/DB에서 읽어 합치므로 전체 메시지를 읽고 응답에서만 필드를 고름
+  - 시각은 모두 ISO 8601 문자열 (UTC, 시간대 표기 없음)
+  - limit: 페이지 크기 (기본 20, 최대 100)
+"""
+from datetime import datetime, timezone
+from functools import wraps
+from flask import Blueprint, request, jsonify
+import user_service as service
+from admission import priority, LOW
+from user_routes import decode_token
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+def api_login_required(func):
+    """login_required와 같지만 로그인 페이지로 이동하지 않고 JSON 오류를 반환합니다."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if auth_header and auth_header.startswith('Bearer '):
+            token = auth_header.split(" ")[1]
+        else:
+            token = request.cookies.get('jwt')
+        payload = decode_token(token) if token else None
+        if not payload:
+            return api_error("로그인이 필요합니다.", 401)
+        user = service.get_user(payload['user_id'])
+        if not user:
+            return api_error("로그인이 필요합니다.", 401)
+        if user.status == '휴먼':
+            return api_error("해당 계정은 휴먼 상태이므로 이 기능을 사용할 수 없습니다.", 403)
+        request.user = user
+        return func(*args, **kwargs)
+    return wrapper
+
+def serialize(row, fields):
+    """조회한 행에서 선택한 필드만 dict로 만듭니다. (datetime은 ISO 8601 문자열)"""
+    values = row._mapping if hasattr(row, '_mapping') else row
+    item = {}
+    for field in ('id',) + tuple(field for field in fields if field != 'id'):
+        value = values[field]
+        item[field] = value.isoformat() if hasattr(value, 'isoformat') else value
+    return item
+
+def parse_timestamp(value):
+    """DB에서 문자열로 읽은 timestamp를 datetime(UTC, 시간대 없음)으로 바꿉니다. serialize가 ISO 8601로 내보냅니다."""
+    if not isinstance(value, str):
+        return value
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def page_response(rows, fields, next_cursor):
+    return jsonify({'data': [serialize(row, fields) for row in rows], 'next_cursor': next_cursor})
+
+
+# === 상품 ===
+@api_bp.route('/products')
+@priority(LOW)
+@api_login_required
+def products():
+    """상품 검색 (q, min_price, max_price, sort=recent|price_asc|price_desc, cursor, limit, fields)"""
+    fields, error = service.api_fields(request.args.get('fields'), service.PRODUCT_API_FIELDS)
+    if error:
+        return api_error(error, 400)
+    page, error = service.search_products_page(
+        request.args.get('q', ''), request.args.get('min_price'), request.args.get('max_price'),
+        request.args.get('sort', 'recent'), request.args.get('cursor'),
+        service.api_page_size(request.args.get('limit')), fields
+    )
+    if error:
+        return api_error(error, 400)
+    return page_response(page['products'], fields, page['next_cursor'])
+
+@api_bp.route('/products/<product_id>')
+@api_login_required
+def product(product_id):
+    fields, error = service.api_fields(request.args.get('fields'), service.PRODUCT_API_FIELDS)
+    if error:
+        return api_error(error, 400)
+    row = service.get_product_fields(product_id, fields)
+    if row is None:
+        return api_error("상품을 찾을 수 없습니다.", 404)
+    return jsonify({'data': serialize(row, fields)})
+
+
+# === 사용자 ===
+@api_bp.route('/users')
+@priority(LOW)
+@api_login_required
+def users():
+    """휴면이 아닌 사용자 목록 (cursor, limit, fields)"""
+    fields, error = service.api_fields(request.args.get('fields'), service.USER_API_FIELDS)
+    if error:
+        return api_error(error, 400)
+    page, error = service.get_users_page(
+        request.args.get('cursor'), service.api_page_size(request.args.get('limit')), fields
+    )
+    if error:
+        return api_error(error, 400)
+    return page_response(page['users'], fields, page['next_cursor'])
+
+@api_bp.route('/users/<user_id>')
+@api_login_required
+def user(user_id):
+    fields, error = service.api_fields(request.args.get('fields'), service.USER_API_FIELDS)
+    if error:
+        return api_error(error, 400)
+    row = service.get_public_user(user_id, fields)
+    if row is None:
+        return api_error("사용자를 찾을 수 없습니다.", 404)
+    return jsonify({'data': serialize(row, fields)})
+
+
+# === 채팅 ===
+@api_bp.route('/chats')
+@api_login_required
+def chats():
+    """채팅 내역 최신순 (with: 대화 상대 ID, 없으면 전역 채팅 / cursor, limit, fields)"""
+    fields, error = service.api_fields(request.args.get('fields'), service.CHAT_API_FIELDS)
+    if error:
+        return api_error(error, 400)
+    page, error = service.get_chat_history(
+        request.user.id, request.args.get('with'), request.args.get('cursor'),
+        service.api_page_size(request.args.get('limit'))
+    )
+    if error:
+        return api_error(error, 400)
+    messages = [dict(message, timestamp=parse_timestamp(message['timestamp'])) for message in page['messages']]
+    return page_response(messages, fields, page['next_cursor'])
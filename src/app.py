@@ -2,17 +2,29 @@
 from dotenv import load_dotenv
 load_dotenv()
 import os
+import functools
 from flask import Flask
 import time
 from flask_socketio import join_room, emit, SocketIO
 from flask_wtf import CSRFProtect
 from flask_wtf.csrf import generate_csrf
 import repository as repository
+import chat_archive
+import recent_chats
+import similar_products
+import fraud
+import db_offload
 import user_service as service
 from admin_routes import admin_bp
 from user_routes import user_bp, login_required, limiter, get_user_id
+from api_routes import api_bp
 from error_handlers import register_error_handlers
 from header_setter import register_headers
+from admission import register_admission_control
+from log_pipeline import configure_logging
+from query_profiler import register_query_profiler, profiled, listen as listen_queries
+from sampling_profiler import sampled
+from broadcast import BroadcastCoalescer
 
 
 app = Flask(__name__)
@@ -22,11 +34,63 @@ app.config['CLIENT_JWT_SECRET_KEY'] = os.environ.get('CLIENT_JWT_SECRET_KEY')
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
 app.config['ADMIN_ID'] = os.environ.get('ADMIN_ID')
 app.config['ADMIN_PW'] = os.environ.get('ADMIN_PW')
+# eventlet(기본, gunicorn) 또는 asgi(uvicorn asgi:app)
+app.config['SERVER_MODE'] = os.environ.get('SERVER_MODE', 'eventlet')
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true') != 'false'
+app.config['COUNTER_RECONCILE_INTERVAL'] = int(os.environ.get('COUNTER_RECONCILE_INTERVAL', 3600))
+app.config['CHAT_RETENTION_DAYS'] = int(os.environ.get('CHAT_RETENTION_DAYS', 0))
+app.config['CHAT_ARCHIVE_DIR'] = os.environ.get('CHAT_ARCHIVE_DIR', 'archive')
+app.config['CHAT_ARCHIVE_INTERVAL'] = int(os.environ.get('CHAT_ARCHIVE_INTERVAL', 600))
+app.config['CHAT_BROADCAST_WINDOW_MS'] = int(os.environ.get('CHAT_BROADCAST_WINDOW_MS', 0))
+app.config['CHAT_BROADCAST_MIN_RATE'] = int(os.environ.get('CHAT_BROADCAST_MIN_RATE', 50))
+app.config['RECENT_GLOBAL_CHATS'] = int(os.environ.get('RECENT_GLOBAL_CHATS', recent_chats.RECENT_CHAT_SIZE))
+# 송금 패턴 검사 주기(초, 0이면 사용하지 않음)와 검사할 최근 기간(시간)
+app.config['FRAUD_SCAN_INTERVAL'] = int(os.environ.get('FRAUD_SCAN_INTERVAL', 600))
+app.config['FRAUD_SCAN_WINDOW_HOURS'] = int(os.environ.get('FRAUD_SCAN_WINDOW_HOURS', 24))
+# 유사 상품 색인을 DB 전체로 다시 만드는 주기(초). 0이면 시작할 때 한 번만
+app.config['SIMILAR_PRODUCTS_REBUILD_INTERVAL'] = int(os.environ.get('SIMILAR_PRODUCTS_REBUILD_INTERVAL', 0))
+# 유사 상품 벡터 차원 수 (늘리면 추천이 정확해지고, 메모리는 차원 하나당 상품마다 1바이트씩 늘어남)
+app.config['SIMILAR_PRODUCTS_DIMENSIONS'] = int(os.environ.get('SIMILAR_PRODUCTS_DIMENSIONS', similar_products.DIMENSIONS))
+app.config['QUERY_PROFILE'] = os.environ.get('QUERY_PROFILE', 'off')
+app.config['QUERY_PROFILE_SAMPLE_RATE'] = os.environ.get('QUERY_PROFILE_SAMPLE_RATE')
+app.config['SLOW_QUERY_MS'] = os.environ.get('SLOW_QUERY_MS')
+app.config['N_PLUS_ONE_THRESHOLD'] = os.environ.get('N_PLUS_ONE_THRESHOLD')
+app.config['QUERY_PROFILE_RAISE'] = os.environ.get('QUERY_PROFILE_RAISE')
+# auto(green thread 서버에서만), on, off
+app.config['DB_OFFLOAD'] = os.environ.get('DB_OFFLOAD', 'auto')
+app.config['DB_OFFLOAD_THREADS'] = int(os.environ.get('DB_OFFLOAD_THREADS', os.environ.get('DB_POOL_SIZE', 5)))
+app.config['DB_OFFLOAD_SLOW_MS'] = float(os.environ.get('DB_OFFLOAD_SLOW_MS', 100))
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_QUEUE_SIZE'] = os.environ.get('LOG_QUEUE_SIZE')
+# category별로 남길 로그 비율 (반복되는 404/429 등)
+app.config['LOG_SAMPLE_RATES'] = os.environ.get('LOG_SAMPLE_RATES', 'http_404=0.1,http_429=0.1,http_503=0.1')
+# 전역 동시 요청 수 제한 (0이면 사용하지 않음)
+app.config['ADMISSION_MAX_CONCURRENCY'] = os.environ.get('ADMISSION_MAX_CONCURRENCY', 0)
+app.config['ADMISSION_MAX_QUEUE'] = os.environ.get('ADMISSION_MAX_QUEUE')
+app.config['ADMISSION_QUEUE_TIMEOUT_MS'] = os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', 500)
+app.config['ADMISSION_TARGET_WAIT_MS'] = os.environ.get('ADMISSION_TARGET_WAIT_MS', 50)
+app.config['ADMISSION_RETRY_AFTER'] = os.environ.get('ADMISSION_RETRY_AFTER', 1)
 csrf = CSRFProtect(app)
 
+configure_logging(app, user_key=get_user_id)
 limiter.init_app(app)
 register_error_handlers(app)
 register_headers(app)
+register_admission_control(app)
+register_query_profiler(app, repository.engine)
+for chat_engine in repository.chat_engines:
+    listen_queries(chat_engine)
+
+# repository 호출을 네이티브 스레드 풀에서 실행 (sqlite3 호출이 eventlet 허브를 막지 않도록)
+# (ASGI 모드는 asyncio 이벤트 루프이므로 사용하지 않음)
+db_offload.configure('off' if app.config['SERVER_MODE'] == 'asgi' else app.config['DB_OFFLOAD'],
+                     app.config['DB_OFFLOAD_THREADS'], app.config['DB_OFFLOAD_SLOW_MS'])
+if db_offload.config['enabled']:
+    # WRITE_QUEUE를 써도 쓰기 함수를 옮김 (writer 스레드의 Future는 네이티브 잠금이므로 tpool 스레드에서 기다림)
+    db_offload.install(repository, db_offload.public_functions(
+        repository, exclude=('init_db', 'close_db', 'close_write_queues')
+    ))
+    db_offload.install(chat_archive, ['get_history_page'])
 
 @app.context_processor
 def inject_csrf_token():
@@ -35,6 +99,7 @@ def inject_csrf_token():
 # Blueprints 등록
 app.register_blueprint(admin_bp)
 app.register_blueprint(user_bp)
+app.register_blueprint(api_bp)
 
 @app.teardown_appcontext
 def close_connection(exception):
@@ -43,56 +108,152 @@ def close_connection(exception):
 
 
 # SocketIO 설정
-socketio = SocketIO(app)
+# ASGI 모드에서는 asgi.py의 AsyncServer가 소켓 이벤트와 주기 작업을 처리하므로 eventlet을 사용하지 않음
+socketio = SocketIO(app, async_mode='threading' if app.config['SERVER_MODE'] == 'asgi' else None)
+
+# 전역 채팅 broadcast (메시지가 몰리면 CHAT_BROADCAST_WINDOW_MS 동안 모아 'messages' 이벤트로 전송)
+global_chat_broadcaster = BroadcastCoalescer(
+    socketio.emit, socketio.start_background_task, socketio.sleep,
+    app.config['CHAT_BROADCAST_WINDOW_MS'], app.config['CHAT_BROADCAST_MIN_RATE']
+)
+
+# === 주기 작업 ===
+def reconcile_counters():
+    """관리자 대시보드 집계값을 실제 테이블과 주기적으로 맞춥니다."""
+    while True:
+        socketio.sleep(app.config['COUNTER_RECONCILE_INTERVAL'])
+        try:
+            repository.recompute_counters()
+        except Exception:
+            app.logger.exception("Failed to recompute dashboard counters")
+
+def archive_old_chats():
+    """보관 기간이 지난 채팅 메시지를 월별 보관 파일로 주기적으로 옮깁니다."""
+    while True:
+        socketio.sleep(app.config['CHAT_ARCHIVE_INTERVAL'])
+        try:
+            chat_archive.archive_old_chats(sleep=socketio.sleep)
+        except Exception:
+            app.logger.exception("Failed to archive old chat messages")
+
+def warm_recent_chats():
+    """최근 전역 메시지 버퍼를 DB에서 채웁니다. (실패하면 처음 읽을 때 다시 시도)"""
+    try:
+        recent_chats.global_chats.warm()
+    except Exception:
+        app.logger.exception("Failed to load recent global chat messages")
+
+def scan_wallet_fraud():
+    """
+    최근 송금 원장에서 의심 패턴을 찾아 신고 대기열에 올리고, 송금 속도 기록을 정리합니다.
+    패턴 검사(NumPy)만 db_offload로 허브 밖에서 실행하고, 신고는 이 green thread에서 repository 함수로 올립니다.
+    """
+    while True:
+        socketio.sleep(app.config['FRAUD_SCAN_INTERVAL'])
+        try:
+            findings = db_offload.call('fraud.find_recent_suspicious_transfers', fraud.find_recent_suspicious_transfers)
+            fraud.report_findings(findings)
+            fraud.transfer_windows.prune(service.TRANSFER_LIMITS.window)
+        except Exception:
+            app.logger.exception("Failed to scan wallet transfers")
+
+def rebuild_similar_products():
+    """
+    유사 상품 색인을 만들고, 설정한 주기마다 다시 만듭니다.
+    벡터화/묶음 만들기(build)만 db_offload로 허브 밖에서 실행하고, 색인 잠금을 잡는 교체는 이 green thread에서 합니다.
+    (네이티브 스레드가 green 잠금을 기다리거나 그 반대가 되면 멈추므로)
+    """
+    while True:
+        try:
+            similar_products.index.rebuild(offload=functools.partial(db_offload.call, 'similar_products.build'))
+        except Exception:
+            app.logger.exception("Failed to rebuild similar product index")
+        if app.config['SIMILAR_PRODUCTS_REBUILD_INTERVAL'] <= 0:
+            return
+        socketio.sleep(app.config['SIMILAR_PRODUCTS_REBUILD_INTERVAL'])
+
+chat_archive.configure(app.config['CHAT_RETENTION_DAYS'], app.config['CHAT_ARCHIVE_DIR'])
+recent_chats.global_chats.configure(app.config['RECENT_GLOBAL_CHATS'])
+similar_products.index.configure(app.config['SIMILAR_PRODUCTS_DIMENSIONS'])
+fraud.configure(app.config['FRAUD_SCAN_WINDOW_HOURS'])
+if app.config['SERVER_MODE'] != 'asgi':
+    socketio.start_background_task(warm_recent_chats)
+    if similar_products.available():
+        socketio.start_background_task(rebuild_similar_products)
+    if app.config['FRAUD_SCAN_INTERVAL'] > 0 and fraud.available():
+        socketio.start_background_task(scan_wallet_fraud)
+    if app.config['COUNTER_RECONCILE_INTERVAL'] > 0:
+        socketio.start_background_task(reconcile_counters)
+    if app.config['CHAT_RETENTION_DAYS'] > 0:
+        socketio.start_background_task(archive_old_chats)
 
 socketio_rate_limits = {}
 
+def socket_rate_limited(key, limit=20, window=60):
+    """key의 최근 window초 이벤트 수가 limit 이상이면 True, 아니면 이번 이벤트를 기록하고 False"""
+    if not app.config['RATELIMIT_ENABLED']:
+        return False
+    now = time.time()
+    log = socketio_rate_limits.get(key, [])
+    log = [ts for ts in log if ts > now - window]  # 윈도우 내 요청만 유지
+    if len(log) >= limit:
+        return True
+    log.append(now)
+    socketio_rate_limits[key] = log
+    return False
+
 def socketio_rate_limit(key_func, limit=20, window=60):
     def decorator(f):
         def wrapper(*args, **kwargs):
-            key = key_func()
-            now = time.time()
-            log = socketio_rate_limits.get(key, [])
-            log = [ts for ts in log if ts > now - window]  # 윈도우 내 요청만 유지
-            if len(log) >= limit:
+            if socket_rate_limited(key_func(), limit, window):
                 emit("error", {"message": "Too many messages, please slow down."})
                 return
-            log.append(now)
-            socketio_rate_limits[key] = log
             return f(*args, **kwargs)
         return wrapper
     return decorator
 
+def history_payload(entries):
+    """최근 전역 메시지를 'message' 이벤트와 같은 형식의 목록으로 변환 ('history' 이벤트)"""
+    return [{'username': entry['username'], 'message': entry['message']} for entry in entries]
+
 @socketio.on('join')
+@sampled('socket:join')
+@profiled('socket:join')
 @login_required
 @socketio_rate_limit(lambda: get_user_id(), limit=5, window=60)
 def handle_join(data):
     user_id = data.get('user_id')
     if user_id:
         join_room(user_id)
-        print(f"User {user_id} joined their personal room.")
+        app.logger.info("User joined their personal room", extra={'category': 'socket_join', 'room': user_id})
+        # 최근 전역 메시지는 DB 대신 메모리 버퍼에서 전송
+        emit('history', history_payload(service.get_global_chats()))
 
 @socketio.on('send_message')
+@sampled('socket:send_message')
+@profiled('socket:send_message')
 @login_required
 @socketio_rate_limit(lambda: get_user_id(), limit=20, window=60)
 def handle_send_message(data):
     """
     전역 채팅 메시지 처리:
       - DB 저장 (recipient_id: 'global')
-      - 모든 클라이언트에 broadcast (username 포함)
+      - 모든 클라이언트에 broadcast (username 포함, 메시지가 몰리면 묶어서 전송)
     """
     sender_id = data.get('sender_id')
     message = data.get('message')
     if sender_id and message:
-        message, error = service.save_global_chat_message(sender_id, message)
-        sender = service.get_user(sender_id)
-        username = sender.username if sender else sender_id
+        entry, error = service.save_global_chat_message(sender_id, message)
         if error:
+            sender = service.get_user(sender_id)
+            username = sender.username if sender else sender_id
             emit('message', {'username': username, 'message': error}, broadcast=True)
             return
-        emit('message', {'username': username, 'message': message}, broadcast=True)
+        global_chat_broadcaster.publish({'username': entry['username'], 'message': entry['message']})
 
 @socketio.on('private_message')
+@sampled('socket:private_message')
+@profiled('socket:private_message')
 @login_required
 @socketio_rate_limit(lambda: get_user_id(), limit=20, window=60)
 def handle_private_message(data):
@@ -0,0 +1,195 @@
+# asgi.py
+"""
+ASGI 실행 모드 (deploy.sh에서 SERVER_MODE=asgi):
+
+    SERVER_MODE=asgi uvicorn asgi:app --host 127.0.0.1 --port 8081
+
+  - Socket.IO 이벤트는 python-socketio AsyncServer의 async 핸들러가 처리하고,
+    DB 접근은 async_repository(aiosqlite)를 사용해 이벤트 루프를 막지 않습니다.
+  - HTTP 라우트(user_routes, admin_routes)는 기존 Flask 앱을 a2wsgi WSGIMiddleware로 감싸
+    스레드 풀(WSGI_THREADS개)에서 실행하므로 동기 repository 호출이 이벤트 루프를 막지 않습니다.
+  - 핸들러의 동작(인증, 전송 제한, 검증, 응답 형식)은 app.py의 eventlet 모드와 같습니다.
+"""
+import os
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+import asyncio
+import socketio
+from a2wsgi import WSGIMiddleware
+from werkzeug.http import parse_cookie
+from app import app as flask_app, socket_rate_limited, history_payload
+from user_routes import decode_token
+import repository
+import async_repository
+import chat_archive
+import recent_chats
+import similar_products
+import fraud
+import user_service as service
+from utils import sanitize_input
+from broadcast import AsyncBroadcastCoalescer
+
+# Flask 라우트를 실행할 스레드 수
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 10))
+
+sio = socketio.AsyncServer(async_mode='asgi')
+global_chat_broadcaster = AsyncBroadcastCoalescer(
+    sio.emit, sio.start_background_task, sio.sleep,
+    flask_app.config['CHAT_BROADCAST_WINDOW_MS'], flask_app.config['CHAT_BROADCAST_MIN_RATE']
+)
+
+# === 인증 ===
+
+def token_from_environ(environ):
+    """login_required와 같은 순서로 Authorization 헤더, jwt 쿠키에서 토큰을 찾습니다."""
+    auth_header = environ.get('HTTP_AUTHORIZATION')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(" ")[1]
+    return parse_cookie(environ.get('HTTP_COOKIE', '')).get('jwt')
+
+async def authenticated_user_id(sid):
+    """
+    연결 시 확인한 사용자가 지금도 이벤트를 보낼 수 있는지 확인합니다.
+    (login_required처럼 이벤트마다 휴면 상태를 다시 확인)
+    """
+    session = await sio.get_session(sid)
+    user_id = session.get('user_id')
+    if not user_id:
+        return None
+    user = await async_repository.get_user_by_id(user_id)
+    if user and user.status == repository.SUSPENDED_STATUS:
+        return None
+    return user_id
+
+async def rate_limited(sid, user_id, limit):
+    if socket_rate_limited(user_id, limit, 60):
+        await sio.emit("error", {"message": "Too many messages, please slow down."}, to=sid)
+        return True
+    return False
+
+async def sender_name(sender_id):
+    sender = await async_repository.get_user_by_id(sender_id)
+    return sender.username if sender else sender_id
+
+# === 소켓 이벤트 ===
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    token = token_from_environ(environ)
+    if not token:
+        return False
+    with flask_app.app_context():
+        payload = decode_token(token)
+    if not payload:
+        return False
+    await sio.save_session(sid, {'user_id': payload.get('user_id')})
+
+@sio.on('join')
+async def handle_join(sid, data):
+    user_id = await authenticated_user_id(sid)
+    if not user_id or await rate_limited(sid, user_id, 5):
+        return
+    room = data.get('user_id')
+    if room:
+        await sio.enter_room(sid, room)
+        flask_app.logger.info("User joined their personal room", extra={'category': 'socket_join', 'room': room})
+        await sio.emit('history', history_payload(recent_chats.global_chats.latest(50)), to=sid)
+
+@sio.on('send_message')
+async def handle_send_message(sid, data):
+    """전역 채팅 메시지 처리 (app.handle_send_message와 동일)"""
+    user_id = await authenticated_user_id(sid)
+    if not user_id or await rate_limited(sid, user_id, 20):
+        return
+    sender_id = sanitize_input(data.get('sender_id'))
+    message = data.get('message')
+    if sender_id and message:
+        message = sanitize_input(message)
+        error = service.check_chat_message(message)
+        if not error:
+            entry = await async_repository.create_global_chat_message(sender_id, message)
+        username = await sender_name(sender_id)
+        if error:
+            await sio.emit('message', {'username': username, 'message': error})
+            return
+        entry['username'] = username
+        recent_chats.global_chats.append(entry)
+        await global_chat_broadcaster.publish({'username': username, 'message': entry['message']})
+
+@sio.on('private_message')
+async def handle_private_message(sid, data):
+    """1:1 채팅 메시지 처리 (app.handle_private_message와 동일)"""
+    user_id = await authenticated_user_id(sid)
+    if not user_id or await rate_limited(sid, user_id, 20):
+        return
+    sender_id = sanitize_input(data.get('sender_id'))
+    recipient_id = sanitize_input(data.get('recipient_id'))
+    message = data.get('message')
+    if recipient_id and message:
+        message = sanitize_input(message)
+        error = service.check_chat_message(message)
+        if not error:
+            message = (await async_repository.create_chat_message(sender_id, recipient_id, message))['message']
+        payload = {'username': await sender_name(sender_id), 'message': error or message}
+        await sio.emit('private_message', payload, room=recipient_id)
+        await sio.emit('private_message', payload, room=sender_id)
+
+# === 주기 작업 ===
+# 동기 repository/보관 작업은 스레드에서 실행해 이벤트 루프를 막지 않음
+
+async def reconcile_counters():
+    while True:
+        await sio.sleep(flask_app.config['COUNTER_RECONCILE_INTERVAL'])
+        try:
+            await asyncio.to_thread(repository.recompute_counters)
+        except Exception:
+            flask_app.logger.exception("Failed to recompute dashboard counters")
+
+async def archive_old_chats():
+    while True:
+        await sio.sleep(flask_app.config['CHAT_ARCHIVE_INTERVAL'])
+        try:
+            await asyncio.to_thread(chat_archive.archive_old_chats)
+        except Exception:
+            flask_app.logger.exception("Failed to archive old chat messages")
+
+async def scan_wallet_fraud():
+    while True:
+        await sio.sleep(flask_app.config['FRAUD_SCAN_INTERVAL'])
+        try:
+            await asyncio.to_thread(fraud.scan_transfers)
+            fraud.transfer_windows.prune(service.TRANSFER_LIMITS.window)
+        except Exception:
+            flask_app.logger.exception("Failed to scan wallet transfers")
+
+async def rebuild_similar_products():
+    while True:
+        try:
+            await asyncio.to_thread(similar_products.index.rebuild)
+        except Exception:
+            flask_app.logger.exception("Failed to rebuild similar product index")
+        if flask_app.config['SIMILAR_PRODUCTS_REBUILD_INTERVAL'] <= 0:
+            return
+        await sio.sleep(flask_app.config['SIMILAR_PRODUCTS_REBUILD_INTERVAL'])
+
+async def startup():
+    try:
+        await asyncio.to_thread(recent_chats.global_chats.warm)
+    except Exception:
+        flask_app.logger.exception("Failed to load recent global chat messages")
+    if similar_products.available():
+        sio.start_background_task(rebuild_similar_products)
+    if flask_app.config['FRAUD_SCAN_INTERVAL'] > 0 and fraud.available():
+        sio.start_background_task(scan_wallet_fraud)
+    if flask_app.config['COUNTER_RECONCILE_INTERVAL'] > 0:
+        sio.start_background_task(reconcile_counters)
+    if flask_app.config['CHAT_RETENTION_DAYS'] > 0:
+        sio.start_background_task(archive_old_chats)
+
+
+app = socketio.ASGIApp(
+    sio,
+    other_asgi_app=WSGIMiddleware(flask_app, workers=WSGI_THREADS),
+    on_startup=startup,
+    on_shutdown=async_repository.close_db,
+)
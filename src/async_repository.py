@@ -0,0 +1,74 @@
+# async_repository.py
+"""
+ASGI 모드(asgi.py)에서 소켓 핸들러가 사용하는 repository.py 함수의 비동기 버전입니다.
+SQLAlchemy async engine (SQLite는 aiosqlite, PostgreSQL은 asyncpg)을 사용하므로 DB 대기 중에도 이벤트 루프가 다른 연결을 처리합니다.
+모델, id 생성, 집계값 갱신, 채팅 DB 선택은 repository.py의 것을 그대로 사용합니다.
+"""
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import repository
+from repository import User
+
+# DB 종류별 async 드라이버
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+def _async_url(database_url):
+    """repository.DATABASE_URL과 같은 DB를 가리키는 async 드라이버 URL"""
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+def _create_engine(url):
+    # 커넥션 풀 설정은 동기 엔진과 같은 환경 변수를 사용
+    new_engine = create_async_engine(
+        _async_url(url),
+        **{key: value for key, value in repository._engine_options(url).items() if key != 'connect_args'}
+    )
+    if new_engine.dialect.name == 'sqlite':
+        # WAL/busy_timeout 설정은 동기 엔진과 동일하게 적용
+        event.listen(new_engine.sync_engine, 'connect', repository._set_sqlite_pragma)
+    return new_engine
+
+engine = _create_engine(repository.DATABASE_URL)
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+# 채팅 DB (repository.chat_engines와 같은 DB와 순서)
+chat_engines = [
+    engine if chat_engine is repository.engine
+    else _create_engine(chat_engine.url.render_as_string(hide_password=False))
+    for chat_engine in repository.chat_engines
+]
+ChatSessions = [async_sessionmaker(chat_engine, expire_on_commit=False) for chat_engine in chat_engines]
+
+
+async def close_db():
+    for chat_engine in chat_engines:
+        if chat_engine is not engine:
+            await chat_engine.dispose()
+    await engine.dispose()
+
+# --------------------- 사용자 관련 함수 ---------------------
+
+async def get_user_by_id(user_id):
+    async with SessionLocal() as session:
+        result = await session.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+# --------------------- 채팅 관련 함수 ---------------------
+
+async def create_chat_message(sender_id, recipient_id, message):
+    """repository.create_chat_message와 같이 저장한 메시지(dict)를 반환합니다."""
+    async with ChatSessions[repository._chat_shard(sender_id, recipient_id)]() as session:
+        new_chat, entry = repository._new_chat(sender_id, recipient_id, message)
+        session.add(new_chat)
+        # 집계값 갱신은 동기 세션용 함수를 같은 트랜잭션에서 실행
+        await session.run_sync(repository._increment_counter, 'chats')
+        await session.commit()
+        return entry
+
+async def create_global_chat_message(sender_id, message):
+    # 전역 채팅의 경우 recipient_id에 "global"을 사용
+    return await create_chat_message(sender_id, "global", message)
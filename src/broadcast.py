@@ -0,0 +1,82 @@
+# broadcast.py
+"""
+전역 채팅 broadcast 묶음 전송(coalescing).
+
+메시지가 몰릴 때(초당 min_rate개 이상) 메시지마다 모든 클라이언트에 'message' 이벤트를 보내는 대신
+window_ms 동안 모은 메시지를 하나의 'messages' 이벤트(목록)로 보냅니다.
+직렬화와 전송 시스템 호출이 클라이언트마다 메시지 수가 아닌 묶음 수만큼만 일어납니다.
+전송량이 적을 때와 window_ms가 0(기본값)일 때는 지금처럼 메시지마다 바로 보냅니다.
+"""
+import time
+import threading
+
+# _admit 결과
+SEND_NOW = 'send_now'        # 바로 'message' 이벤트로 전송
+START_BATCH = 'start_batch'  # 새 묶음을 시작했으므로 window 후 전송 작업을 시작
+QUEUED = 'queued'            # 이미 모으는 중인 묶음에 추가됨
+
+
+class BroadcastCoalescer:
+    """
+    eventlet/threading용. emit, start_background_task, sleep은 Flask-SocketIO의 것을 사용합니다.
+    """
+
+    def __init__(self, emit, start_background_task, sleep, window_ms=0, min_rate=50):
+        self.emit = emit
+        self.start_background_task = start_background_task
+        self.sleep = sleep
+        self.window = window_ms / 1000
+        self.min_rate = min_rate
+        self.lock = threading.Lock()
+        self.pending = None
+        # 최근 1초 동안 들어온 메시지 수 (전송 방식 결정용)
+        self.rate_started = time.monotonic()
+        self.rate_count = 0
+
+    def _admit(self, payload):
+        if self.window <= 0:
+            return SEND_NOW
+        now = time.monotonic()
+        with self.lock:
+            if now - self.rate_started >= 1:
+                self.rate_started, self.rate_count = now, 0
+            self.rate_count += 1
+            if self.pending is not None:
+                self.pending.append(payload)
+                return QUEUED
+            if self.rate_count < self.min_rate:
+                return SEND_NOW
+            self.pending = [payload]
+            return START_BATCH
+
+    def _take(self):
+        with self.lock:
+            batch, self.pending = self.pending, None
+        return batch
+
+    def publish(self, payload):
+        """전역 채팅 메시지 하나를 모든 클라이언트에 보냅니다."""
+        action = self._admit(payload)
+        if action == SEND_NOW:
+            self.emit('message', payload)
+        elif action == START_BATCH:
+            self.start_background_task(self._flush)
+
+    def _flush(self):
+        self.sleep(self.window)
+        self.emit('messages', self._take())
+
+
+class AsyncBroadcastCoalescer(BroadcastCoalescer):
+    """ASGI 모드(asgi.py)용. emit과 sleep은 python-socketio AsyncServer의 코루틴을 사용합니다."""
+
+    async def publish(self, payload):
+        action = self._admit(payload)
+        if action == SEND_NOW:
+            await self.emit('message', payload)
+        elif action == START_BATCH:
+            self.start_background_task(self._flush)
+
+    async def _flush(self):
+        await self.sleep(self.window)
+        await self.emit('messages', self._take())
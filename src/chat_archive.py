@@ -0,0 +1,159 @@
+# chat_archive.py
+import os
+import glob
+import zlib
+import sqlite3
+from datetime import datetime, timedelta
+import repository
+
+# 보관 파일 위치: 월별 SQLite 파일 (예: archive/chat-2024-01.db)
+ARCHIVE_FILE_PATTERN = 'chat-{month}.db'
+# 한 번에 옮길 메시지 수 (짧은 트랜잭션으로 나누어 쓰기 작업을 막지 않음)
+ARCHIVE_BATCH_SIZE = 500
+
+config = {
+    'retention_days': 0,
+    'archive_dir': 'archive',
+}
+
+ARCHIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS chat_archive (
+         id TEXT PRIMARY KEY,
+         sender_id TEXT NOT NULL,
+         recipient_id TEXT NOT NULL,
+         message BLOB NOT NULL,  -- 압축한 BLOB 또는 (압축해도 줄지 않으면) 원문 TEXT
+         timestamp TEXT NOT NULL
+       )""",
+    "CREATE INDEX IF NOT EXISTS ix_chat_archive_recipient_timestamp ON chat_archive (recipient_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_archive_sender_recipient_timestamp "
+    "ON chat_archive (sender_id, recipient_id, timestamp, id)",
+]
+
+
+def configure(retention_days, archive_dir):
+    config['retention_days'] = retention_days
+    config['archive_dir'] = archive_dir
+
+def archive_path(month):
+    return os.path.join(config['archive_dir'], ARCHIVE_FILE_PATTERN.format(month=month))
+
+def archive_months():
+    """보관 파일이 있는 월 목록 (최신순)"""
+    prefix, suffix = ARCHIVE_FILE_PATTERN.split('{month}')
+    months = []
+    for path in glob.glob(os.path.join(config['archive_dir'], prefix + '*' + suffix)):
+        name = os.path.basename(path)
+        months.append(name[len(prefix):len(name) - len(suffix)])
+    return sorted(months, reverse=True)
+
+def open_archive(month):
+    os.makedirs(config['archive_dir'], exist_ok=True)
+    conn = sqlite3.connect(archive_path(month))
+    for ddl in ARCHIVE_SCHEMA:
+        conn.execute(ddl)
+    return conn
+
+def compress(message):
+    """
+    메시지를 zlib으로 압축한 BLOB으로 반환하되, 압축해도 줄지 않으면(짧은 메시지 대부분) 원문 TEXT를 그대로 반환합니다.
+    (zlib은 머리말/체크섬으로 6바이트를 더하므로 수십 바이트 메시지는 압축하면 오히려 커짐)
+    """
+    raw = message.encode('utf-8')
+    compressed = zlib.compress(raw, 9)
+    return compressed if len(compressed) < len(raw) else message
+
+def decompress(value):
+    """compress로 저장한 값을 메시지로 되돌립니다. (TEXT는 원문, BLOB은 압축)"""
+    if isinstance(value, str):
+        return value
+    return zlib.decompress(value).decode('utf-8')
+
+# --------------------- 보관(compaction) ---------------------
+
+def archive_old_chats(now=None, sleep=None):
+    """
+    보관 기간이 지난 메시지를 월별 보관 파일로 옮긴 뒤 원본 테이블에서 삭제합니다.
+    ARCHIVE_BATCH_SIZE개씩 (보관 파일 기록 -> 원본 삭제) 순서로 처리하므로
+    중간에 중단되어도 메시지가 유실되지 않으며, 다시 실행하면 이어서 처리합니다.
+    sleep을 주면 배치 사이에 호출해 다른 작업에 실행 기회를 줍니다.
+    """
+    if config['retention_days'] <= 0:
+        return 0
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(days=config['retention_days'])).strftime('%Y-%m-%d %H:%M:%S')
+    archived = 0
+    while True:
+        rows = repository.get_chats_before(cutoff, ARCHIVE_BATCH_SIZE)
+        if not rows:
+            break
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row.cursor_timestamp[:7], []).append(row)
+        for month, month_rows in by_month.items():
+            conn = open_archive(month)
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO chat_archive (id, sender_id, recipient_id, message, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [(row.id, row.sender_id, row.recipient_id, compress(row.message), row.cursor_timestamp)
+                         for row in month_rows]
+                    )
+            finally:
+                conn.close()
+        archived += repository.delete_chats([row.id for row in rows])
+        if sleep:
+            sleep(0)
+    return archived
+
+# --------------------- 조회 ---------------------
+
+def _query_archive(month, user1, user2, before, limit):
+    path = archive_path(month)
+    if not os.path.exists(path):
+        return []
+    if user2 is None:
+        condition, params = "recipient_id = 'global'", []
+    else:
+        condition = "((sender_id = ? AND recipient_id = ?) OR (sender_id = ? AND recipient_id = ?))"
+        params = [user1, user2, user2, user1]
+    if before is not None:
+        condition += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+        params += [before[0], before[0], before[1]]
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(
+            f"SELECT id, sender_id, recipient_id, message, timestamp FROM chat_archive "
+            f"WHERE {condition} ORDER BY timestamp DESC, id DESC LIMIT ?",
+            params + [limit]
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{
+        'id': row[0], 'sender_id': row[1], 'recipient_id': row[2], 'message': decompress(row[3]),
+        'timestamp': row[4], 'cursor_timestamp': row[4]
+    } for row in rows]
+
+def get_history_page(user1=None, user2=None, before=None, limit=50):
+    """
+    대화 내역을 최신순으로 limit개 반환합니다.
+    원본 테이블에서 부족한 만큼은 보관 파일을 최신 월부터 차례로 읽어 채웁니다.
+    """
+    messages = [{
+        'id': row.id, 'sender_id': row.sender_id, 'recipient_id': row.recipient_id, 'message': row.message,
+        'timestamp': row.cursor_timestamp, 'cursor_timestamp': row.cursor_timestamp
+    } for row in repository.get_chat_history_page(user1, user2, before, limit)]
+    if len(messages) >= limit:
+        return messages
+    if messages:
+        before = (messages[-1]['cursor_timestamp'], messages[-1]['id'])
+    for month in archive_months():
+        if before is not None and month > before[0][:7]:
+            continue
+        rows = _query_archive(month, user1, user2, before, limit - len(messages))
+        messages.extend(rows)
+        if len(messages) >= limit:
+            break
+        if rows:
+            before = (rows[-1]['cursor_timestamp'], rows[-1]['id'])
+    return messages
@@ -0,0 +1,117 @@
+# db_offload.py
+"""
+eventlet(green thread) 서버에서 블로킹 DB 호출을 네이티브 스레드 풀(eventlet.tpool)로 옮깁니다.
+
+sqlite3 C 모듈 호출은 eventlet 허브를 막으므로, 느린 조회(get_all_products, get_all_reports 등) 하나가
+실행되는 동안 연결된 모든 Socket.IO 클라이언트가 멈춥니다. install()로 감싼 함수는 tpool 스레드에서 실행되고,
+호출한 green thread만 결과를 기다리므로 허브는 다른 요청과 채팅을 계속 처리합니다.
+
+  - 동시에 옮기는 호출 수는 max_threads개로 제한합니다. (SQLAlchemy 커넥션 풀 크기 이하로 두어
+    네이티브 스레드가 풀의 green 잠금을 기다리는 일이 없도록 함)
+  - 이미 옮겨진 호출 안에서 다시 호출되는 함수는 그 스레드에서 바로 실행합니다.
+  - 이터레이터를 반환하는 함수(iter_*)는 ITER_BATCH_SIZE행씩 tpool에서 읽습니다.
+  - 호출마다 대기 시간(슬롯)과 실행 시간을 stats에 누적하고, 느린 호출은 경고 로그로 남깁니다.
+  - 요청을 샘플링 프로파일하는 중이면 tpool 스레드의 스택도 그 요청의 스택으로 셉니다. (sampling_profiler.follow)
+eventlet이 없거나 monkey patch되지 않은 환경(ASGI 모드, 스크립트)에서는 원래 함수를 그대로 호출합니다.
+"""
+import time
+import logging
+import inspect
+import itertools
+import functools
+import contextvars
+from collections.abc import Iterator
+import sampling_profiler
+
+try:
+    from eventlet import patcher, tpool
+    from eventlet.semaphore import Semaphore
+except ImportError:  # eventlet은 선택 의존성 (ASGI 모드에서는 사용하지 않음)
+    patcher = tpool = Semaphore = None
+
+logger = logging.getLogger(__name__)
+
+# 이터레이터 결과를 tpool에서 한 번에 읽을 행 수
+ITER_BATCH_SIZE = 500
+
+config = {
+    'enabled': False,
+    'max_threads': 5,
+    'slow_ms': 100.0,
+}
+_slots = None
+# tpool 스레드 안에서 실행 중인지 (중첩 호출은 옮기지 않음)
+_inside = contextvars.ContextVar('db_offload_inside', default=False)
+# 함수 이름 -> {'calls', 'wait_ms', 'run_ms', 'max_ms'}
+stats = {}
+
+
+def available():
+    """eventlet으로 thread 모듈이 monkey patch된 green thread 서버인지"""
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+def configure(mode='auto', max_threads=5, slow_ms=100.0):
+    """mode: 'auto'(green thread 서버에서만 사용), 'on', 'off'"""
+    global _slots
+    enabled = available() if mode == 'auto' else mode == 'on'
+    if enabled and tpool is None:
+        logger.warning("DB_OFFLOAD=on이지만 eventlet을 불러올 수 없어 사용하지 않습니다.")
+        enabled = False
+    config.update(enabled=enabled, max_threads=max_threads, slow_ms=slow_ms)
+    _slots = Semaphore(max_threads) if enabled else None
+
+def _record(name, wait_ms, run_ms):
+    entry = stats.setdefault(name, {'calls': 0, 'wait_ms': 0.0, 'run_ms': 0.0, 'max_ms': 0.0})
+    entry['calls'] += 1
+    entry['wait_ms'] += wait_ms
+    entry['run_ms'] += run_ms
+    entry['max_ms'] = max(entry['max_ms'], wait_ms + run_ms)
+    if wait_ms + run_ms >= config['slow_ms']:
+        logger.warning("느린 DB 호출 %s %.1fms (대기 %.1fms, 실행 %.1fms)", name, wait_ms + run_ms, wait_ms, run_ms)
+
+def call(name, func, *args, **kwargs):
+    """func를 tpool 스레드에서 실행하고 결과를 기다립니다. (사용하지 않는 설정이면 바로 실행)"""
+    if not config['enabled'] or _inside.get():
+        return func(*args, **kwargs)
+    queued = time.perf_counter()
+    with _slots:
+        started = time.perf_counter()
+        # 요청의 contextvars(쿼리 기록 등)를 tpool 스레드에서도 사용
+        context = contextvars.copy_context()
+        context.run(_inside.set, True)
+        try:
+            return tpool.execute(context.run, sampling_profiler.follow(func), *args, **kwargs)
+        finally:
+            _record(name, (started - queued) * 1000, (time.perf_counter() - started) * 1000)
+
+def _iter_batches(name, iterator):
+    while True:
+        batch = call(name, lambda: list(itertools.islice(iterator, ITER_BATCH_SIZE)))
+        if not batch:
+            return
+        yield from batch
+
+def offloaded(func):
+    """func 호출을 tpool로 옮기는 함수를 반환합니다."""
+    name = f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = call(name, func, *args, **kwargs)
+        # 제너레이터는 반복할 때 쿼리가 실행되므로 반복도 tpool에서 수행
+        if config['enabled'] and not _inside.get() and isinstance(result, Iterator):
+            return _iter_batches(name, result)
+        return result
+    return wrapper
+
+def install(module, names):
+    """module의 names 함수를 tpool로 옮기는 함수로 바꿉니다. (모듈 내부 호출에도 적용)"""
+    for name in names:
+        setattr(module, name, offloaded(getattr(module, name)))
+
+def public_functions(module, exclude=()):
+    """module에 정의된 공개 함수 이름 목록"""
+    return [
+        name for name, func in inspect.getmembers(module, inspect.isfunction)
+        if func.__module__ == module.__name__ and not name.startswith('_') and name not in exclude
+    ]
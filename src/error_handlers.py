@@ -3,30 +3,37 @@ from flask import render_template, current_app as app
 def register_error_handlers(app):
     @app.errorhandler(400)
     def handle_400(e):
-        app.logger.error(f"400 Bad Request: {e}", exc_info=False)
+        app.logger.error("400 Bad Request: %s", e, extra={'category': 'http_400', 'status': 400})
         return render_template("errors/400.html"), 400
 
     @app.errorhandler(403)
     def handle_403(e):
-        app.logger.error(f"403 Forbidden: {e}", exc_info=False)
+        app.logger.error("403 Forbidden: %s", e, extra={'category': 'http_403', 'status': 403})
         return render_template("errors/403.html"), 403
 
     @app.errorhandler(404)
     def handle_404(e):
-        app.logger.error(f"404 Not Found: {e}", exc_info=False)
+        app.logger.error("404 Not Found: %s", e, extra={'category': 'http_404', 'status': 404})
         return render_template("errors/404.html"), 404
 
     @app.errorhandler(429)
     def handle_429(e):
-        app.logger.error(f"429 Too Many Requests: {e}", exc_info=False)
+        app.logger.error("429 Too Many Requests: %s", e, extra={'category': 'http_429', 'status': 429})
         return render_template("errors/429.html"), 429
 
+    @app.errorhandler(503)
+    def handle_503(e):
+        # 과부하로 요청을 거절한 경우 (admission.Overloaded)
+        app.logger.error("503 Service Unavailable: %s", e, extra={'category': 'http_503', 'status': 503})
+        headers = {'Retry-After': str(e.retry_after)} if getattr(e, 'retry_after', None) else {}
+        return render_template("errors/429.html"), 503, headers
+
     @app.errorhandler(500)
     def handle_500(e):
-        app.logger.error(f"500 Internal Server Error: {e}", exc_info=True)
+        app.logger.error("500 Internal Server Error: %s", e, exc_info=True, extra={'category': 'http_500', 'status': 500})
         return render_template("errors/500.html"), 500
 
     @app.errorhandler(Exception)
     def handle_exception(e):
-        app.logger.error(f"Unhandled Exception: {e}", exc_info=True)
+        app.logger.error("Unhandled Exception: %s", e, exc_info=True, extra={'category': 'http_500', 'status': 500})
         return render_template("errors/500.html"), 500
@@ -0,0 +1,260 @@
+# fraud.py
+"""
+지갑 송금의 이상 거래 탐지.
+
+  - 송금 속도 검사 (요청마다): 보낸 사용자별 최근 송금을 프로세스 내 rolling window로 보관하고,
+    송금 수와 같은 사용자에게 보낸 소액 송금 수를 누적값으로 유지해 DB 조회 없이 O(1)로 검사합니다.
+    (시작 후 처음 검사할 때 DB의 최근 송금으로 채움, 워커가 하나인 배포를 전제)
+  - 거래 패턴 검사 (주기 작업): 최근 FRAUD_SCAN_WINDOW_HOURS시간의 송금 원장을 NumPy 배열로 읽어
+    같은 사용자 쌍의 소액 반복 송금과 2~3명 사이의 순환 송금을 찾고, 관련 사용자를 시스템 신고로 검토 대기열에 올립니다.
+    같은 사용자는 FRAUD_REFLAG_INTERVAL 동안 다시 신고하지 않습니다. (create_report의 동일 대상 제한 사용)
+numpy가 없으면 주기 작업을 사용하지 않습니다.
+"""
+import sys
+import logging
+import threading
+from collections import deque, Counter, namedtuple
+from datetime import datetime, timedelta
+import repository
+
+try:
+    import numpy as np
+except ImportError:  # numpy는 선택 의존성 (없으면 주기 검사를 사용하지 않음)
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# 송금 속도 제한: 기간, 기간 내 최대 송금 수, 소액 기준 금액, 기간 내 같은 사용자에게 보낼 수 있는 최대 소액 송금 수
+TransferLimits = namedtuple('TransferLimits', ['window', 'max_transfers', 'small_amount', 'max_small_to_recipient'])
+
+# 자동 탐지 신고의 신고자 ID와 사유 머리말
+FRAUD_REPORTER_ID = 'system-fraud'
+FRAUD_REASON_PREFIX = '[자동 탐지]'
+# 같은 사용자를 다시 신고하기까지의 기간 (신고 수 제한은 적용하지 않음)
+FRAUD_REFLAG_INTERVAL = timedelta(hours=24)
+FRAUD_REPORT_LIMITS = repository.ReportLimits(FRAUD_REFLAG_INTERVAL, sys.maxsize, sys.maxsize)
+# 같은 사용자 쌍의 소액 송금이 이 수 이상이면 소액 반복 송금으로 판단
+STRUCTURING_MIN_TRANSFERS = 10
+STRUCTURING_SMALL_AMOUNT = 1000
+# 순환 송금으로 볼 사용자 쌍별 최소 송금 합계
+CYCLE_MIN_AMOUNT = 10000
+# 3명 순환 검사에서 만들 최대 경로 수 (넘으면 2명 순환만 검사)
+MAX_CYCLE_PATHS = 5000000
+
+config = {
+    'scan_window_hours': 24,
+}
+
+
+class _SenderWindow:
+    __slots__ = ('events', 'small_by_recipient')
+
+    def __init__(self):
+        self.events = deque()                # (시각, 받는 사용자, 소액 여부)
+        self.small_by_recipient = Counter()  # 기간 내 받는 사용자별 소액 송금 수
+
+
+class TransferWindows:
+    """보낸 사용자별 최근 송금 기록 (오래된 기록은 검사할 때 앞에서부터 제거)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.senders = {}
+        self.warmed = False
+
+    def warm(self, limits):
+        """DB의 최근 limits.window 기간 송금으로 채웁니다. 이미 채웠으면 아무것도 하지 않습니다."""
+        with self.lock:
+            if self.warmed:
+                return
+            since = (datetime.utcnow() - limits.window).strftime('%Y-%m-%d %H:%M:%S')
+            self.senders.clear()
+            for row in repository.iter_wallet_transactions(since=since):
+                if row.transaction_type == 'transfer' and row.sender_id and row.recipient_id:
+                    self._record(row.sender_id, row.recipient_id, row.amount, row.timestamp, limits.small_amount)
+            self.warmed = True
+
+    def _record(self, sender_id, recipient_id, amount, moment, small_amount):
+        window = self.senders.setdefault(sender_id, _SenderWindow())
+        small = amount <= small_amount
+        window.events.append((moment, recipient_id, small))
+        if small:
+            window.small_by_recipient[recipient_id] += 1
+
+    def _expire(self, window, since):
+        events = window.events
+        while events and events[0][0] < since:
+            _, recipient_id, small = events.popleft()
+            if small:
+                window.small_by_recipient[recipient_id] -= 1
+                if not window.small_by_recipient[recipient_id]:
+                    del window.small_by_recipient[recipient_id]
+
+    def admit(self, sender_id, recipient_id, amount, limits, now=None):
+        """
+        송금을 기록하고 None을 반환합니다. 제한을 넘으면 기록하지 않고 넘은 제한 이름을 반환합니다.
+          - 'transfers': 기간 내 송금 수가 max_transfers 이상
+          - 'small_transfers': 기간 내 같은 사용자에게 보낸 소액 송금 수가 max_small_to_recipient 이상
+        """
+        self.warm(limits)
+        now = now or datetime.utcnow()
+        with self.lock:
+            window = self.senders.get(sender_id)
+            if window is not None:
+                self._expire(window, now - limits.window)
+                if len(window.events) >= limits.max_transfers:
+                    return 'transfers'
+                if (amount <= limits.small_amount
+                        and window.small_by_recipient[recipient_id] >= limits.max_small_to_recipient):
+                    return 'small_transfers'
+            self._record(sender_id, recipient_id, amount, now, limits.small_amount)
+            return None
+
+    def release(self, sender_id, recipient_id, amount, limits):
+        """admit로 기록한 송금 중 가장 최근 것을 취소합니다. (송금이 실패했을 때)"""
+        small = amount <= limits.small_amount
+        with self.lock:
+            window = self.senders.get(sender_id)
+            if window is None:
+                return
+            for index in range(len(window.events) - 1, -1, -1):
+                _, event_recipient_id, event_small = window.events[index]
+                if event_recipient_id == recipient_id and event_small == small:
+                    del window.events[index]
+                    if small:
+                        window.small_by_recipient[recipient_id] -= 1
+                        if not window.small_by_recipient[recipient_id]:
+                            del window.small_by_recipient[recipient_id]
+                    return
+
+    def prune(self, window):
+        """기간이 지난 기록만 남은 사용자를 제거합니다. (주기 작업에서 호출)"""
+        since = datetime.utcnow() - window
+        with self.lock:
+            for sender_id in list(self.senders):
+                self._expire(self.senders[sender_id], since)
+                if not self.senders[sender_id].events:
+                    del self.senders[sender_id]
+
+
+transfer_windows = TransferWindows()
+
+
+def configure(scan_window_hours):
+    config['scan_window_hours'] = scan_window_hours
+
+def available():
+    return np is not None
+
+def _load_transfers(since, until=None):
+    """원장의 송금을 (사용자 ID 목록, 보낸 사용자 번호, 받는 사용자 번호, 금액) 배열로 읽습니다."""
+    user_index, senders, recipients, amounts = {}, [], [], []
+    for row in repository.iter_wallet_transactions(since=since, until=until):
+        if row.transaction_type != 'transfer' or not row.sender_id or not row.recipient_id:
+            continue
+        senders.append(user_index.setdefault(row.sender_id, len(user_index)))
+        recipients.append(user_index.setdefault(row.recipient_id, len(user_index)))
+        amounts.append(row.amount)
+    return (list(user_index), np.array(senders, dtype=np.int64), np.array(recipients, dtype=np.int64),
+            np.array(amounts, dtype=np.int64))
+
+def _contains(sorted_keys, keys):
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+def find_suspicious_transfers(since, until=None):
+    """
+    기간 내 송금에서 의심 패턴을 찾아 (종류, 사용자 ID 튜플, 건수, 금액) 목록을 반환합니다.
+      - ('structuring', (보낸 사용자, 받는 사용자), 소액 송금 수, 소액 송금 합계)
+      - ('cycle', (a, b) 또는 (a, b, c), 순환에 참여한 사용자 수, 순환 경로의 최소 쌍별 합계)  a -> b (-> c) -> a
+    """
+    users, senders, recipients, amounts = _load_transfers(since, until)
+    if not len(senders):
+        return []
+    user_count = len(users)
+    # 사용자 쌍별 송금 수/합계 (정렬된 고유 키: 보낸 사용자 * N + 받는 사용자)
+    pairs, inverse = np.unique(senders * user_count + recipients, return_inverse=True)
+    small = amounts <= STRUCTURING_SMALL_AMOUNT
+    small_counts = np.bincount(inverse, weights=small, minlength=len(pairs))
+    small_totals = np.bincount(inverse, weights=np.where(small, amounts, 0), minlength=len(pairs))
+    totals = np.bincount(inverse, weights=amounts, minlength=len(pairs))
+    pair_senders, pair_recipients = pairs // user_count, pairs % user_count
+
+    findings = []
+    for pair in np.flatnonzero(small_counts >= STRUCTURING_MIN_TRANSFERS).tolist():
+        findings.append(('structuring', (users[pair_senders[pair]], users[pair_recipients[pair]]),
+                         int(small_counts[pair]), int(small_totals[pair])))
+
+    # 순환 송금은 합계가 CYCLE_MIN_AMOUNT 이상인 쌍(간선)만 사용 (키 순서 = 보낸 사용자 순서 유지)
+    strong = totals >= CYCLE_MIN_AMOUNT
+    edge_keys, edge_from, edge_to, edge_totals = pairs[strong], pair_senders[strong], pair_recipients[strong], totals[strong]
+    if not len(edge_keys):
+        return findings
+    # a -> b 와 b -> a (회전한 같은 순환은 a < b인 것만)
+    reverse = _contains(edge_keys, edge_to * user_count + edge_from) & (edge_from < edge_to)
+    for edge in np.flatnonzero(reverse).tolist():
+        back = np.searchsorted(edge_keys, edge_to[edge] * user_count + edge_from[edge])
+        findings.append(('cycle', (users[edge_from[edge]], users[edge_to[edge]]), 2,
+                         int(min(edge_totals[edge], edge_totals[back]))))
+
+    # a -> b -> c 경로를 모두 만든 뒤 c -> a 간선이 있는지 검사 (보낸 사용자별 간선 구간으로 펼침)
+    starts = np.searchsorted(edge_from, np.arange(user_count))
+    degrees = np.searchsorted(edge_from, np.arange(user_count), side='right') - starts
+    repeats = degrees[edge_to]
+    if repeats.sum() > MAX_CYCLE_PATHS:
+        logger.warning("송금 경로가 너무 많아 3명 순환 검사를 건너뜁니다. (%d개)", repeats.sum())
+        return findings
+    first = np.repeat(np.arange(len(edge_keys)), repeats)
+    offsets = np.arange(len(first)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    second = starts[edge_to[first]] + offsets
+    a, b, c = edge_from[first], edge_to[first], edge_to[second]
+    closing = c * user_count + a
+    cycles = _contains(edge_keys, closing) & (a < b) & (a < c)
+    for path in np.flatnonzero(cycles).tolist():
+        back = np.searchsorted(edge_keys, closing[path])
+        flow = min(edge_totals[first[path]], edge_totals[second[path]], edge_totals[back])
+        findings.append(('cycle', (users[a[path]], users[b[path]], users[c[path]]), 3, int(flow)))
+    return findings
+
+def _reason(kind, user_ids, count, amount, usernames, hours):
+    names = [usernames.get(user_id, user_id) for user_id in user_ids]
+    if kind == 'structuring':
+        return (f"{FRAUD_REASON_PREFIX} 소액 반복 송금: {names[0]} → {names[1]} {count}건, "
+                f"합계 {amount:,}원 (최근 {hours}시간)")
+    return f"{FRAUD_REASON_PREFIX} 순환 송금: {' → '.join(names + names[:1])}, 최소 {amount:,}원 (최근 {hours}시간)"
+
+def find_recent_suspicious_transfers(now=None):
+    """최근 scan_window_hours시간의 송금에서 의심 패턴을 찾습니다. (find_suspicious_transfers 참고)"""
+    if np is None:
+        return []
+    now = now or datetime.utcnow()
+    since = (now - timedelta(hours=config['scan_window_hours'])).strftime('%Y-%m-%d %H:%M:%S')
+    return find_suspicious_transfers(since)
+
+def report_findings(findings):
+    """
+    찾은 의심 패턴의 사용자를 시스템 신고로 검토 대기열에 올립니다.
+    반환값: 새로 올린 신고 수
+    """
+    hours = config['scan_window_hours']
+    usernames = repository.get_usernames_by_ids({user_id for _, user_ids, _, _ in findings for user_id in user_ids})
+    flagged = 0
+    for kind, user_ids, count, amount in findings:
+        reason = _reason(kind, user_ids, count, amount, usernames, hours)
+        for user_id in user_ids:
+            try:
+                repository.create_report(FRAUD_REPORTER_ID, user_id, reason, FRAUD_REPORT_LIMITS)
+                flagged += 1
+            except repository.ReportLimitExceeded:
+                # FRAUD_REFLAG_INTERVAL 안에 이미 신고한 사용자
+                pass
+    if findings:
+        logger.info("Flagged %d users for suspicious wallet transfers", flagged, extra={'category': 'fraud_scan'})
+    return flagged
+
+def scan_transfers(now=None):
+    """
+    최근 scan_window_hours시간의 송금을 검사해 의심 사용자를 시스템 신고로 검토 대기열에 올립니다.
+    반환값: 새로 올린 신고 수
+    """
+    return report_findings(find_recent_suspicious_transfers(now))
@@ -0,0 +1,212 @@
+# log_pipeline.py
+"""
+요청 스레드를 막지 않는 구조화(JSON) 로그 파이프라인.
+
+로그 호출은 기록(LogRecord)을 크기가 정해진 큐에 넣기만 하고, 별도 스레드가 JSON 한 줄로 만들어 stderr에 씁니다.
+  - 큐가 가득 차면 기다리지 않고 버리며 버린 개수를 센 뒤, 다시 자리가 나면 버린 개수를 경고 로그로 남깁니다.
+  - category가 LOG_SAMPLE_RATES에 있는 기록(예: http_404, http_429)은 그 비율만큼만 남깁니다.
+  - 요청(또는 Socket.IO 이벤트) 중의 기록에는 route, method, path, user_key, latency_ms, query_count를 덧붙입니다.
+eventlet 환경에서도 쓰기 스레드는 monkey patch되지 않은 원래 threading/queue로 실행합니다.
+"""
+import sys
+import json
+import time
+import atexit
+import queue
+import random
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from flask import request, g, has_request_context
+from flask.logging import default_handler
+import query_profiler
+
+try:
+    from eventlet import patcher
+    _native_threading = patcher.original('threading')
+    _native_queue = patcher.original('queue')
+except ImportError:  # eventlet은 선택 의존성
+    import threading as _native_threading
+    import queue as _native_queue
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_SAMPLE_RATES = 'http_404=0.1,http_429=0.1,http_503=0.1'
+# JSON 기록에 포함할 추가 필드 (logger 호출의 extra 또는 요청 정보)
+FIELDS = ('category', 'status', 'route', 'method', 'path', 'user_key', 'latency_ms', 'query_count', 'user_id', 'room')
+_STOP = object()
+
+
+def parse_sample_rates(value):
+    """'http_404=0.1,http_429=0.1' -> {'http_404': 0.1, 'http_429': 0.1}"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            category, rate = item.split('=', 1)
+            rates[category.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """기록을 JSON 한 줄로 만듭니다. (쓰기 스레드에서 실행)"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """category별 비율만큼만 기록을 통과시킵니다. (버린 개수는 sampled_out에 누적)"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = Counter()
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'category', None))
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out[record.category] += 1
+        return False
+
+
+class RequestContextFilter(logging.Filter):
+    """요청 중의 기록에 요청 정보를 덧붙입니다."""
+
+    def __init__(self, user_key=None):
+        super().__init__()
+        self.user_key = user_key
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        event = getattr(request, 'event', None)
+        record.route = f"socket:{event['message']}" if event else request.endpoint
+        record.method = request.method
+        record.path = request.path
+        if self.user_key is not None:
+            try:
+                record.user_key = self.user_key()
+            except Exception:
+                record.user_key = None
+        started = g.get('_log_started')
+        if started is not None:
+            record.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        log = query_profiler.current_log()
+        if log is not None:
+            record.query_count = log.count
+        return True
+
+
+class DroppingQueueHandler(logging.Handler):
+    """기록을 큐에 넣기만 합니다. 큐가 가득 차면 기다리지 않고 버립니다."""
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+        self.dropped = 0
+        self.reported = 0
+
+    def emit(self, record):
+        # 메시지 인자는 지금 합쳐 두고(이후 값이 바뀌어도 되도록), 예외 포맷은 쓰기 스레드에서 수행
+        record.msg = record.getMessage()
+        record.args = None
+        try:
+            if self.dropped > self.reported:
+                self._report_dropped()
+            self.queue.put_nowait(record)
+        except (queue.Full, _native_queue.Full):
+            self.dropped += 1
+
+    def _report_dropped(self):
+        dropped = self.dropped - self.reported
+        self.queue.put_nowait(logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': f"로그 큐가 가득 차 기록 {dropped}개를 버렸습니다.", 'category': 'log_dropped',
+        }))
+        self.reported = self.dropped
+
+
+class LogWriter:
+    """큐의 기록을 handler로 쓰는 스레드"""
+
+    def __init__(self, queue, handler):
+        self.queue = queue
+        self.handler = handler
+        self.thread = _native_threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                return
+            try:
+                self.handler.handle(record)
+            except Exception:
+                self.handler.handleError(record)
+
+    def stop(self):
+        """큐에 남은 기록을 모두 쓴 뒤 종료합니다."""
+        self.queue.put(_STOP)
+        self.thread.join()
+
+
+_handler = None
+_sampling = None
+_writer = None
+
+
+def configure_logging(app, user_key=None):
+    """
+    app.config 설정으로 루트 로거에 비동기 JSON 로그 파이프라인을 연결합니다.
+      - LOG_LEVEL: 기록할 최소 수준 (기본 INFO)
+      - LOG_QUEUE_SIZE: 쓰기를 기다리는 기록의 최대 개수 (넘으면 버림)
+      - LOG_SAMPLE_RATES: category별로 남길 비율 (예: 'http_404=0.1,http_429=0.1')
+    user_key: 요청의 사용자 키를 반환하는 함수 (limiter 키와 동일)
+    """
+    global _handler, _sampling, _writer
+    if _handler is not None:
+        return
+    records = _native_queue.Queue(maxsize=int(app.config.get('LOG_QUEUE_SIZE') or DEFAULT_QUEUE_SIZE))
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    _writer = LogWriter(records, output)
+    atexit.register(_writer.stop)
+
+    _sampling = SamplingFilter(parse_sample_rates(app.config.get('LOG_SAMPLE_RATES', DEFAULT_SAMPLE_RATES)))
+    _handler = DroppingQueueHandler(records)
+    # 샘플링으로 버릴 기록에는 요청 정보를 구하지 않도록 샘플링을 먼저 적용
+    _handler.addFilter(_sampling)
+    _handler.addFilter(RequestContextFilter(user_key))
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(app.config.get('LOG_LEVEL') or 'INFO')
+    # Flask 기본 handler는 요청 스레드에서 바로 쓰므로 제거 (기록은 루트 로거로 전달됨)
+    app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def start_request_timer():
+        g._log_started = time.perf_counter()
+
+def stats():
+    """큐에 쌓인 기록 수, 버린 기록 수, category별 샘플링으로 거른 기록 수"""
+    if _handler is None:
+        return None
+    return {
+        'queued': _handler.queue.qsize(),
+        'dropped': _handler.dropped,
+        'sampled_out': dict(_sampling.sampled_out),
+    }
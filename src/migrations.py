@@ -0,0 +1,90 @@
+# migrations.py
+"""
+기존 DB 파일의 스키마 변경 작업.
+
+create_all은 이미 존재하는 테이블의 컬럼을 바꾸지 않으므로, 컬럼 타입 변경처럼
+기존 데이터를 옮겨야 하는 작업은 여기에 순서대로 추가합니다.
+적용한 작업은 schema_migration 테이블에 기록되어 한 번만 실행됩니다.
+"""
+from sqlalchemy import inspect, text
+
+MIGRATION_TABLE_DDL = (
+    "CREATE TABLE IF NOT EXISTS schema_migration ("
+    " name VARCHAR PRIMARY KEY,"
+    " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+    ")"
+)
+
+
+def _column_types(conn, table):
+    return {column['name']: str(column['type']).upper() for column in inspect(conn).get_columns(table)}
+
+# --------------------- 마이그레이션 정의 ---------------------
+
+def product_integer_price(conn):
+    """
+    product.price를 문자열에서 정수(원 단위)로 바꾸고 created_at 컬럼을 추가합니다.
+    SQLite는 컬럼 타입을 바꿀 수 없으므로 테이블을 새로 만들어 복사합니다.
+    """
+    columns = _column_types(conn, 'product')
+    if columns.get('price') == 'INTEGER' and 'created_at' in columns:
+        # create_all로 새로 만든 DB는 이미 최신 스키마
+        return
+    if conn.dialect.name != 'sqlite':
+        conn.execute(text("ALTER TABLE product ALTER COLUMN price TYPE INTEGER USING CAST(price AS INTEGER)"))
+        conn.execute(text("ALTER TABLE product ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"))
+        return
+    # 새 테이블에서는 rowid가 바뀌므로 검색용 FTS 테이블과 트리거를 지우고 init_product_fts에서 다시 채움
+    for trigger in ('product_fts_insert', 'product_fts_delete', 'product_fts_update'):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text("DROP TABLE IF EXISTS product_fts"))
+    # 이전 실행이 중간에 중단되었다면 남은 임시 테이블부터 정리
+    conn.execute(text("DROP TABLE IF EXISTS product_new"))
+    conn.execute(text(
+        "CREATE TABLE product_new ("
+        " id VARCHAR NOT NULL PRIMARY KEY,"
+        " title VARCHAR NOT NULL,"
+        " description TEXT NOT NULL,"
+        " price INTEGER NOT NULL,"
+        " seller_id VARCHAR NOT NULL,"
+        " created_at DATETIME DEFAULT CURRENT_TIMESTAMP"
+        ")"
+    ))
+    # 기존 상품은 등록 시각을 알 수 없으므로 마이그레이션 시각을 사용 (rowid 순서로 복사해 기존 순서 유지)
+    conn.execute(text(
+        "INSERT INTO product_new (id, title, description, price, seller_id, created_at) "
+        "SELECT id, title, description, CAST(price AS INTEGER), seller_id, CURRENT_TIMESTAMP "
+        "FROM product ORDER BY rowid"
+    ))
+    conn.execute(text("DROP TABLE product"))
+    conn.execute(text("ALTER TABLE product_new RENAME TO product"))
+
+def drop_redundant_id_indexes(conn):
+    """기본 키와 중복되는 ix_<table>_id 인덱스를 삭제합니다. (삽입마다 같은 B-tree를 두 번 갱신하지 않도록)"""
+    for table in ('user', 'product', 'report', 'chat', 'wallet_transaction'):
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_id"))
+
+def drop_report_throttle_indexes(conn):
+    """신고 제한 검사가 report_window 집계를 읽게 되어 쓰지 않는 report 인덱스를 삭제합니다."""
+    for index in ('ix_report_reporter_target_timestamp', 'ix_report_target_timestamp'):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+# 적용 순서대로 나열 (이미 배포된 항목의 이름은 바꾸지 않음)
+MIGRATIONS = [
+    ('0001_product_integer_price', product_integer_price),
+    ('0002_drop_redundant_id_indexes', drop_redundant_id_indexes),
+    ('0003_drop_report_throttle_indexes', drop_report_throttle_indexes),
+]
+
+
+def run(engine):
+    """아직 적용되지 않은 마이그레이션을 순서대로 각각 하나의 트랜잭션에서 실행합니다."""
+    with engine.begin() as conn:
+        conn.execute(text(MIGRATION_TABLE_DDL))
+        applied = set(conn.execute(text("SELECT name FROM schema_migration")).scalars())
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(text("INSERT INTO schema_migration (name) VALUES (:name)"), {'name': name})
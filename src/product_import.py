@@ -0,0 +1,136 @@
+# product_import.py
+import io
+import os
+import csv
+import json
+import argparse
+from itertools import islice
+import repository
+import similar_products
+from utils import sanitize_input
+from user_service import PRODUCT_TITLE_MAX_LENGTH, PRODUCT_DESCRIPTION_MAX_LENGTH, PRODUCT_PRICE_MIN
+
+# 한 번에 검증/삽입할 행 수 (청크마다 하나의 트랜잭션)
+IMPORT_BATCH_SIZE = 5000
+# 결과 화면에 표시할 최대 오류 수 (전체 실패 건수는 따로 집계)
+MAX_REPORTED_ERRORS = 100
+SUPPORTED_FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(filename, default='csv'):
+    """파일 확장자로 형식(csv/jsonl)을 판단합니다."""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+def iter_rows(stream, file_format):
+    """
+    텍스트 스트림에서 (줄 번호, 행 dict 또는 None, 오류 메시지)를 하나씩 읽어 옵니다.
+    파일 전체를 메모리에 올리지 않습니다.
+    """
+    if file_format == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None, "JSON 형식이 올바르지 않습니다."
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, "각 줄은 JSON 객체여야 합니다."
+                continue
+            yield line_no, row, None
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # 헤더가 1번째 줄이므로 데이터 줄 번호는 reader.line_num을 사용
+            yield reader.line_num, row, None
+
+def validate_row(row, seller_id):
+    """add_product와 같은 규칙으로 한 행을 검증하고 (삽입할 dict, 오류 메시지)를 반환합니다."""
+    title = sanitize_input(row.get('title')).strip()
+    description = sanitize_input(row.get('description')).strip()
+    price = row.get('price')
+    if not isinstance(price, int):
+        price = sanitize_input(price).strip()
+
+    if not title:
+        return None, "상품명이 비어있습니다."
+    if len(title) > PRODUCT_TITLE_MAX_LENGTH:
+        return None, f'상품명은 {PRODUCT_TITLE_MAX_LENGTH}자 이내로 작성해 주세요.'
+    if not description:
+        return None, "상품 설명이 비어있습니다."
+    if len(description) > PRODUCT_DESCRIPTION_MAX_LENGTH:
+        return None, f'상품 설명은 {PRODUCT_DESCRIPTION_MAX_LENGTH}자 이내로 작성해 주세요.'
+    try:
+        price = int(price)
+    except (ValueError, TypeError):
+        return None, "가격은 정수여야 합니다."
+    if price < PRODUCT_PRICE_MIN:
+        return None, f'가격은 {PRODUCT_PRICE_MIN} 이상이어야 합니다.'
+    return {'title': title, 'description': description, 'price': price, 'seller_id': seller_id}, None
+
+def import_products(stream, file_format, seller_id, batch_size=IMPORT_BATCH_SIZE):
+    """
+    CSV/JSONL 스트림의 상품을 batch_size 단위로 검증한 뒤 청크별 트랜잭션으로 일괄 삽입합니다.
+    반환값: {'imported': 성공 건수, 'failed': 실패 건수, 'errors': [{'line': 줄 번호, 'error': 사유}, ...]}
+    """
+    if file_format not in SUPPORTED_FORMATS:
+        return {'imported': 0, 'failed': 0, 'errors': [{'line': 0, 'error': "지원하지 않는 파일 형식입니다."}]}
+    seller_id = sanitize_input(seller_id)
+    result = {'imported': 0, 'failed': 0, 'errors': []}
+    rows = iter_rows(stream, file_format)
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            valid = []
+            for line_no, row, error in batch:
+                if row is not None:
+                    record, error = validate_row(row, seller_id)
+                    if record is not None:
+                        valid.append(record)
+                        continue
+                result['failed'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append({'line': line_no, 'error': error})
+            result['imported'] += repository.bulk_create_products(valid)
+            # bulk_create_products가 각 행에 생성한 id를 채움
+            for record in valid:
+                similar_products.index.add(record['id'], record['title'], record['description'])
+    except (UnicodeDecodeError, csv.Error):
+        result['errors'].append({'line': 0, 'error': "파일을 읽을 수 없습니다. UTF-8 CSV 또는 JSONL 파일인지 확인해 주세요."})
+    return result
+
+def import_uploaded_file(file_storage, seller_id, file_format=None):
+    """업로드된 파일(werkzeug FileStorage)을 텍스트 스트림으로 감싸 가져옵니다."""
+    file_format = file_format or detect_format(file_storage.filename)
+    stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+    try:
+        return import_products(stream, file_format, seller_id)
+    finally:
+        stream.detach()
+
+
+if __name__ == '__main__':
+    # 사용 예: python product_import.py products.csv --seller alice
+    parser = argparse.ArgumentParser(description='CSV/JSONL 파일로 상품을 일괄 등록합니다.')
+    parser.add_argument('path', help='가져올 파일 경로')
+    parser.add_argument('--seller', required=True, help='판매자 사용자명')
+    parser.add_argument('--format', choices=SUPPORTED_FORMATS, help='파일 형식 (기본: 확장자로 판단)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    seller = repository.get_user_by_username(args.seller)
+    if not seller:
+        raise SystemExit(f"사용자를 찾을 수 없습니다: {args.seller}")
+    with open(args.path, encoding='utf-8-sig', newline='') as f:
+        summary = import_products(f, args.format or detect_format(args.path), seller.id, args.batch_size)
+    for item in summary['errors']:
+        print(f"line {item['line']}: {item['error']}")
+    print(f"imported={summary['imported']} failed={summary['failed']}")
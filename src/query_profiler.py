@@ -0,0 +1,231 @@
+# query_profiler.py
+import os
+import re
+import time
+import random
+import logging
+import traceback
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from flask import request, g
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# 호출 위치(call site)를 찾을 때 기준이 되는 소스 디렉터리
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# 호출 위치 탐색 시 건너뛸 파일 (프로파일러/저장소 계층 자체)
+SKIP_FILES = ('query_profiler.py', 'repository.py')
+
+# 현재 요청(또는 소켓 이벤트)의 쿼리 기록. 요청마다 독립적으로 유지됩니다.
+_current_log = contextvars.ContextVar('query_log', default=None)
+
+# 설정값 (register_query_profiler에서 app.config로 덮어씀)
+config = {
+    'enabled': False,
+    'sample_rate': 1.0,
+    'slow_query_ms': 100.0,
+    'n_plus_one_threshold': 5,
+    'raise_on_n_plus_one': False,
+}
+
+
+class NPlusOneError(Exception):
+    """동일한 형태의 쿼리가 한 요청에서 임계값 이상 반복될 때 발생합니다."""
+
+
+class QueryLog:
+    """하나의 요청 동안 실행된 쿼리 목록과 쿼리 형태별 실행 횟수를 기록합니다."""
+
+    def __init__(self, label):
+        self.label = label
+        self.queries = []
+        self.shapes = Counter()
+        self.call_sites = {}
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(q['duration_ms'] for q in self.queries)
+
+    def n_plus_one(self, threshold):
+        """임계값 이상 반복된 쿼리 형태 목록을 반환합니다."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+# --------------------- 쿼리 형태 정규화 ---------------------
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"IN \((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement):
+    """
+    리터럴과 파라미터 자리를 '?'로 치환해 쿼리의 '형태'를 만듭니다.
+    파라미터 값만 다른 쿼리는 같은 형태로 취급됩니다.
+    """
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+def find_call_site(depth=3):
+    """
+    프로파일러/저장소 계층을 제외한 앱 코드(서비스, 라우트, 템플릿)의 호출 경로를
+    안쪽부터 최대 depth개까지 'a <- b <- c' 형태로 반환합니다.
+    """
+    sites = []
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if not filename.startswith(SRC_DIR):
+            continue
+        if os.path.basename(filename) in SKIP_FILES:
+            continue
+        sites.append(f"{os.path.relpath(filename, SRC_DIR)}:{frame.lineno} in {frame.name}")
+        if len(sites) >= depth:
+            break
+    return ' <- '.join(sites) or 'unknown'
+
+# --------------------- 기록 시작/종료 ---------------------
+
+def start(label):
+    """새 쿼리 기록을 시작하고 이전 상태를 복원하기 위한 토큰을 반환합니다."""
+    return _current_log.set(QueryLog(label))
+
+def finish(token):
+    """현재 쿼리 기록을 종료하고 분석 결과를 로그로 남깁니다."""
+    log = _current_log.get()
+    _current_log.reset(token)
+    if log is not None:
+        report(log)
+    return log
+
+def current_log():
+    return _current_log.get()
+
+def should_sample():
+    return config['enabled'] and random.random() < config['sample_rate']
+
+def report(log):
+    """N+1 의심 쿼리를 경고 로그로 남기고, 설정된 경우 예외를 발생시킵니다."""
+    suspects = log.n_plus_one(config['n_plus_one_threshold'])
+    for shape, count in suspects:
+        logger.warning(
+            "N+1 의심 쿼리 [%s] %d회 반복 (call site: %s): %s",
+            log.label, count, log.call_sites.get(shape, 'unknown'), shape
+        )
+    if suspects and config['raise_on_n_plus_one']:
+        shape, count = suspects[0]
+        raise NPlusOneError(f"[{log.label}] 동일 쿼리가 {count}회 반복되었습니다: {shape}")
+
+@contextmanager
+def capture(label='capture'):
+    """
+    블록 내부에서 실행된 모든 쿼리를 기록합니다. (테스트, 벤치마크, 스크립트용)
+    설정의 enabled/sample_rate 값과 무관하게 항상 기록합니다.
+    """
+    token = start(label)
+    log = _current_log.get()
+    try:
+        yield log
+    finally:
+        finish(token)
+
+def profiled(label):
+    """Socket.IO 이벤트 핸들러처럼 요청 훅이 없는 함수에 쿼리 기록을 적용하는 데코레이터입니다."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not should_sample():
+                return f(*args, **kwargs)
+            token = start(label)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                finish(token)
+        return wrapper
+    return decorator
+
+# --------------------- SQLAlchemy 이벤트 ---------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_log.get() is not None:
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _current_log.get()
+    if log is None:
+        return
+    started = getattr(context, '_query_start', None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    shape = statement_shape(statement)
+    log.shapes[shape] += 1
+    log.queries.append({'statement': statement, 'parameters': parameters, 'duration_ms': duration_ms})
+
+    # 호출 위치 계산은 비용이 있으므로 느린 쿼리이거나 N+1 임계값에 처음 도달했을 때만 수행
+    is_slow = duration_ms >= config['slow_query_ms']
+    reached_threshold = log.shapes[shape] == config['n_plus_one_threshold']
+    if not (is_slow or reached_threshold):
+        return
+    call_site = find_call_site()
+    if reached_threshold:
+        log.call_sites[shape] = call_site
+    if is_slow:
+        logger.warning(
+            "느린 쿼리 [%s] %.1fms (call site: %s): %s 파라미터=%r",
+            log.label, duration_ms, call_site, statement, parameters
+        )
+
+def listen(engine):
+    """엔진에 쿼리 기록용 이벤트 리스너를 등록합니다. (여러 번 호출해도 한 번만 등록)"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def register_query_profiler(app, engine):
+    """
+    app.config 설정에 따라 요청별 쿼리 기록을 활성화합니다.
+      - QUERY_PROFILE: 'on'이면 활성화 (개발/스테이징)
+      - QUERY_PROFILE_SAMPLE_RATE: 기록할 요청의 비율 (production 샘플링)
+      - SLOW_QUERY_MS: 느린 쿼리로 기록할 기준 시간(ms)
+      - N_PLUS_ONE_THRESHOLD: 동일 형태 쿼리의 반복 허용 횟수
+      - QUERY_PROFILE_RAISE: 'true'이면 N+1 감지 시 NPlusOneError 발생 (테스트용)
+    """
+    config['enabled'] = app.config.get('QUERY_PROFILE') == 'on'
+    config['sample_rate'] = float(app.config.get('QUERY_PROFILE_SAMPLE_RATE') or 1.0)
+    config['slow_query_ms'] = float(app.config.get('SLOW_QUERY_MS') or 100)
+    config['n_plus_one_threshold'] = int(app.config.get('N_PLUS_ONE_THRESHOLD') or 5)
+    config['raise_on_n_plus_one'] = app.config.get('QUERY_PROFILE_RAISE') == 'true'
+
+    # 이벤트 리스너는 기록 중인 요청이 없으면 바로 반환하므로 항상 등록해 둡니다.
+    listen(engine)
+
+    @app.before_request
+    def start_query_log():
+        if should_sample():
+            g._query_log_token = start(f"{request.method} {request.path}")
+
+    @app.after_request
+    def finish_query_log(response):
+        token = g.pop('_query_log_token', None)
+        if token is not None:
+            log = finish(token)
+            g.query_log = log
+            if app.config.get('ENV') != 'production':
+                response.headers['X-Query-Count'] = str(log.count)
+        return response
+
+    @app.teardown_request
+    def discard_query_log(exception):
+        # 뷰에서 예외가 발생해 after_request가 실행되지 않은 경우 기록만 정리합니다.
+        token = g.pop('_query_log_token', None)
+        if token is not None:
+            _current_log.reset(token)
@@ -0,0 +1,89 @@
+# recent_chats.py
+"""
+최근 전역 채팅 메시지의 프로세스 내 링 버퍼.
+
+대시보드와 소켓 'join'은 최근 메시지를 DB 대신 이 버퍼에서 읽습니다.
+  - 메시지를 저장할 때(user_service.save_global_chat_message, asgi.handle_send_message) 추가
+  - 관리자가 메시지를 삭제하면(admin_service.remove_chat_message) 제거
+  - 시작 시 DB의 최근 메시지로 채움 (warm). 채우기 전에 읽으면 그때 채움
+버퍼보다 오래된 메시지는 /chat/history의 커서 조회로 DB(보관 파일 포함)에서 읽습니다.
+버퍼는 프로세스마다 따로 있으므로 워커가 하나인 배포(deploy.sh)를 전제로 합니다.
+"""
+import threading
+from collections import deque
+import repository
+
+# 버퍼에 보관할 최근 메시지 수
+RECENT_CHAT_SIZE = 200
+
+
+class RecentChats:
+    """
+    항목은 chat_archive.get_history_page와 같은 형식의 dict에 username을 더한 것이며 오래된 순으로 보관합니다.
+    """
+
+    def __init__(self, size=RECENT_CHAT_SIZE):
+        self.entries = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.warmed = False
+        # warm에서 DB로 읽은 메시지 ID (warm 중에 저장된 메시지를 append에서 두 번 넣지 않도록)
+        self.warmed_ids = set()
+
+    def configure(self, size):
+        with self.lock:
+            self.entries = deque(self.entries, maxlen=size)
+
+    def warm(self):
+        """DB의 최근 전역 메시지로 버퍼를 채웁니다. 이미 채웠으면 아무것도 하지 않습니다."""
+        with self.lock:
+            if self.warmed:
+                return
+            rows = repository.get_chat_history_page(None, None, None, self.entries.maxlen)
+            usernames = repository.get_usernames_by_ids(row.sender_id for row in rows)
+            self.entries.clear()
+            self.warmed_ids = {row.id for row in rows}
+            for row in reversed(rows):
+                self.entries.append({
+                    'id': row.id, 'sender_id': row.sender_id, 'recipient_id': row.recipient_id,
+                    'username': usernames.get(row.sender_id, row.sender_id), 'message': row.message,
+                    'timestamp': row.cursor_timestamp, 'cursor_timestamp': row.cursor_timestamp
+                })
+            self.warmed = True
+
+    def append(self, entry):
+        """저장한 메시지를 추가합니다. (버퍼가 가득 차면 가장 오래된 메시지가 빠짐)"""
+        self.warm()
+        with self.lock:
+            # warm의 조회가 이 메시지의 커밋 뒤였다면 이미 버퍼에 있음 (조회가 먼저였다면 없으므로 추가)
+            if entry['id'] in self.warmed_ids:
+                return
+            self.entries.append(entry)
+
+    def remove(self, chat_id):
+        with self.lock:
+            for entry in self.entries:
+                if entry['id'] == chat_id:
+                    self.entries.remove(entry)
+                    return True
+        return False
+
+    def latest(self, limit):
+        """최근 메시지 limit개를 오래된 순으로 반환합니다."""
+        self.warm()
+        with self.lock:
+            count = min(limit, len(self.entries))
+            return [self.entries[index] for index in range(len(self.entries) - count, len(self.entries))]
+
+    def page(self, limit):
+        """
+        최근 메시지 limit개를 최신순으로 반환합니다. (/chat/history의 첫 페이지)
+        버퍼에 limit개가 없으면 더 오래된 메시지가 DB에 있을 수 있으므로 None을 반환합니다.
+        """
+        messages = self.latest(limit)
+        if len(messages) < limit:
+            return None
+        messages.reverse()
+        return messages
+
+
+global_chats = RecentChats()
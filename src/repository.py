@@ -1,27 +1,169 @@
 # repository.py
-import uuid
-from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, func, or_, and_
+import os
+import math
+import zlib
+import heapq
+import itertools
+import atexit
+import functools
+from collections import namedtuple, Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, create_engine, Column, String, Integer, Float, DateTime, Text, Index, func, or_, and_, text, insert, select, type_coerce, cast
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
+import migrations
+import write_queue
+from utils import new_id
 
-# 데이터베이스 URL (SQLite 사용)
-DATABASE_URL = 'sqlite:///market.db'
+# 데이터베이스 URL (기본값: SQLite 파일, 예: postgresql+psycopg2://user:pw@localhost/market)
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///market.db')
 
-# SQLAlchemy 엔진 생성 (SQLite의 경우 여러 스레드 사용을 위해 check_same_thread=False 설정)
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _engine_options(url):
+    """환경 변수의 커넥션 풀 설정 (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING)"""
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true') != 'false',
+    }
+    if url.startswith('sqlite'):
+        # SQLite의 경우 여러 스레드 사용을 위해 check_same_thread=False 설정
+        options['connect_args'] = {"check_same_thread": False}
+    return options
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    # WAL 모드: 읽기(채팅 보관 작업, 내보내기 등)가 쓰기를 막지 않도록 함
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+def _create_engine(url):
+    new_engine = create_engine(url, **_engine_options(url))
+    if new_engine.dialect.name == 'sqlite':
+        event.listen(new_engine, 'connect', _set_sqlite_pragma)
+    return new_engine
+
+# SQLAlchemy 엔진 생성
+engine = _create_engine(DATABASE_URL)
 
 # 세션 팩토리 및 scoped_session 생성
 SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
+# 채팅 저장소 (기본값: DATABASE_URL과 같은 DB)
+# 채팅 쓰기가 지갑/로그인 쓰기와 SQLite 쓰기 잠금을 다투지 않도록 별도 DB로 나눌 수 있으며,
+# CHAT_SHARDS가 2 이상이면 URL의 {shard}를 0..N-1로 바꾼 N개의 DB에 대화별로 나누어 저장합니다.
+# 예: CHAT_DATABASE_URL=sqlite:///chat-{shard}.db CHAT_SHARDS=4
+CHAT_DATABASE_URL = os.environ.get('CHAT_DATABASE_URL', DATABASE_URL)
+CHAT_SHARDS = int(os.environ.get('CHAT_SHARDS', 1))
+
+def _chat_database_urls(url, shards):
+    if shards > 1 and '{shard}' not in url:
+        raise ValueError("CHAT_SHARDS가 2 이상이면 CHAT_DATABASE_URL에 {shard}가 있어야 합니다.")
+    return [url.replace('{shard}', str(shard)) for shard in range(max(shards, 1))]
+
+# 채팅 DB가 주 DB와 같으면 엔진(커넥션 풀)과 세션 팩토리를 함께 사용
+chat_engines = [engine if url == DATABASE_URL else _create_engine(url)
+                for url in _chat_database_urls(CHAT_DATABASE_URL, CHAT_SHARDS)]
+ChatSessions = [SessionLocal if chat_engine is engine
+                else sessionmaker(autocommit=False, autoflush=False, bind=chat_engine)
+                for chat_engine in chat_engines]
+
+_chats_in_main_db = chat_engines[0] is engine
+
+# 쓰기 묶음 커밋 (WRITE_QUEUE=on): DB마다 writer 스레드 하나가 동시에 들어온 쓰기를 모아 한 트랜잭션으로 커밋
+WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE', 'off') == 'on'
+WRITE_QUEUE_MAX_BATCH = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', write_queue.DEFAULT_MAX_BATCH))
+_write_queues = {}
+_write_queues_lock = write_queue.native_lock()
+
+def _write_queue(session_factory):
+    """세션 팩토리(DB)별 WriteQueue (처음 사용할 때 writer 스레드 시작)"""
+    with _write_queues_lock:
+        if session_factory not in _write_queues:
+            _write_queues[session_factory] = write_queue.WriteQueue(
+                session_factory, WRITE_QUEUE_MAX_BATCH, name=f"write-queue-{len(_write_queues)}"
+            )
+        return _write_queues[session_factory]
+
+def close_write_queues():
+    """큐에 남은 쓰기를 모두 커밋하고 writer 스레드를 종료합니다. (프로세스 종료 시 자동 호출)"""
+    with _write_queues_lock:
+        queues = list(_write_queues.values())
+        _write_queues.clear()
+    for queue in queues:
+        queue.close()
+
+atexit.register(close_write_queues)
+
+def _write(session_factory, operation, args, wait=True):
+    """
+    operation(session, *args)를 실행하고 커밋한 뒤 결과를 반환합니다.
+    WRITE_QUEUE가 켜져 있으면 writer 스레드가 다른 쓰기와 묶어 커밋하며,
+    wait=False면 커밋을 기다리지 않고 None을 반환합니다. (실패는 로그로 남음)
+    """
+    if WRITE_QUEUE_ENABLED:
+        future = _write_queue(session_factory).submit(operation, args)
+        if wait:
+            return future.result()
+        future.add_done_callback(write_queue.log_failure)
+        return None
+    session = session_factory()
+    try:
+        result = operation(session, *args)
+        session.commit()
+        return result
+    finally:
+        session.close()
+
+def _write_operation(route=None):
+    """
+    session을 첫 인자로 받아 변경만 적용하는 함수를, session 없이 호출하는 쓰기 함수로 만듭니다.
+    만든 함수는 wait 키워드 인자를 받습니다. (_write 참고)
+    route를 주면 호출 인자로 세션 팩토리(채팅 DB)를 고르고, 없으면 주 DB에 씁니다.
+    """
+    def decorator(operation):
+        @functools.wraps(operation)
+        def wrapper(*args, wait=True):
+            session_factory = route(*args) if route else SessionLocal
+            return _write(session_factory, operation, args, wait)
+        return wrapper
+    return decorator
+
 # 기본 모델 클래스
 Base = declarative_base()
 
+class _CursorTimestamp(TypeDecorator):
+    """문자열 커서 값과 비교할 때도 timestamp로 바인드합니다. (DB가 문자열을 timestamp로 변환)"""
+    impl = DateTime
+    cache_ok = True
+
+    def coerce_compared_value(self, op, value):
+        return self
+
+def _cursor_timestamp(column):
+    """
+    키셋 커서에 사용할 timestamp 표현식 (조회용, 비교용)을 반환합니다.
+    SQLite는 timestamp를 문자열로 저장하며 서버 기본값과 파이썬 datetime의 형식이 섞여 있으므로
+    저장된 문자열 그대로 읽고 비교합니다. 다른 DB는 문자열로 읽되 인덱스를 쓰도록 컬럼 자체로 비교합니다.
+    """
+    if engine.dialect.name == 'sqlite':
+        raw_timestamp = type_coerce(column, String)
+        return raw_timestamp, raw_timestamp
+    return cast(column, String), type_coerce(column, _CursorTimestamp)
+
+# 파이썬에서 정한 timestamp를 커서 문자열로 나타낼 때의 형식 (SQLAlchemy가 SQLite에 저장하는 형식과 같음)
+TIMESTAMP_TEXT_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
 # --------------------- 모델 정의 ---------------------
+# id는 utils.new_id()로 만든 시간순 UUIDv7 문자열입니다.
+# 기본 키에는 이미 인덱스가 있으므로 id 컬럼에 index=True를 따로 두지 않습니다.
 
 class User(Base):
     __tablename__ = 'user'
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     username = Column(String, unique=True, nullable=False, index=True)
     password = Column(String, nullable=False)
     bio = Column(Text)
@@ -32,62 +174,257 @@ class User(Base):
 
 class Product(Base):
     __tablename__ = 'product'
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
-    price = Column(String, nullable=False)
+    # 가격은 원 단위 정수 (가격 범위 검색/정렬을 인덱스로 처리)
+    price = Column(Integer, nullable=False)
     seller_id = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    __table_args__ = (
+        # 가격순/최신순 정렬과 키셋 페이지네이션(정렬값, id)용 인덱스
+        Index('ix_product_price_id', 'price', 'id'),
+        Index('ix_product_created_at_id', 'created_at', 'id'),
+    )
 
 class Report(Base):
     __tablename__ = 'report'
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     reporter_id = Column(String, nullable=False)
     target_id = Column(String, nullable=False)
     reason = Column(Text, nullable=False)
     timestamp = Column(DateTime, server_default=func.current_timestamp())
 
+    __table_args__ = (
+        # 기간별 내보내기(iter_reports), 신고 제한 집계 재계산용
+        Index('ix_report_timestamp_id', 'timestamp', 'id'),
+    )
+
 class Chat(Base):
     __tablename__ = 'chat'
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     sender_id = Column(String, nullable=False)
     recipient_id = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     timestamp = Column(DateTime, server_default=func.current_timestamp())
 
+    __table_args__ = (
+        # 기간별 내보내기(iter_chats)용
+        Index('ix_chat_timestamp_id', 'timestamp', 'id'),
+        # 1:1 채팅 내역(get_private_chat_history)용
+        Index('ix_chat_sender_recipient_timestamp', 'sender_id', 'recipient_id', 'timestamp'),
+        # 전역 채팅 내역(get_global_chat_history)용
+        Index('ix_chat_recipient_timestamp', 'recipient_id', 'timestamp'),
+    )
+
 class WalletTransaction(Base):
     __tablename__ = 'wallet_transaction'
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     sender_id = Column(String, nullable=True)
     recipient_id = Column(String, nullable=True)
     amount = Column(Integer, nullable=False)
     transaction_type = Column(String, nullable=False)
     timestamp = Column(DateTime, server_default=func.current_timestamp())
 
+    __table_args__ = (
+        # 기간별 내보내기(iter_wallet_transactions)용
+        Index('ix_wallet_transaction_timestamp_id', 'timestamp', 'id'),
+        # 지갑 거래 내역(get_wallet_transactions)의 송신/수신 조건 각각에 사용
+        Index('ix_wallet_transaction_sender_timestamp', 'sender_id', 'timestamp'),
+        Index('ix_wallet_transaction_recipient_timestamp', 'recipient_id', 'timestamp'),
+    )
+
+# 관리자 대시보드용 누적 집계값 (COUNT(*) 스캔 없이 O(1)로 조회)
+class StatCounter(Base):
+    __tablename__ = 'stat_counter'
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# 시간 단위 활동 집계 (최근 24시간 활동 = 최대 24개 버킷의 합)
+class StatActivity(Base):
+    __tablename__ = 'stat_activity'
+    name = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)  # UTC 'YYYY-MM-DD HH'
+    count = Column(Integer, nullable=False, default=0)
+
+# 신고 제한 검사용 시간 단위 신고 수 (신고자/대상/신고자-대상 쌍별)
+# 한 기간의 신고 수 = 최대 25개 버킷의 합이며, 기본 키 범위 조회로 읽습니다.
+class ReportWindow(Base):
+    __tablename__ = 'report_window'
+    scope = Column(String, primary_key=True)    # 'reporter', 'target', 'pair'
+    subject = Column(String, primary_key=True)  # 사용자/대상 ID ('pair'는 '신고자 ID:대상 ID')
+    bucket = Column(String, primary_key=True)   # UTC 'YYYY-MM-DD HH'
+    count = Column(Integer, nullable=False, default=0)
+
+# 신고 대상별 검토 대기열 (create_report가 같은 트랜잭션에서 갱신)
+# 관리자 신고 화면은 검토 대기 중인 대상을 점수 인덱스 역순으로 읽으므로 신고 수와 무관하게 상위 N개를 바로 조회합니다.
+class ModerationQueue(Base):
+    __tablename__ = 'moderation_queue'
+    target_id = Column(String, primary_key=True)
+    report_count = Column(Integer, nullable=False, default=0)
+    first_reported_at = Column(DateTime, nullable=False)
+    last_reported_at = Column(DateTime, nullable=False)
+    last_reason = Column(Text)
+    score = Column(Float, nullable=False)
+    # 관리자가 조치/검토를 마치면 1 (이후 새 신고가 들어오면 다시 0)
+    resolved = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_moderation_queue_resolved_score', 'resolved', 'score', 'target_id'),
+    )
+
+# --------------------- 목록 조회용 읽기 모델 ---------------------
+# 목록 화면은 몇 개 컬럼만 읽으므로 ORM 객체(identity map, 상태 추적, 세션 종료 시 분리) 대신
+# 필요한 컬럼만 조회해 namedtuple로 반환합니다. ORM 객체는 쓰기와 단건 조회에만 사용합니다.
+UserRow = namedtuple('UserRow', ['id', 'username', 'bio', 'status'])
+ProductRow = namedtuple('ProductRow', ['id', 'title', 'price', 'seller_id', 'created_at'])
+ReportRow = namedtuple('ReportRow', ['id', 'reporter_id', 'target_id', 'reason', 'timestamp'])
+ChatRow = namedtuple('ChatRow', ['id', 'sender_id', 'recipient_id', 'message', 'timestamp'])
+
+def _read_model_select(read_model, model):
+    """read_model 필드와 같은 이름의 model 컬럼만 조회하는 select"""
+    return select(*[getattr(model, field) for field in read_model._fields])
+
+def _fetch_read_models(session, read_model, stmt):
+    return list(itertools.starmap(read_model, session.execute(stmt)))
+
 # --------------------- 데이터베이스 초기화 함수 ---------------------
 
+# 상품명 부분 검색용 FTS5 인덱스 (SQLite 전용, trigram 토크나이저는 SQLite 3.34 이상 필요)
+PRODUCT_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_fts
+       USING fts5(title, content='product', content_rowid='rowid', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+         INSERT INTO product_fts(rowid, title) VALUES (new.rowid, new.title);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+         INSERT INTO product_fts(product_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF title ON product BEGIN
+         INSERT INTO product_fts(product_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+         INSERT INTO product_fts(rowid, title) VALUES (new.rowid, new.title);
+       END""",
+]
+# PostgreSQL: 상품명 부분 문자열 검색(LIKE '%q%')용 trigram 인덱스
+PRODUCT_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_product_title_trgm ON product USING gin (title gin_trgm_ops)",
+]
+# trigram 토크나이저는 3글자 미만 검색어를 처리하지 못하므로 그보다 짧으면 LIKE 검색을 사용
+PRODUCT_FTS_MIN_QUERY_LENGTH = 3
+_product_fts_available = None
+
 def init_db():
-    """모든 테이블을 생성합니다."""
+    """모든 테이블과 인덱스를 생성합니다."""
     Base.metadata.create_all(bind=engine)
-    
+    # 기존 DB 파일의 컬럼 변경 (새 인덱스가 바뀐 컬럼을 참조하므로 인덱스 생성 전에 실행)
+    migrations.run(engine)
+    # create_all은 이미 존재하는 테이블에 새로 추가된 인덱스를 만들지 않으므로 따로 생성
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if not _chats_in_main_db:
+        for chat_engine in chat_engines:
+            _init_chat_db(chat_engine)
+        _move_chats_to_shards()
+    init_product_fts()
+    backfill_moderation_queue()
+    recompute_counters()
+
+# 채팅 DB에 만드는 테이블 (채팅 집계값은 채팅과 같은 트랜잭션에서 갱신하므로 채팅 DB에 둠)
+def _chat_tables():
+    return [Chat.__table__, StatCounter.__table__, StatActivity.__table__]
+
+def _init_chat_db(chat_engine):
+    Base.metadata.create_all(bind=chat_engine, tables=_chat_tables())
+    for table in _chat_tables():
+        for index in table.indexes:
+            index.create(bind=chat_engine, checkfirst=True)
+
+# 주 DB에서 채팅 DB로 한 번에 옮길 메시지 수
+CHAT_MOVE_BATCH_SIZE = 1000
+
+def _move_chats_to_shards():
+    """
+    채팅 DB를 나누기 전에 주 DB의 chat 테이블에 저장된 메시지를 대화별 채팅 DB로 옮깁니다.
+    배치마다 (채팅 DB에 기록 -> 주 DB에서 삭제) 순서로 처리하며, 채팅 DB에는 같은 id를 지운 뒤 기록하므로
+    중간에 중단되어도 다시 실행하면 이어서 처리합니다.
+    """
+    table = Chat.__table__
+    while True:
+        with engine.connect() as conn:
+            rows = [dict(row) for row in conn.execute(select(table).limit(CHAT_MOVE_BATCH_SIZE)).mappings()]
+        if not rows:
+            return
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(_chat_shard(row['sender_id'], row['recipient_id']), []).append(row)
+        for shard, shard_rows in by_shard.items():
+            with chat_engines[shard].begin() as conn:
+                conn.execute(table.delete().where(table.c.id.in_([row['id'] for row in shard_rows])))
+                conn.execute(insert(table), shard_rows)
+        with engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+
+def init_product_fts():
+    """
+    SQLite에서 상품명 검색용 FTS5 테이블과 동기화 트리거를 생성합니다.
+    PostgreSQL에서는 LIKE '%q%' 검색에 사용되는 pg_trgm GIN 인덱스를 생성합니다.
+    """
+    global _product_fts_available
+    if engine.dialect.name == 'postgresql':
+        _product_fts_available = False
+        try:
+            with engine.begin() as conn:
+                for ddl in PRODUCT_TRGM_DDL:
+                    conn.execute(text(ddl))
+        except (OperationalError, ProgrammingError):
+            # 확장을 설치할 권한이 없으면 인덱스 없이 LIKE 검색
+            pass
+        return
+    if engine.dialect.name != 'sqlite':
+        _product_fts_available = False
+        return
+    try:
+        with engine.begin() as conn:
+            created = conn.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE name = 'product_fts'"
+            )).scalar() == 0
+            for ddl in PRODUCT_FTS_DDL:
+                conn.execute(text(ddl))
+            if created:
+                # 기존 상품을 인덱스에 채워 넣음
+                conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+        _product_fts_available = True
+    except OperationalError:
+        # FTS5 또는 trigram 토크나이저를 지원하지 않는 SQLite 빌드
+        _product_fts_available = False
+
+def product_fts_available():
+    global _product_fts_available
+    if _product_fts_available is None:
+        with engine.connect() as conn:
+            _product_fts_available = engine.dialect.name == 'sqlite' and conn.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE name = 'product_fts'"
+            )).scalar() > 0
+    return _product_fts_available
+
 def close_db(e=None):
     SessionLocal.remove()
 
 # --------------------- 사용자 관련 함수 ---------------------
 
-def create_user(username, password):
+@_write_operation()
+def create_user(session, username, password):
     """
     새 사용자를 생성합니다.
     wallet은 기본적으로 5000으로 설정됩니다.
     """
-    session = SessionLocal()
-    try:
-        user_id = str(uuid.uuid4())
-        new_user = User(id=user_id, username=username, password=password)
-        session.add(new_user)
-        session.commit()
-        return user_id
-    finally:
-        session.close()
+    user_id = new_id()
+    new_user = User(id=user_id, username=username, password=password)
+    session.add(new_user)
+    _increment_counter(session, 'users')
+    return user_id
 
 def get_user_by_username(username):
     session = SessionLocal()
@@ -103,53 +440,110 @@ def get_user_by_id(user_id):
     finally:
         session.close()
 
-def get_all_users():
+def get_usernames_by_ids(user_ids):
+    """여러 사용자의 username을 한 번의 쿼리로 조회해 {id: username}으로 반환합니다."""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
     session = SessionLocal()
     try:
-        return session.query(User).all()
+        return dict(session.query(User.id, User.username).filter(User.id.in_(user_ids)).all())
     finally:
         session.close()
 
-def update_failed_attempts(user_id, count):
+def get_users_by_ids(user_ids):
+    """여러 사용자를 한 번의 쿼리로 조회해 {id: User}로 반환합니다."""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
     session = SessionLocal()
     try:
-        session.query(User).filter(User.id == user_id).update({"failed_attempts": count})
-        session.commit()
+        return {user.id: user for user in session.query(User).filter(User.id.in_(user_ids))}
     finally:
         session.close()
 
-def set_lockout(user_id, lockout_until):
-    session = SessionLocal()
-    try:
-        session.query(User).filter(User.id == user_id).update({"lockout_until": lockout_until})
-        session.commit()
-    finally:
-        session.close()
+# JSON API에서 선택할 수 있는 컬럼 (password 등 내부 컬럼은 제외)
+USER_API_COLUMNS = ('id', 'username', 'bio')
+PRODUCT_API_COLUMNS = ('id', 'title', 'description', 'price', 'seller_id', 'created_at')
+
+def _select_columns(model, fields, allowed):
+    """fields 컬럼만 조회하는 컬럼 목록 (id는 커서와 링크에 필요하므로 항상 포함)"""
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValueError(f"unknown {model.__tablename__} fields: {sorted(unknown)}")
+    return [model.id] + [getattr(model, field) for field in fields if field != 'id']
+
+def _active_user_filter():
+    return or_(User.status.is_(None), User.status != SUSPENDED_STATUS)
 
-def reset_failed_attempts(user_id):
+def get_users_page(after=None, limit=20, fields=USER_API_COLUMNS):
+    """
+    휴면이 아닌 사용자의 fields 컬럼만 id 순서(가입 순서)로 limit개 반환합니다.
+    after(이전 페이지 마지막 사용자 id)를 주면 그 다음 사용자부터 반환합니다. (키셋 페이지네이션)
+    반환값: (행 목록, 다음 페이지의 after 또는 None)
+    """
+    stmt = select(*_select_columns(User, fields, USER_API_COLUMNS)).where(_active_user_filter())
+    if after is not None:
+        stmt = stmt.where(User.id > after)
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 조회
+    stmt = stmt.order_by(User.id.asc()).limit(limit + 1)
     session = SessionLocal()
     try:
-        session.query(User).filter(User.id == user_id).update({"failed_attempts": 0, "lockout_until": None})
-        session.commit()
+        rows = session.execute(stmt).all()
     finally:
         session.close()
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1].id
+    return rows, next_after
 
-def update_user_bio(user_id, bio):
+def get_public_user_fields(user_id, fields=USER_API_COLUMNS):
+    """휴면이 아닌 사용자 한 명의 fields 컬럼만 조회합니다. (없으면 None)"""
+    stmt = select(*_select_columns(User, fields, USER_API_COLUMNS)).where(User.id == user_id, _active_user_filter())
     session = SessionLocal()
     try:
-        session.query(User).filter(User.id == user_id).update({"bio": bio})
-        session.commit()
+        return session.execute(stmt).first()
     finally:
         session.close()
 
-def update_user_status(user_id, status):
+def get_all_users():
+    """사용자 목록 (UserRow, password 등 목록에 필요 없는 컬럼은 읽지 않음)"""
     session = SessionLocal()
     try:
-        session.query(User).filter(User.id == user_id).update({"status": status})
-        session.commit()
+        return _fetch_read_models(session, UserRow, _read_model_select(UserRow, User))
     finally:
         session.close()
 
+@_write_operation()
+def update_failed_attempts(session, user_id, count):
+    session.query(User).filter(User.id == user_id).update({"failed_attempts": count})
+
+@_write_operation()
+def set_lockout(session, user_id, lockout_until):
+    session.query(User).filter(User.id == user_id).update({"lockout_until": lockout_until})
+
+@_write_operation()
+def reset_failed_attempts(session, user_id):
+    session.query(User).filter(User.id == user_id).update({"failed_attempts": 0, "lockout_until": None})
+
+@_write_operation()
+def update_user_bio(session, user_id, bio):
+    session.query(User).filter(User.id == user_id).update({"bio": bio})
+
+@_write_operation()
+def update_user_status(session, user_id, status):
+    # 휴먼 계정 수 집계: 조건부 UPDATE가 실제로 상태를 휴먼으로/휴먼에서 바꾼 경우만 반영
+    # (동시에 같은 상태로 바꾸는 요청이 와도 한 번만 집계됨)
+    query = session.query(User).filter(User.id == user_id)
+    if status == SUSPENDED_STATUS:
+        if query.filter(User.status != status).update({"status": status}, synchronize_session=False):
+            _increment_counter(session, 'suspended_users', activity=False)
+    elif query.filter(User.status == SUSPENDED_STATUS).update({"status": status}, synchronize_session=False):
+        _increment_counter(session, 'suspended_users', -1, activity=False)
+    else:
+        query.filter(User.status != status).update({"status": status}, synchronize_session=False)
+
 def update_user_password(user_id, new_password):
     """
     지정된 사용자에 대해 새 비밀번호를 업데이트합니다.
@@ -163,21 +557,65 @@ def update_user_password(user_id, new_password):
 
 # --------------------- 상품 관련 함수 ---------------------
 
-def create_product(title, description, price, seller_id):
+@_write_operation()
+def create_product(session, title, description, price, seller_id):
+    product_id = new_id()
+    new_product = Product(id=product_id, title=title, description=description, price=price, seller_id=seller_id)
+    session.add(new_product)
+    _increment_counter(session, 'products')
+    return product_id
+
+def bulk_create_products(rows):
+    """
+    여러 상품을 하나의 트랜잭션에서 executemany로 삽입합니다.
+    rows는 title, description, price, seller_id 키를 가진 dict 목록이며 생성된 상품 수를 반환합니다.
+    """
+    if not rows:
+        return 0
     session = SessionLocal()
     try:
-        product_id = str(uuid.uuid4())
-        new_product = Product(id=product_id, title=title, description=description, price=price, seller_id=seller_id)
-        session.add(new_product)
+        for row in rows:
+            row['id'] = new_id()
+        session.execute(insert(Product.__table__), rows)
+        _increment_counter(session, 'products', len(rows))
         session.commit()
-        return product_id
+        return len(rows)
     finally:
         session.close()
 
 def get_all_products():
+    """상품 목록 (ProductRow, 설명은 읽지 않음)"""
     session = SessionLocal()
     try:
-        return session.query(Product).all()
+        return _fetch_read_models(session, ProductRow, _read_model_select(ProductRow, Product))
+    finally:
+        session.close()
+
+def iter_products(batch_size=1000):
+    """모든 상품의 id, title, description을 batch_size행씩 스트리밍으로 읽어 옵니다. (유사 상품 색인 재구성용)"""
+    query = select(Product.id, Product.title, Product.description)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            yield row
+
+def get_products_by_ids(product_ids):
+    """여러 상품을 한 번의 쿼리로 조회해 {id: Product}로 반환합니다."""
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return {}
+    session = SessionLocal()
+    try:
+        return {product.id: product for product in session.query(Product).filter(Product.id.in_(product_ids))}
+    finally:
+        session.close()
+
+def get_product_fields(product_id, fields=PRODUCT_API_COLUMNS):
+    """상품 하나의 fields 컬럼만 조회합니다. (없으면 None)"""
+    stmt = select(*_select_columns(Product, fields, PRODUCT_API_COLUMNS)).where(Product.id == product_id)
+    session = SessionLocal()
+    try:
+        return session.execute(stmt).first()
     finally:
         session.close()
 
@@ -203,7 +641,9 @@ def edit_product(product_id, title, description, price):
 def delete_product(product_id):
     session = SessionLocal()
     try:
-        session.query(Product).filter(Product.id == product_id).delete()
+        deleted = session.query(Product).filter(Product.id == product_id).delete()
+        if deleted:
+            _increment_counter(session, 'products', -deleted, activity=False)
         session.commit()
     finally:
         session.close()
@@ -211,129 +651,389 @@ def delete_product(product_id):
 def search_products(query):
     session = SessionLocal()
     try:
-        pattern = f"%{query}%"
-        return session.query(Product).filter(Product.title.like(pattern)).all()
+        # 3자 이상이면 trigram FTS 인덱스로 부분 문자열 검색 (LIKE '%q%'와 같은 결과, 전체 스캔 없음)
+        return session.query(Product).filter(_product_text_filter(query)).all()
     finally:
         session.close()
 
-# --------------------- 신고 관련 함수 ---------------------
+# 상품 검색 정렬 방식: 이름 -> (정렬 컬럼, 내림차순 여부)
+PRODUCT_SORTS = {
+    'recent': ('created_at', True),
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+}
+
+def _product_text_filter(query):
+    if len(query) >= PRODUCT_FTS_MIN_QUERY_LENGTH and product_fts_available():
+        phrase = '"' + query.replace('"', '""') + '"'
+        return text(
+            "product.rowid IN (SELECT rowid FROM product_fts WHERE product_fts MATCH :phrase)"
+        ).bindparams(phrase=phrase)
+    return Product.title.like(f"%{query}%")
 
-def create_report(reporter_id, target_id, reason):
+def search_products_page(query='', min_price=None, max_price=None, sort='recent', after=None, limit=20, fields=None):
+    """
+    상품명/가격 범위로 검색해 sort 순서로 limit개를 반환합니다.
+    after=(정렬값, id)를 주면 그 다음 상품부터 반환합니다. (키셋 페이지네이션)
+    fields(PRODUCT_API_COLUMNS 중 일부)를 주면 Product 객체 대신 해당 컬럼만 조회한 행을 반환합니다.
+    반환값: (상품 목록, 다음 페이지의 after 또는 None)
+    """
+    column_name, descending = PRODUCT_SORTS[sort]
+    if column_name == 'created_at':
+        # created_at은 커서 값과 같은 문자열 형식으로 비교
+        cursor_column, sort_column = _cursor_timestamp(Product.created_at)
+    else:
+        cursor_column = sort_column = Product.price
+    if fields is None:
+        stmt = select(Product, cursor_column.label('cursor_value'))
+    else:
+        stmt = select(*_select_columns(Product, fields, PRODUCT_API_COLUMNS), cursor_column.label('cursor_value'))
+    if query:
+        stmt = stmt.where(_product_text_filter(query))
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+    if after is not None:
+        after_value, after_id = after
+        if descending:
+            stmt = stmt.where(or_(sort_column < after_value, and_(sort_column == after_value, Product.id < after_id)))
+        else:
+            stmt = stmt.where(or_(sort_column > after_value, and_(sort_column == after_value, Product.id > after_id)))
+    order_column = getattr(Product, column_name)
+    if descending:
+        stmt = stmt.order_by(order_column.desc(), Product.id.desc())
+    else:
+        stmt = stmt.order_by(order_column.asc(), Product.id.asc())
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 조회
+    stmt = stmt.limit(limit + 1)
     session = SessionLocal()
     try:
-        report_id = str(uuid.uuid4())
-        new_report = Report(id=report_id, reporter_id=reporter_id, target_id=target_id, reason=reason)
-        session.add(new_report)
-        session.commit()
-        return report_id
+        rows = session.execute(stmt).all()
     finally:
         session.close()
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = (rows[-1].cursor_value, rows[-1].id if fields is not None else rows[-1].Product.id)
+    if fields is not None:
+        return rows, next_after
+    return [row.Product for row in rows], next_after
+
+# --------------------- 신고 관련 함수 ---------------------
+
+# 신고 제한: 같은 대상 재신고 금지 기간, 신고자의 하루(UTC) 최대 신고 수, 대상의 기간 내 최대 신고 수
+ReportLimits = namedtuple('ReportLimits', ['same_target_window', 'daily_limit', 'target_threshold'])
+
+class ReportLimitExceeded(Exception):
+    """신고 제한을 넘었을 때 발생합니다. kind: 'same_target', 'daily', 'target'"""
+
+    def __init__(self, kind):
+        super().__init__(kind)
+        self.kind = kind
+
+def _report_window_subjects(reporter_id, target_id):
+    return (('pair', f"{reporter_id}:{target_id}"), ('reporter', reporter_id), ('target', target_id))
+
+def _increment_report_window(session, scope, subject, bucket, delta=1):
+    updated = session.query(ReportWindow).filter(
+        ReportWindow.scope == scope, ReportWindow.subject == subject, ReportWindow.bucket == bucket
+    ).update({"count": ReportWindow.count + delta}, synchronize_session=False)
+    if not updated:
+        session.add(ReportWindow(scope=scope, subject=subject, bucket=bucket, count=delta))
+        session.flush()
+
+def _report_window_count(session, scope, subject, since):
+    count = session.query(func.sum(ReportWindow.count)).filter(
+        ReportWindow.scope == scope, ReportWindow.subject == subject, ReportWindow.bucket >= _activity_bucket(since)
+    ).scalar()
+    return count or 0
+
+@_write_operation()
+def create_report(session, reporter_id, target_id, reason, limits=None):
+    """
+    신고를 저장하고 신고자/대상/쌍별 시간 버킷의 신고 수를 같은 트랜잭션에서 증가시킵니다.
+    limits(ReportLimits)를 주면 증가시킨 뒤의 신고 수로 제한을 검사하고, 넘으면 ReportLimitExceeded를 발생시켜
+    트랜잭션 전체를 되돌립니다. (먼저 갱신해 쓰기 잠금을 잡으므로 동시에 신고해도 제한을 넘지 않음)
+    기간 검사는 시간 버킷 단위이므로 같은 대상 재신고/대상 누적 기간은 최대 1시간 길게 적용됩니다.
+    """
+    now = datetime.utcnow()
+    bucket = _activity_bucket(now)
+    for scope, subject in _report_window_subjects(reporter_id, target_id):
+        _increment_report_window(session, scope, subject, bucket)
+    if limits is not None:
+        window_start = now - limits.same_target_window
+        if _report_window_count(session, 'pair', f"{reporter_id}:{target_id}", window_start) > 1:
+            raise ReportLimitExceeded('same_target')
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        if _report_window_count(session, 'reporter', reporter_id, day_start) > limits.daily_limit:
+            raise ReportLimitExceeded('daily')
+        if _report_window_count(session, 'target', target_id, window_start) > limits.target_threshold:
+            raise ReportLimitExceeded('target')
+    report_id = new_id()
+    new_report = Report(id=report_id, reporter_id=reporter_id, target_id=target_id, reason=reason)
+    session.add(new_report)
+    _enqueue_moderation(session, target_id, reason, now)
+    _increment_counter(session, 'reports')
+    return report_id
 
 def get_all_reports():
     session = SessionLocal()
     try:
-        return session.query(Report).all()
+        return _fetch_read_models(session, ReportRow, _read_model_select(ReportRow, Report))
     finally:
         session.close()
 
-def get_reports_by_reporter_target(reporter_id, target_id, since):
-    session = SessionLocal()
-    try:
-        return session.query(Report).filter(
-            Report.reporter_id == reporter_id,
-            Report.target_id == target_id,
-            Report.timestamp >= since
-        ).all()
-    finally:
-        session.close()
+# 신고 수가 두 배가 되는 것과 마지막 신고가 MODERATION_RECENCY_HOURS시간 더 최근인 것을 같은 무게로 봄
+MODERATION_RECENCY_HOURS = 24
+
+def _moderation_score(report_count, last_reported_at):
+    """
+    검토 대기열 점수. 최근성 항은 모든 대상이 같은 기준 시각(epoch)을 쓰므로
+    시간이 지나도 다시 계산하지 않고 신고가 들어올 때만 갱신하면 순서가 유지됩니다.
+    """
+    hours = last_reported_at.replace(tzinfo=timezone.utc).timestamp() / 3600
+    return math.log2(report_count + 1) + hours / MODERATION_RECENCY_HOURS
+
+def _enqueue_moderation(session, target_id, reason, reported_at):
+    entry = session.get(ModerationQueue, target_id)
+    if entry is None:
+        entry = ModerationQueue(target_id=target_id, report_count=0, first_reported_at=reported_at)
+        session.add(entry)
+    entry.report_count += 1
+    entry.last_reported_at = reported_at
+    entry.last_reason = reason
+    entry.resolved = 0
+    entry.score = _moderation_score(entry.report_count, reported_at)
 
-def get_daily_report_count(reporter_id, since):
+def backfill_moderation_queue():
+    """
+    대기열에 없는 신고 대상을 기존 신고로 채웁니다. (대기열을 추가하기 전에 만든 DB, 신고를 직접 삽입한 시드 데이터)
+    반환값: 추가한 대상 수
+    """
     session = SessionLocal()
     try:
-        count = session.query(func.count(Report.id)).filter(
-            Report.reporter_id == reporter_id,
-            Report.timestamp >= since
-        ).scalar()
-        return count or 0
+        rows = session.query(
+            Report.target_id, func.count(Report.id), func.min(Report.timestamp), func.max(Report.timestamp)
+        ).filter(Report.target_id.not_in(select(ModerationQueue.target_id))).group_by(Report.target_id)
+        added = 0
+        for target_id, count, first_reported_at, last_reported_at in rows.all():
+            session.add(ModerationQueue(
+                target_id=target_id, report_count=count, first_reported_at=first_reported_at,
+                last_reported_at=last_reported_at, score=_moderation_score(count, last_reported_at)
+            ))
+            added += 1
+        session.commit()
+        return added
     finally:
         session.close()
 
-def get_report_count_for_target(target_id, since):
+def get_moderation_queue_page(after=None, limit=50):
+    """
+    검토 대기 중인 신고 대상을 점수가 높은 순으로 limit개 반환합니다.
+    after=(점수, 대상 ID)를 주면 그 다음 대상부터 반환합니다. (키셋 페이지네이션)
+    반환값: (대기열 항목 목록, 다음 페이지의 after 또는 None)
+    """
+    stmt = select(ModerationQueue).where(ModerationQueue.resolved == 0)
+    if after is not None:
+        after_score, after_id = after
+        stmt = stmt.where(or_(ModerationQueue.score < after_score,
+                              and_(ModerationQueue.score == after_score, ModerationQueue.target_id < after_id)))
+    # 다음 페이지 존재 여부를 알기 위해 하나 더 조회
+    stmt = stmt.order_by(ModerationQueue.score.desc(), ModerationQueue.target_id.desc()).limit(limit + 1)
     session = SessionLocal()
     try:
-        count = session.query(func.count(Report.id)).filter(
-            Report.target_id == target_id,
-            Report.timestamp >= since
-        ).scalar()
-        return count or 0
+        entries = session.execute(stmt).scalars().all()
     finally:
         session.close()
+    next_after = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_after = (entries[-1].score, entries[-1].target_id)
+    return entries, next_after
+
+@_write_operation()
+def resolve_moderation_target(session, target_id):
+    """대상을 검토 대기열에서 내립니다. (새 신고가 들어오면 다시 올라옴)"""
+    session.query(ModerationQueue).filter(ModerationQueue.target_id == target_id)\
+        .update({"resolved": 1}, synchronize_session=False)
 
 # --------------------- 채팅 관련 함수 ---------------------
+# 채팅은 대화(전역 채팅 또는 두 사용자 간 1:1 채팅) 단위로 chat_engines 중 한 DB에 저장됩니다.
+# 한 대화의 조회는 해당 DB 하나만 읽고, 보관/내보내기/삭제처럼 대화를 특정할 수 없는 작업은 모든 DB를 읽습니다.
 
-def create_chat_message(sender_id, recipient_id, message):
-    session = SessionLocal()
-    try:
-        chat_id = str(uuid.uuid4())
-        new_chat = Chat(id=chat_id, sender_id=sender_id, recipient_id=recipient_id, message=message)
-        session.add(new_chat)
-        session.commit()
-        return message
-    finally:
-        session.close()
+def _chat_shard(user1, user2=None):
+    """대화가 저장되는 채팅 DB 번호 (user2가 없거나 'global'이면 전역 채팅)"""
+    if len(chat_engines) == 1:
+        return 0
+    if user2 is None or user2 == 'global':
+        key = 'global'
+    else:
+        key = ':'.join(sorted((user1, user2)))
+    return zlib.crc32(key.encode('utf-8')) % len(chat_engines)
+
+def _execute_on_chat_shards(query):
+    """모든 채팅 DB에서 query를 실행한 결과 행을 합쳐 반환합니다."""
+    rows = []
+    for chat_session in ChatSessions:
+        session = chat_session()
+        try:
+            rows.extend(session.execute(query).all())
+        finally:
+            session.close()
+    return rows
+
+def _new_chat(sender_id, recipient_id, message):
+    """
+    저장할 Chat과, 저장 후 다시 조회하지 않아도 되도록 chat_archive.get_history_page와 같은 형식의 dict를 만듭니다.
+    timestamp는 서버 기본값 대신 여기서 정해 커서 문자열을 바로 알 수 있게 합니다.
+    """
+    timestamp = datetime.utcnow()
+    chat = Chat(id=new_id(), sender_id=sender_id, recipient_id=recipient_id, message=message, timestamp=timestamp)
+    timestamp_text = timestamp.strftime(TIMESTAMP_TEXT_FORMAT)
+    return chat, {
+        'id': chat.id, 'sender_id': sender_id, 'recipient_id': recipient_id, 'message': message,
+        'timestamp': timestamp_text, 'cursor_timestamp': timestamp_text
+    }
+
+@_write_operation(route=lambda sender_id, recipient_id, message: ChatSessions[_chat_shard(sender_id, recipient_id)])
+def create_chat_message(session, sender_id, recipient_id, message):
+    """메시지를 저장하고 저장한 메시지(dict: id, sender_id, recipient_id, message, timestamp, cursor_timestamp)를 반환합니다."""
+    new_chat, entry = _new_chat(sender_id, recipient_id, message)
+    session.add(new_chat)
+    _increment_counter(session, 'chats')
+    return entry
+
+def bulk_insert_chats(rows):
+    """
+    여러 메시지(dict: id, sender_id, recipient_id, message, timestamp)를 채팅 DB별로 묶어 executemany로 삽입합니다.
+    (부하 테스트 데이터 생성용, 집계값은 갱신하지 않으므로 이후 recompute_counters 호출 필요)
+    """
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(_chat_shard(row['sender_id'], row['recipient_id']), []).append(row)
+    for shard, shard_rows in by_shard.items():
+        with chat_engines[shard].begin() as conn:
+            conn.execute(insert(Chat.__table__), shard_rows)
+    return len(rows)
 
 def get_private_chat_history(user1, user2, limit=50):
-    session = SessionLocal()
+    stmt = _read_model_select(ChatRow, Chat).where(
+        or_(
+            and_(Chat.sender_id == user1, Chat.recipient_id == user2),
+            and_(Chat.sender_id == user2, Chat.recipient_id == user1)
+        )
+    ).order_by(Chat.timestamp.asc()).limit(limit)
+    session = ChatSessions[_chat_shard(user1, user2)]()
     try:
-        chats = session.query(Chat).filter(
-            or_(
-                and_(Chat.sender_id == user1, Chat.recipient_id == user2),
-                and_(Chat.sender_id == user2, Chat.recipient_id == user1)
-            )
-        ).order_by(Chat.timestamp.asc()).limit(limit).all()
-        return chats
+        return _fetch_read_models(session, ChatRow, stmt)
     finally:
         session.close()
 
-def create_global_chat_message(sender_id, message):
+def create_global_chat_message(sender_id, message, wait=True):
     # 전역 채팅의 경우 recipient_id에 "global"을 사용
-    return create_chat_message(sender_id, "global", message)
+    return create_chat_message(sender_id, "global", message, wait=wait)
 
 def get_global_chat_history(limit=50):
-    session = SessionLocal()
+    stmt = _read_model_select(ChatRow, Chat).where(Chat.recipient_id == 'global')\
+        .order_by(Chat.timestamp.asc()).limit(limit)
+    session = ChatSessions[_chat_shard('global')]()
     try:
-        chats = session.query(Chat).filter(Chat.recipient_id == 'global')\
-            .order_by(Chat.timestamp.asc()).limit(limit).all()
-        return chats
+        return _fetch_read_models(session, ChatRow, stmt)
     finally:
         session.close()
 
-def delete_chat_message(chat_id):
-    session = SessionLocal()
+def _chat_conversation_filter(user1, user2=None):
+    """user2가 없으면 전역 채팅, 있으면 두 사용자 간 1:1 채팅 조건"""
+    if user2 is None:
+        return Chat.recipient_id == 'global'
+    return or_(
+        and_(Chat.sender_id == user1, Chat.recipient_id == user2),
+        and_(Chat.sender_id == user2, Chat.recipient_id == user1)
+    )
+
+def get_chat_history_page(user1=None, user2=None, before=None, limit=50):
+    """
+    대화 내역을 최신순으로 limit개 반환합니다. (user2가 없으면 전역 채팅)
+    before=(cursor_timestamp, id)를 주면 그보다 오래된 메시지부터 반환합니다. (키셋 페이지네이션)
+    """
+    cursor_timestamp, raw_timestamp = _cursor_timestamp(Chat.timestamp)
+    query = select(
+        Chat.id, Chat.sender_id, Chat.recipient_id, Chat.message, Chat.timestamp,
+        cursor_timestamp.label('cursor_timestamp')
+    ).where(_chat_conversation_filter(user1, user2))
+    if before is not None:
+        before_timestamp, before_id = before
+        query = query.where(or_(
+            raw_timestamp < before_timestamp,
+            and_(raw_timestamp == before_timestamp, Chat.id < before_id)
+        ))
+    query = query.order_by(Chat.timestamp.desc(), Chat.id.desc()).limit(limit)
+    session = ChatSessions[_chat_shard(user1, user2)]()
     try:
-        session.query(Chat).filter(Chat.id == chat_id).delete()
-        session.commit()
+        return session.execute(query).all()
     finally:
         session.close()
 
+def get_chats_before(cutoff, limit=500):
+    """
+    cutoff('%Y-%m-%d %H:%M:%S')보다 오래된 메시지를 오래된 순으로 limit개 반환합니다. (보관 작업용)
+    채팅 DB마다 limit개씩 읽어 합친 뒤 가장 오래된 limit개를 반환합니다.
+    """
+    cursor_timestamp, raw_timestamp = _cursor_timestamp(Chat.timestamp)
+    query = select(
+        Chat.id, Chat.sender_id, Chat.recipient_id, Chat.message, cursor_timestamp.label('cursor_timestamp')
+    ).where(raw_timestamp < cutoff).order_by(Chat.timestamp.asc(), Chat.id.asc()).limit(limit)
+    rows = _execute_on_chat_shards(query)
+    if len(chat_engines) > 1:
+        rows.sort(key=lambda row: (row.cursor_timestamp, row.id))
+    return rows[:limit]
+
+def delete_chats(chat_ids):
+    """여러 메시지를 채팅 DB마다 하나의 짧은 트랜잭션에서 삭제합니다."""
+    if not chat_ids:
+        return 0
+    total = 0
+    for chat_session in ChatSessions:
+        session = chat_session()
+        try:
+            deleted = session.query(Chat).filter(Chat.id.in_(chat_ids)).delete(synchronize_session=False)
+            if deleted:
+                _increment_counter(session, 'chats', -deleted, activity=False)
+            session.commit()
+            total += deleted
+        finally:
+            session.close()
+    return total
+
+def delete_chat_message(chat_id):
+    # 메시지 id만으로는 대화를 알 수 없으므로 삭제될 때까지 채팅 DB를 차례로 확인
+    for chat_session in ChatSessions:
+        session = chat_session()
+        try:
+            deleted = session.query(Chat).filter(Chat.id == chat_id).delete()
+            if deleted:
+                _increment_counter(session, 'chats', -deleted, activity=False)
+            session.commit()
+        finally:
+            session.close()
+        if deleted:
+            return
+
 # --------------------- 지갑 관련 함수 ---------------------
 
-def create_wallet_transaction(sender_id, recipient_id, amount, transaction_type):
-    session = SessionLocal()
-    try:
-        txn_id = str(uuid.uuid4())
-        txn = WalletTransaction(
-            id=txn_id,
-            sender_id=sender_id,
-            recipient_id=recipient_id,
-            amount=amount,
-            transaction_type=transaction_type
-        )
-        session.add(txn)
-        session.commit()
-        return txn_id
-    finally:
-        session.close()
+@_write_operation()
+def create_wallet_transaction(session, sender_id, recipient_id, amount, transaction_type):
+    txn_id = new_id()
+    txn = WalletTransaction(
+        id=txn_id,
+        sender_id=sender_id,
+        recipient_id=recipient_id,
+        amount=amount,
+        transaction_type=transaction_type
+    )
+    session.add(txn)
+    return txn_id
 
 def get_wallet_transactions(user_id, limit=50):
     session = SessionLocal()
@@ -345,17 +1045,215 @@ def get_wallet_transactions(user_id, limit=50):
     finally:
         session.close()
 
-def transfer_wallet(sender_id, recipient_id, amount):
+@_write_operation()
+def transfer_wallet(session, sender_id, recipient_id, amount):
+    sender = session.query(User).filter(User.id == sender_id).first()
+    recipient = session.query(User).filter(User.id == recipient_id).first()
+    if sender is None or recipient is None:
+        raise Exception("사용자 정보가 없습니다.")
+    sender.wallet -= amount
+    recipient.wallet += amount
+
+  
+
+# --------------------- 내보내기(export) 관련 함수 ---------------------
+
+# 서버 측 커서에서 한 번에 가져올 행 수
+EXPORT_BATCH_SIZE = 1000
+
+def _iter_by_time(model, columns, since=None, until=None, after=None, batch_size=EXPORT_BATCH_SIZE, bind=None):
+    """
+    (timestamp, id) 순서로 행을 하나씩 반환하는 제너레이터입니다.
+    ORM 객체 대신 컬럼 튜플을 서버 측 커서로 batch_size씩 읽어 메모리 사용량이 일정합니다.
+    각 행의 cursor_timestamp는 DB에 저장된 timestamp 문자열 그대로이며,
+    after=(cursor_timestamp, id)를 주면 해당 행 다음부터 이어서 읽습니다. (키셋 페이지네이션)
+    since/until은 '%Y-%m-%d %H:%M:%S' 형식 문자열입니다. bind를 주면 해당 엔진(채팅 DB)에서 읽습니다.
+    """
+    # SQLite는 timestamp를 문자열로 저장하므로 datetime으로 변환하지 않고 저장된 형식 그대로 비교
+    cursor_timestamp, raw_timestamp = _cursor_timestamp(model.timestamp)
+    query = select(*columns, cursor_timestamp.label('cursor_timestamp'))\
+        .order_by(model.timestamp.asc(), model.id.asc())
+    if since is not None:
+        query = query.where(raw_timestamp >= since)
+    if until is not None:
+        query = query.where(raw_timestamp < until)
+    if after is not None:
+        after_timestamp, after_id = after
+        query = query.where(or_(
+            raw_timestamp > after_timestamp,
+            and_(raw_timestamp == after_timestamp, model.id > after_id)
+        ))
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            yield row
+
+def iter_reports(since=None, until=None, after=None):
+    return _iter_by_time(Report, [Report.id, Report.reporter_id, Report.target_id, Report.reason, Report.timestamp],
+                         since, until, after)
+
+def iter_chats(since=None, until=None, after=None):
+    """채팅 DB가 여러 개면 DB별 결과를 (timestamp, id) 순서로 병합합니다."""
+    columns = [Chat.id, Chat.sender_id, Chat.recipient_id, Chat.message, Chat.timestamp]
+    if len(chat_engines) == 1:
+        return _iter_by_time(Chat, columns, since, until, after, bind=chat_engines[0])
+    return heapq.merge(
+        *[_iter_by_time(Chat, columns, since, until, after, bind=chat_engine) for chat_engine in chat_engines],
+        key=lambda row: (row.cursor_timestamp, row.id)
+    )
+
+def iter_wallet_transactions(since=None, until=None, after=None):
+    return _iter_by_time(WalletTransaction, [
+        WalletTransaction.id, WalletTransaction.sender_id, WalletTransaction.recipient_id,
+        WalletTransaction.amount, WalletTransaction.transaction_type, WalletTransaction.timestamp
+    ], since, until, after)
+
+# --------------------- 대시보드 집계 관련 함수 ---------------------
+
+# 대시보드에 표시하는 집계 항목
+COUNTER_NAMES = ('users', 'products', 'reports', 'chats', 'suspended_users')
+SUSPENDED_STATUS = '휴먼'
+# 활동 버킷 보관 기간 (최근 24시간 조회 + 여유분)
+ACTIVITY_RETENTION = timedelta(hours=48)
+
+def _activity_bucket(moment):
+    return moment.strftime('%Y-%m-%d %H')
+
+def _increment_counter(session, name, delta=1, activity=True):
+    """
+    호출한 쪽의 트랜잭션 안에서 집계값을 delta만큼 변경합니다.
+    activity=True면 현재 시간 버킷의 활동 수도 함께 증가시킵니다.
+    """
+    updated = session.query(StatCounter).filter(StatCounter.name == name)\
+        .update({"value": StatCounter.value + delta}, synchronize_session=False)
+    if not updated:
+        session.add(StatCounter(name=name, value=delta))
+    if activity:
+        bucket = _activity_bucket(datetime.utcnow())
+        updated = session.query(StatActivity).filter(StatActivity.name == name, StatActivity.bucket == bucket)\
+            .update({"count": StatActivity.count + delta}, synchronize_session=False)
+        if not updated:
+            session.add(StatActivity(name=name, bucket=bucket, count=delta))
+    # 같은 세션에서 다시 증가시킬 때 새로 추가한 행이 UPDATE 대상이 되도록 반영
+    session.flush()
+
+def _read_counters(session, totals, last_24h, names):
+    """session의 DB에 있는 names 집계값을 totals, last_24h에 더합니다."""
+    for name, value in session.query(StatCounter.name, StatCounter.value).filter(StatCounter.name.in_(names)):
+        totals[name] += value
+    since = _activity_bucket(datetime.utcnow() - timedelta(hours=23))
+    rows = session.query(StatActivity.name, func.sum(StatActivity.count))\
+        .filter(StatActivity.bucket >= since, StatActivity.name.in_(names)).group_by(StatActivity.name)
+    for name, count in rows:
+        last_24h[name] += count or 0
+
+def get_dashboard_stats():
+    """
+    전체 집계값과 최근 24시간 활동 수를 반환합니다. (집계 행만 읽으므로 데이터 양과 무관)
+    채팅 DB가 나뉘어 있으면 채팅 집계값은 채팅 DB마다 읽어 더합니다.
+    """
+    totals = {name: 0 for name in COUNTER_NAMES}
+    last_24h = {name: 0 for name in COUNTER_NAMES}
+    main_names = COUNTER_NAMES if _chats_in_main_db else [name for name in COUNTER_NAMES if name != 'chats']
     session = SessionLocal()
     try:
-        sender = session.query(User).filter(User.id == sender_id).first()
-        recipient = session.query(User).filter(User.id == recipient_id).first()
-        if sender is None or recipient is None:
-            raise Exception("사용자 정보가 없습니다.")
-        sender.wallet -= amount
-        recipient.wallet += amount
-        session.commit()
+        _read_counters(session, totals, last_24h, main_names)
     finally:
         session.close()
+    if not _chats_in_main_db:
+        for chat_session in ChatSessions:
+            session = chat_session()
+            try:
+                _read_counters(session, totals, last_24h, ['chats'])
+            finally:
+                session.close()
+    return {'totals': totals, 'last_24h': last_24h}
 
-  
\ No newline at end of file
+def _set_counter(session, name, value):
+    counter = session.get(StatCounter, name)
+    if counter is None:
+        session.add(StatCounter(name=name, value=value))
+    else:
+        counter.value = value
+
+def _recompute_activity(session, name, model, since, column=None):
+    """
+    최근 활동 버킷을 model 테이블에서 다시 계산하고, since보다 오래된 버킷은 삭제합니다.
+    column: 활동 시각 컬럼 (기본 model.timestamp)
+    """
+    # timestamp 문자열 앞 13자리가 'YYYY-MM-DD HH' 시간 버킷
+    cursor_timestamp, raw_timestamp = _cursor_timestamp(model.timestamp if column is None else column)
+    bucket = func.substr(cursor_timestamp, 1, 13)
+    rows = session.query(bucket, func.count(model.id))\
+        .filter(raw_timestamp >= since.strftime('%Y-%m-%d %H:%M:%S')).group_by(bucket).all()
+    session.query(StatActivity).filter(StatActivity.name == name).delete(synchronize_session=False)
+    for bucket_value, count in rows:
+        session.add(StatActivity(name=name, bucket=bucket_value, count=count))
+    session.query(StatActivity).filter(StatActivity.bucket < _activity_bucket(since))\
+        .delete(synchronize_session=False)
+
+def _recompute_report_windows(session, since):
+    """
+    신고 제한용 시간 버킷을 report 테이블에서 다시 계산합니다. (since 이전 버킷은 삭제)
+    현재 시간 버킷은 그대로 둡니다. 지금 들어오는 신고가 더하는 값이 재계산과 겹쳐 사라지지 않도록,
+    새 신고가 더 이상 들어오지 않는 지난 시간 버킷만 다시 만듭니다.
+    """
+    current = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    cursor_timestamp, raw_timestamp = _cursor_timestamp(Report.timestamp)
+    bucket = func.substr(cursor_timestamp, 1, 13)
+    rows = session.query(Report.reporter_id, Report.target_id, bucket, func.count(Report.id))\
+        .filter(raw_timestamp >= since.strftime('%Y-%m-%d %H:%M:%S'),
+                raw_timestamp < current.strftime('%Y-%m-%d %H:%M:%S'))\
+        .group_by(Report.reporter_id, Report.target_id, bucket).all()
+    counts = Counter()
+    for reporter_id, target_id, bucket_value, count in rows:
+        for scope, subject in _report_window_subjects(reporter_id, target_id):
+            counts[(scope, subject, bucket_value)] += count
+    session.query(ReportWindow).filter(ReportWindow.bucket < _activity_bucket(current))\
+        .delete(synchronize_session=False)
+    session.add_all(ReportWindow(scope=scope, subject=subject, bucket=bucket_value, count=count)
+                    for (scope, subject, bucket_value), count in counts.items())
+
+def recompute_counters():
+    """
+    실제 테이블을 집계해 누적값의 오차(drift)를 바로잡습니다. (주기 작업용)
+    시각 컬럼이 있는 상품(created_at)/신고/채팅은 최근 활동 버킷도 다시 계산하고, 오래된 버킷은 삭제합니다.
+    사용자 테이블에는 가입 시각이 없으므로 사용자 활동 버킷은 가입할 때 더하기만 합니다.
+    (대량 삽입한 사용자는 최근 24시간 가입 수에 나타나지 않음)
+    신고 제한용 버킷(report_window)도 최근 신고로 다시 계산합니다.
+    채팅 DB가 나뉘어 있으면 채팅 집계값은 채팅 DB마다 따로 계산해 해당 DB에 저장합니다.
+    """
+    since = datetime.utcnow() - ACTIVITY_RETENTION
+    session = SessionLocal()
+    try:
+        actual = {
+            'users': session.query(func.count(User.id)).scalar(),
+            'products': session.query(func.count(Product.id)).scalar(),
+            'reports': session.query(func.count(Report.id)).scalar(),
+            'suspended_users': session.query(func.count(User.id)).filter(User.status == SUSPENDED_STATUS).scalar(),
+        }
+        if _chats_in_main_db:
+            actual['chats'] = session.query(func.count(Chat.id)).scalar()
+        for name, value in actual.items():
+            _set_counter(session, name, value)
+        _recompute_activity(session, 'products', Product, since, Product.created_at)
+        _recompute_activity(session, 'reports', Report, since)
+        _recompute_report_windows(session, since)
+        if _chats_in_main_db:
+            _recompute_activity(session, 'chats', Chat, since)
+        session.commit()
+    finally:
+        session.close()
+    if not _chats_in_main_db:
+        actual['chats'] = 0
+        for chat_session in ChatSessions:
+            session = chat_session()
+            try:
+                count = session.query(func.count(Chat.id)).scalar()
+                _set_counter(session, 'chats', count)
+                _recompute_activity(session, 'chats', Chat, since)
+                session.commit()
+                actual['chats'] += count
+            finally:
+                session.close()
+    return actual
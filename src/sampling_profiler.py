@@ -0,0 +1,244 @@
+# sampling_profiler.py
+"""
+관리자가 요청한 라우트/Socket.IO 이벤트에 대한 샘플링 프로파일러.
+
+관리자 페이지(/admin/profile)에서 대상과 요청 수 N을 정해 시작하면, 대상과 일치하는 다음 N개 요청을 처리하는 동안
+별도의 네이티브 스레드가 interval_ms마다 그 요청의 호출 스택을 읽어 같은 스택끼리 횟수를 셉니다.
+결과는 collapsed stack 형식(한 줄에 "root;frame;...;leaf count")으로 내려받아 flamegraph.pl, speedscope 등으로 볼 수 있습니다.
+
+  - HTTP 대상: 엔드포인트(admin.products) 또는 URL 규칙(/admin/products). 시작할 때 해당 뷰 함수를 감싸고 끝나면 되돌림
+  - 소켓 대상: @sampled('socket:...')로 표시한 이벤트 핸들러. 꺼져 있을 때는 전역 변수 하나만 확인
+eventlet 환경에서도 샘플링 스레드는 monkey patch되지 않은 원래 threading으로 실행하며,
+요청을 처리하는 green thread가 실행 중일 때 잡힌 스택만 그 요청의 스택으로 셉니다.
+요청이 db_offload로 tpool 스레드에 옮긴 호출(DB 조회 등)은 follow()로 그 스레드의 스택도 요청의 호출 지점 아래에 이어서 셉니다.
+"""
+import os
+import sys
+import time
+import contextvars
+from collections import Counter
+from functools import wraps
+
+try:
+    from eventlet import patcher
+    _native_threading = patcher.original('threading')
+    _native_time = patcher.original('time')
+except ImportError:  # eventlet은 선택 의존성
+    import threading as _native_threading
+    _native_time = time
+
+DEFAULT_REQUESTS = 20
+DEFAULT_INTERVAL_MS = 5
+# 스택 하나에 기록할 최대 프레임 수
+MAX_DEPTH = 128
+# @sampled로 표시한 소켓 이벤트 이름
+socket_labels = set()
+# 샘플링 스레드와 요청이 함께 쓰므로 네이티브 잠금 사용
+_lock = _native_threading.Lock()
+_session = None
+# 프로파일 중인 요청의 (세션, wrapper 프레임) (db_offload가 contextvars를 복사하므로 tpool 스레드에서도 보임)
+_tracked = contextvars.ContextVar('sampling_profiler_tracked', default=None)
+
+
+class ProfileSession:
+    """대상과 일치하는 다음 requests개 요청의 스택 샘플을 모읍니다."""
+
+    def __init__(self, target, requests, interval_ms):
+        self.target = target
+        self.requests = requests
+        self.interval = interval_ms / 1000
+        self.claimed = 0
+        self.finished = 0
+        self.samples = 0
+        self.stacks = Counter()
+        self.started_at = time.time()
+        self.stopped = False
+        # 프로파일 중인 요청의 wrapper 프레임 -> 스택의 root 이름
+        self.frames = {}
+        # N개 요청을 모두 마치면 호출 (감싼 뷰 함수 되돌리기)
+        self.on_finish = None
+        self.thread = _native_threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    @property
+    def active(self):
+        return not self.stopped and self.finished < self.requests
+
+    def claim(self):
+        """이 요청을 프로파일할 차례면 True"""
+        with _lock:
+            if self.stopped or self.claimed >= self.requests:
+                return False
+            self.claimed += 1
+            return True
+
+    def enter(self, frame, label):
+        with _lock:
+            self.frames[frame] = label
+
+    def exit(self, frame):
+        with _lock:
+            self.frames.pop(frame, None)
+            self.finished += 1
+            done = self.finished >= self.requests
+        if done and self.on_finish:
+            self.on_finish()
+
+    def attach(self, frame, label):
+        """요청이 다른 스레드로 옮긴 호출의 프레임을 등록합니다. (요청 수에는 세지 않음)"""
+        with _lock:
+            self.frames[frame] = label
+
+    def detach(self, frame):
+        with _lock:
+            self.frames.pop(frame, None)
+
+    def path(self, root, frame):
+        """요청의 root 이름부터 frame까지의 스택 이름 (root가 frame의 호출 스택에 없으면 None)"""
+        with _lock:
+            label = self.frames.get(root)
+        stack = []
+        while frame is not None and frame is not root and len(stack) < MAX_DEPTH:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is not root or label is None:
+            return None
+        return ';'.join([label] + [_frame_name(item) for item in reversed(stack)])
+
+    def _run(self):
+        while self.active:
+            _native_time.sleep(self.interval)
+            self._sample()
+
+    def _sample(self):
+        with _lock:
+            frames = dict(self.frames)
+        if not frames:
+            return
+        for frame in sys._current_frames().values():
+            stack = []
+            while frame is not None and frame not in frames and len(stack) < MAX_DEPTH:
+                stack.append(frame)
+                frame = frame.f_back
+            if frame is None or frame not in frames:
+                continue
+            names = [frames[frame]] + [_frame_name(item) for item in reversed(stack)]
+            with _lock:
+                self.stacks[';'.join(names)] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        """collapsed stack 형식의 결과 (flamegraph.pl 입력)"""
+        with _lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self):
+        return {
+            'target': self.target, 'requests': self.requests, 'finished': self.finished,
+            'samples': self.samples, 'interval_ms': self.interval * 1000, 'active': self.active,
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+        }
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def current():
+    """진행 중이거나 마지막으로 끝난 프로파일 세션 (없으면 None)"""
+    return _session
+
+def _track(session, label, func, args, kwargs):
+    if not session.claim():
+        return func(*args, **kwargs)
+    frame = sys._getframe()
+    session.enter(frame, label)
+    token = _tracked.set((session, frame))
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _tracked.reset(token)
+        session.exit(frame)
+
+def follow(func):
+    """
+    프로파일 중인 요청이 다른 스레드(db_offload의 tpool)로 옮겨 실행할 func를 감쌉니다.
+    감싼 함수를 실행하는 동안 그 스레드의 스택을 요청의 호출 지점(follow를 호출한 함수) 아래에 이어서 셉니다.
+    프로파일 중이 아니면 func를 그대로 반환합니다.
+    """
+    tracked = _tracked.get()
+    if tracked is None or not tracked[0].active:
+        return func
+    session, root = tracked
+    label = session.path(root, sys._getframe(1))
+    if label is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        frame = sys._getframe()
+        session.attach(frame, label)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.detach(frame)
+    return wrapper
+
+def sampled(label):
+    """Socket.IO 이벤트 핸들러를 프로파일 대상으로 표시합니다. (꺼져 있으면 바로 호출)"""
+    socket_labels.add(label)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            session = _session
+            if session is None or session.target != label or not session.active:
+                return f(*args, **kwargs)
+            return _track(session, label, f, args, kwargs)
+        return wrapper
+    return decorator
+
+def resolve_target(app, target):
+    """대상 이름을 엔드포인트 또는 소켓 이벤트 이름으로 바꿉니다. (알 수 없으면 None)"""
+    if target in socket_labels or target in app.view_functions:
+        return target
+    for rule in app.url_map.iter_rules():
+        if rule.rule == target:
+            return rule.endpoint
+    return None
+
+def targets(app):
+    """프로파일할 수 있는 대상 목록"""
+    endpoints = sorted(endpoint for endpoint in app.view_functions if endpoint != 'static')
+    return endpoints + sorted(socket_labels)
+
+def start(app, target, requests=DEFAULT_REQUESTS, interval_ms=DEFAULT_INTERVAL_MS):
+    """target과 일치하는 다음 requests개 요청의 프로파일을 시작합니다. (진행 중인 세션은 중지)"""
+    global _session
+    stop(app)
+    session = ProfileSession(target, requests, interval_ms)
+    if target in app.view_functions:
+        view = app.view_functions[target]
+
+        @wraps(view)
+        def profiled_view(*args, **kwargs):
+            return _track(session, target, view, args, kwargs)
+        profiled_view.original_view = view
+        app.view_functions[target] = profiled_view
+        session.on_finish = lambda: _restore_view(app, target)
+    _session = session
+    session.thread.start()
+    return session
+
+def stop(app):
+    """진행 중인 세션을 멈추고 감싼 뷰 함수를 되돌립니다. (모은 결과는 유지)"""
+    session = _session
+    if session is None:
+        return
+    session.stopped = True
+    _restore_view(app, session.target)
+
+def _restore_view(app, endpoint):
+    original = getattr(app.view_functions.get(endpoint), 'original_view', None)
+    if original is not None:
+        app.view_functions[endpoint] = original
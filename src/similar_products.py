@@ -0,0 +1,290 @@
+# similar_products.py
+"""
+상품 상세 화면의 "비슷한 상품" 추천용 프로세스 내 벡터 색인.
+
+상품명과 설명의 단어(및 단어 안의 두 글자 조각)를 해시해 DIMENSIONS차원 벡터로 만들고(feature hashing),
+L2 정규화한 벡터를 NumPy 행렬 한 행에 보관합니다. 두 상품의 유사도는 벡터 내적(코사인 유사도)입니다.
+행렬은 행마다 최대 절댓값을 127로 맞춘 int8로 보관하고(행별 배율은 scales), 계산은 float32로 합니다.
+  - 상품을 등록/수정/삭제하면(user_service, admin_service, product_import) 해당 행만 갱신
+  - 시작 시(및 SIMILAR_PRODUCTS_REBUILD_INTERVAL마다) DB의 모든 상품으로 다시 만듦 (rebuild)
+  - 상품이 CLUSTER_MIN_PRODUCTS개 이상이면 rebuild 때 k-means로 묶음(클러스터)을 만들고, 조회할 때는
+    질의와 가까운 CLUSTER_PROBES개 묶음의 상품만 비교 (전체 행렬을 읽지 않으므로 상품 수가 늘어도 조회 시간이 거의 일정)
+numpy가 없으면 추천을 사용하지 않습니다. 색인은 프로세스마다 따로 있으므로 워커가 하나인 배포를 전제로 합니다.
+"""
+import re
+import math
+import zlib
+import threading
+from collections import Counter
+import repository
+
+try:
+    import numpy as np
+except ImportError:  # numpy는 선택 의존성 (없으면 추천을 표시하지 않음)
+    np = None
+
+# 벡터 차원 수 (SIMILAR_PRODUCTS_DIMENSIONS, int8이므로 상품 100만 개에 약 260MB)
+# 차원이 적으면 서로 다른 단어가 같은 차원에 겹쳐(해시 충돌) 추천이 부정확해짐 (bench/similar_bench.py의 precision 참고)
+DIMENSIONS = 256
+# 상품명 단어는 설명 단어보다 이 배수만큼 무겁게 반영
+TITLE_WEIGHT = 2.0
+# 상세 화면에 표시할 추천 상품 수
+SIMILAR_LIMIT = 6
+# 이보다 상품이 적으면 묶음을 만들지 않고 전체 행렬과 비교
+CLUSTER_MIN_PRODUCTS = 20000
+# 조회할 때 비교할 묶음 수
+CLUSTER_PROBES = 8
+# k-means 학습에 묶음당 사용할 표본 수와 반복 횟수
+KMEANS_SAMPLES_PER_CLUSTER = 20
+KMEANS_ITERATIONS = 8
+# rebuild와 묶음 배정에서 한 번에 처리할 행 수
+BATCH_SIZE = 10000
+_WORD = re.compile(r'\w+')
+
+
+def available():
+    return np is not None
+
+def _quantize(vectors):
+    """float32 행렬을 (int8 행렬, 행별 배율)로 바꿉니다. (행마다 최대 절댓값이 127)"""
+    scales = (np.abs(vectors).max(axis=1) / 127).astype(np.float32)
+    quantized = np.rint(vectors / np.where(scales > 0, scales, 1)[:, None]).astype(np.int8)
+    return quantized, scales
+
+def _dot(vectors, scales, query):
+    """int8 행렬과 질의 벡터의 내적 (임시 float32 행렬이 커지지 않도록 BATCH_SIZE행씩 계산)"""
+    return np.concatenate([np.zeros(0, dtype=np.float32)] + [
+        (vectors[start:start + BATCH_SIZE].astype(np.float32) @ query) * scales[start:start + BATCH_SIZE]
+        for start in range(0, len(vectors), BATCH_SIZE)
+    ])
+
+def _features(text):
+    for word in _WORD.findall(text.lower()):
+        yield word
+        # 한국어는 조사/어미가 붙으므로 단어 안의 두 글자 조각도 사용 (예: '자전거를' ~ '자전거')
+        if len(word) > 2:
+            for index in range(len(word) - 1):
+                yield '#' + word[index:index + 2]
+
+def vectorize(title, description, dimensions=DIMENSIONS):
+    """상품명/설명을 L2 정규화한 해시 벡터로 만듭니다. (tf는 1 + log(tf)로 완화)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for weight, text in ((TITLE_WEIGHT, title), (1.0, description)):
+        for feature, tf in Counter(_features(text or '')).items():
+            hashed = zlib.crc32(feature.encode('utf-8'))
+            # 해시 충돌이 한쪽으로 쌓이지 않도록 부호도 해시로 정함
+            sign = 1.0 if hashed & 0x80000000 else -1.0
+            vector[hashed % dimensions] += sign * weight * (1.0 + math.log(tf))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarProducts:
+    """상품 ID별 벡터 행렬과 (상품이 많으면) 묶음별 행 번호 집합"""
+
+    def __init__(self, dimensions=DIMENSIONS):
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.loaded = False
+        # rebuild 중에 들어온 변경 (새 색인으로 바꾼 뒤 다시 적용)
+        self.pending = None
+        self._reset()
+
+    def _reset(self):
+        self.vectors = np.zeros((0, self.dimensions), dtype=np.int8) if np is not None else None
+        self.scales = np.zeros(0, dtype=np.float32) if np is not None else None  # 행 번호 -> int8 배율
+        self.ids = []           # 행 번호 -> 상품 ID (삭제된 행은 None)
+        self.rows = {}          # 상품 ID -> 행 번호
+        self.free = []          # 삭제되어 다시 쓸 수 있는 행 번호
+        self.centroids = None   # 묶음 중심 (묶음을 쓰지 않으면 None)
+        self.clusters = []      # 묶음 번호 -> 행 번호 집합
+        self.assignments = {}   # 행 번호 -> 묶음 번호
+
+    @property
+    def size(self):
+        return len(self.rows)
+
+    def configure(self, dimensions):
+        """벡터 차원 수를 바꿉니다. (다음 rebuild부터 적용, 그 전까지는 추천 없음)"""
+        with self.lock:
+            if dimensions != self.dimensions:
+                self.dimensions = dimensions
+                self.loaded = False
+                self._reset()
+
+    def build(self, rows=None):
+        """
+        rows((id, title, description) 목록, 기본은 DB의 모든 상품)로 새 색인을 만들어 반환합니다.
+        self의 색인과 잠금을 건드리지 않으므로 다른 스레드(tpool)에서 실행해도 됩니다.
+        """
+        fresh = SimilarProducts(self.dimensions)
+        fresh._load(repository.iter_products() if rows is None else rows)
+        if fresh.size >= CLUSTER_MIN_PRODUCTS:
+            fresh._cluster()
+        return fresh
+
+    def rebuild(self, rows=None, offload=None):
+        """
+        build로 새 색인을 만들어 바꿉니다. 만드는 동안에도 기존 색인으로 조회하며,
+        그 사이의 등록/수정/삭제는 새 색인에 다시 적용합니다.
+        offload(func, *args)를 주면 build만 그 함수로 실행합니다. (예: db_offload.call)
+        잠금은 rebuild를 호출한 스레드에서만 잡으므로, eventlet에서는 green thread에서 호출해야 합니다.
+        """
+        if np is None:
+            return
+        with self.lock:
+            self.pending = []
+        try:
+            fresh = offload(self.build, rows) if offload else self.build(rows)
+            with self.lock:
+                pending, self.pending = self.pending, None
+                self.vectors, self.scales = fresh.vectors, fresh.scales
+                self.ids, self.rows, self.free = fresh.ids, fresh.rows, fresh.free
+                self.centroids, self.clusters, self.assignments = fresh.centroids, fresh.clusters, fresh.assignments
+                self.loaded = True
+                for method, args in pending:
+                    method(*args)
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def _load(self, rows):
+        chunks, batch = [], []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                chunks.append(self._vectorize_batch(batch))
+                batch = []
+        if batch:
+            chunks.append(self._vectorize_batch(batch))
+        if chunks:
+            self.vectors = np.concatenate([vectors for vectors, _ in chunks])
+            self.scales = np.concatenate([scales for _, scales in chunks])
+
+    def _vectorize_batch(self, batch):
+        vectors = np.empty((len(batch), self.dimensions), dtype=np.float32)
+        for offset, (product_id, title, description) in enumerate(batch):
+            vectors[offset] = vectorize(title, description, self.dimensions)
+            self.rows[product_id] = len(self.ids)
+            self.ids.append(product_id)
+        return _quantize(vectors)
+
+    def _cluster(self):
+        """표본으로 구면 k-means를 학습한 뒤 모든 행을 가장 가까운 묶음에 배정합니다."""
+        count = min(4096, max(16, int(math.sqrt(self.size))))
+        generator = np.random.default_rng(0)
+        picked = generator.choice(len(self.ids), min(len(self.ids), count * KMEANS_SAMPLES_PER_CLUSTER), replace=False)
+        sample = self.vectors[picked].astype(np.float32) * self.scales[picked, None]
+        centroids = sample[generator.choice(len(sample), count, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # 표본이 배정되지 않은 묶음은 이전 중심을 유지
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.clusters = [set() for _ in range(count)]
+        for start in range(0, len(self.ids), BATCH_SIZE):
+            # 행별 배율은 양수이므로 가장 가까운 묶음은 int8 값만으로 정해짐
+            labels = np.argmax(self.vectors[start:start + BATCH_SIZE].astype(np.float32) @ self.centroids.T, axis=1)
+            for row, label in enumerate(labels.tolist(), start):
+                self.clusters[label].add(row)
+                self.assignments[row] = label
+
+    def add(self, product_id, title, description):
+        """상품을 추가하거나 벡터를 갱신합니다. (수정 시에도 호출)"""
+        if np is None:
+            return
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((self._add, (product_id, title, description)))
+            if self.loaded:
+                self._add(product_id, title, description)
+
+    def _add(self, product_id, title, description):
+        vector = vectorize(title, description, self.dimensions)
+        row = self.rows.get(product_id)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.ids)
+                self.ids.append(None)
+                if row >= len(self.vectors):
+                    # 행렬이 가득 차면 25%씩 늘림 (추가 비용은 평균 상수 시간, 큰 행렬도 메모리를 두 배로 잡지 않음)
+                    capacity = len(self.vectors) + max(16, len(self.vectors) // 4)
+                    grown = np.zeros((capacity, self.dimensions), dtype=np.int8)
+                    grown[:len(self.vectors)] = self.vectors
+                    self.vectors = grown
+                    scales = np.zeros(capacity, dtype=np.float32)
+                    scales[:len(self.scales)] = self.scales
+                    self.scales = scales
+            self.ids[row] = product_id
+            self.rows[product_id] = row
+        quantized, scales = _quantize(vector[None, :])
+        self.vectors[row], self.scales[row] = quantized[0], scales[0]
+        if self.centroids is not None:
+            self._unassign(row)
+            label = int(np.argmax(self.centroids @ vector))
+            self.clusters[label].add(row)
+            self.assignments[row] = label
+
+    def remove(self, product_id):
+        if np is None:
+            return
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((self._remove, (product_id,)))
+            if self.loaded:
+                self._remove(product_id)
+
+    def _remove(self, product_id):
+        row = self.rows.pop(product_id, None)
+        if row is None:
+            return
+        self.ids[row] = None
+        self.vectors[row] = 0
+        self.scales[row] = 0
+        self.free.append(row)
+        self._unassign(row)
+
+    def _unassign(self, row):
+        label = self.assignments.pop(row, None)
+        if label is not None:
+            self.clusters[label].discard(row)
+
+    def similar(self, product_id, limit=SIMILAR_LIMIT):
+        """product_id와 비슷한 상품 ID를 유사도가 높은 순으로 최대 limit개 반환합니다. (색인 전이면 빈 목록)"""
+        if np is None:
+            return []
+        with self.lock:
+            row = self.rows.get(product_id)
+            if row is None:
+                return []
+            query = self.vectors[row].astype(np.float32) * self.scales[row]
+            if self.centroids is None:
+                candidates = None
+                scores = _dot(self.vectors[:len(self.ids)], self.scales[:len(self.ids)], query)
+            else:
+                probes = min(CLUSTER_PROBES, len(self.clusters))
+                nearest = np.argpartition(self.centroids @ query, -probes)[-probes:]
+                candidates = np.fromiter(
+                    (candidate for label in nearest.tolist() for candidate in self.clusters[label]), dtype=np.int64
+                )
+                scores = _dot(self.vectors[candidates], self.scales[candidates], query)
+            # 자기 자신 제외 (삭제된 행은 영벡터라 점수가 0이므로 아래에서 걸러짐)
+            if candidates is None:
+                scores[row] = -np.inf
+            else:
+                scores[candidates == row] = -np.inf
+            count = min(limit, len(scores) - 1)
+            if count <= 0:
+                return []
+            top = np.argpartition(scores, -count)[-count:]
+            top = top[np.argsort(-scores[top])]
+            rows = top if candidates is None else candidates[top]
+            return [self.ids[item] for item, score in zip(rows.tolist(), scores[top].tolist()) if score > 0]
+
+
+index = SimilarProducts()
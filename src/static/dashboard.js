@@ -9,11 +9,34 @@ document.addEventListener("DOMContentLoaded", function () {
     socket.emit("join", { user_id: currentUserId });
   });
 
-  socket.on("message", function (data) {
-    const messages = document.getElementById("messages");
+  function appendMessage(messages, data) {
     const item = document.createElement("li");
     item.textContent = data.username + ": " + data.message;
     messages.appendChild(item);
+  }
+
+  socket.on("message", function (data) {
+    const messages = document.getElementById("messages");
+    appendMessage(messages, data);
+    messages.scrollTop = messages.scrollHeight;
+  });
+
+  // 연결(join)할 때 서버가 보내는 최근 전역 채팅 메시지 (재연결 중 놓친 메시지 포함)
+  socket.on("history", function (history) {
+    const messages = document.getElementById("messages");
+    messages.replaceChildren();
+    history.forEach(function (data) {
+      appendMessage(messages, data);
+    });
+    messages.scrollTop = messages.scrollHeight;
+  });
+
+  // 메시지가 몰릴 때 서버가 묶어서 보내는 전역 채팅 메시지 목록
+  socket.on("messages", function (batch) {
+    const messages = document.getElementById("messages");
+    batch.forEach(function (data) {
+      appendMessage(messages, data);
+    });
     messages.scrollTop = messages.scrollHeight;
   });
 
@@ -1,8 +1,10 @@
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 import user_service as service
+import product_import
+from admission import priority, CRITICAL, LOW
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
@@ -107,6 +109,7 @@ def register():
     return render_template('register.html')
 
 @user_bp.route('/login', methods=['GET', 'POST'])
+@priority(CRITICAL)
 @limiter.limit("10 per minute")
 def login():
     if request.method == 'POST':
@@ -146,6 +149,7 @@ def check_cookie_flags(response):
     return response
 
 @user_bp.route('/logout')
+@priority(CRITICAL)
 def logout():
     response = redirect(url_for('user.index'))
     response.delete_cookie('jwt')
@@ -159,7 +163,7 @@ def dashboard():
     user = request.user
     products = service.list_products()
     global_chats = service.get_global_chats()
-    return render_template('dashboard.html', user=user, products=products, global_chats=global_chats, service=service)
+    return render_template('dashboard.html', user=user, products=products, global_chats=global_chats)
 
 # === 프로필 관련 ===
 @user_bp.route('/profile', methods=['GET', 'POST'])
@@ -199,6 +203,20 @@ def new_product():
         return redirect(url_for('user.dashboard'))
     return render_template('new_product.html')
 
+@user_bp.route('/product/import', methods=['GET', 'POST'])
+@login_required
+@limiter.limit("5 per minute")
+def import_products():
+    if request.method == 'POST':
+        file = request.files.get('file')
+        if not file or not file.filename:
+            flash("가져올 파일을 선택해 주세요.")
+            return redirect(url_for('user.import_products'))
+        result = product_import.import_uploaded_file(file, request.user.id, request.form.get('format') or None)
+        flash(f"{result['imported']}개의 상품이 등록되었습니다. (실패 {result['failed']}건)")
+        return render_template('import_products.html', result=result)
+    return render_template('import_products.html', result=None)
+
 @user_bp.route('/product/<product_id>')
 @login_required 
 def view_product(product_id):
@@ -207,7 +225,8 @@ def view_product(product_id):
         flash("상품을 찾을 수 없습니다.")
         return redirect(url_for('user.dashboard'))
     seller = service.get_user(product.seller_id)
-    return render_template('view_product.html', product=product, seller=seller)
+    similar = service.get_similar_products(product.id)
+    return render_template('view_product.html', product=product, seller=seller, similar=similar)
 
 @user_bp.route('/product/edit/<product_id>', methods=['GET', 'POST'])
 @login_required
@@ -240,13 +259,26 @@ def delete_product(product_id):
     return redirect(url_for('user.dashboard'))
 
 @user_bp.route('/product/search', methods=['GET'])
+@priority(LOW)
 @login_required
 def search_products_route():
     query = request.args.get('q', '')
-    products = []
-    if query:
-        products = service.search_products(query)
-    return render_template('product_search_results.html', products=products, query=query)
+    filters = {
+        'min_price': request.args.get('min_price', ''),
+        'max_price': request.args.get('max_price', ''),
+        'sort': request.args.get('sort', 'recent'),
+    }
+    products, next_cursor = [], None
+    # 검색어 없이 가격 조건/정렬만으로도 목록을 볼 수 있음
+    searched = bool(query or filters['min_price'] or filters['max_price'] or 'sort' in request.args)
+    if searched:
+        page, error = service.search_products_page(query, cursor=request.args.get('cursor'), **filters)
+        if error:
+            flash(error)
+        else:
+            products, next_cursor = page['products'], page['next_cursor']
+    return render_template('product_search_results.html', products=products, query=query,
+                           filters=filters, searched=searched, next_cursor=next_cursor)
 
 # === 신고 관련 ===
 @user_bp.route('/report', methods=['GET', 'POST'])
@@ -265,6 +297,7 @@ def report():
 
 # === 사용자 관련 ===
 @user_bp.route('/users')
+@priority(LOW)
 @login_required
 def users():
     all_users = service.get_user_list()
@@ -291,8 +324,25 @@ def chat(recipient_id):
         return redirect(url_for('user.dashboard'))
     return render_template('chat.html', recipient=recipient)
 
+@user_bp.route('/chat/history')
+@login_required
+def chat_history():
+    """
+    채팅 내역을 최신순으로 페이지 단위 조회합니다. (JSON)
+      - with: 대화 상대 사용자 ID (없으면 전역 채팅)
+      - cursor: 이전 응답의 next_cursor (그보다 오래된 메시지 조회)
+      - limit: 페이지 크기 (최대 100)
+    """
+    page, error = service.get_chat_history(
+        request.user.id, request.args.get('with'), request.args.get('cursor'), request.args.get('limit', 50)
+    )
+    if error:
+        return jsonify({'error': error}), 400
+    return jsonify(page)
+
 # === 송금 관련 ===
 @user_bp.route('/wallet')
+@priority(CRITICAL)
 @login_required
 def wallet():
     user = request.user
@@ -300,6 +350,7 @@ def wallet():
     return render_template('wallet.html', user=user, transactions=transactions, service=service)
 
 @user_bp.route('/user/<user_id>/transfer', methods=['GET', 'POST'])
+@priority(CRITICAL)
 @login_required
 def transfer_funds_route(user_id):
     recipient = service.get_user(user_id)
@@ -2,8 +2,12 @@
 import re
 import bcrypt
 import repository
+import chat_archive
+import recent_chats
+import similar_products
+import fraud
 from datetime import datetime, timedelta
-from utils import sanitize_input, safe_int
+from utils import sanitize_input, safe_int, encode_cursor, decode_cursor, parse_fields
 
 
 # === 사용자 관련 서비스 ===
@@ -59,8 +63,8 @@ def login_user(username, password):
 
     now = datetime.utcnow()
     if user.lockout_until:
-        # 문자열을 datetime 객체로 변환합니다.
-        lockout_until = datetime.strptime(user.lockout_until, '%Y-%m-%d %H:%M:%S.%f')
+        # DateTime 컬럼이므로 DB 종류와 관계없이 datetime 객체로 조회됩니다.
+        lockout_until = user.lockout_until
         if lockout_until > now:
             remaining = safe_int((lockout_until - now).total_seconds())
             return None, f"계정이 잠겨있습니다. {remaining}초 후에 다시 시도해 주세요."
@@ -133,7 +137,9 @@ def add_product(title, description, price, seller_id):
         return None, f'상품 설명은 {PRODUCT_DESCRIPTION_MAX_LENGTH}자 이내로 작성해 주세요.'
     if price < 0:
         return None, f'가격은 {PRODUCT_PRICE_MIN} 이상이어야 합니다.'
-    return repository.create_product(title, description, price, seller_id)
+    product_id = repository.create_product(title, description, price, seller_id)
+    similar_products.index.add(product_id, title, description)
+    return product_id
 
 def list_products():
     return repository.get_all_products()
@@ -144,6 +150,12 @@ def get_product(product_id):
     return repository.get_product_by_id(product_id)
 
 
+def get_similar_products(product_id):
+    """비슷한 상품을 유사도가 높은 순으로 반환합니다. (색인 전이거나 numpy가 없으면 빈 목록)"""
+    similar_ids = similar_products.index.similar(product_id)
+    products = repository.get_products_by_ids(similar_ids)
+    return [products[similar_id] for similar_id in similar_ids if similar_id in products]
+
 def update_product_by_user(user_id, product_id, title, description, price):
     user_id = sanitize_input(user_id)
     product_id = sanitize_input(product_id)
@@ -164,6 +176,7 @@ def update_product_by_user(user_id, product_id, title, description, price):
     if product.seller_id != user_id:
         return None, "수정 권한이 없습니다."
     repository.edit_product(product_id, title, description, price)
+    similar_products.index.add(product_id, title, description)
     return product, None
 
 def delete_product_by_user(user_id, product_id):
@@ -176,6 +189,7 @@ def delete_product_by_user(user_id, product_id):
     if product.seller_id != user_id:
         return None, "삭제 권한이 없습니다."
     repository.delete_product(product_id)
+    similar_products.index.remove(product_id)
     return product_id, None
     
 def search_products(query):
@@ -183,6 +197,86 @@ def search_products(query):
     
     return repository.search_products(query)  # 주의: repository.search_products()를 호출해야 함
 
+PRODUCT_SEARCH_PAGE_SIZE = 20
+
+def search_products_page(query='', min_price=None, max_price=None, sort='recent', cursor=None,
+                         limit=PRODUCT_SEARCH_PAGE_SIZE, fields=None):
+    """
+    상품명/가격 범위 검색 (가격순/최신순 정렬, 커서 기반 페이지네이션).
+    fields를 주면 해당 컬럼만 조회한 행을 반환합니다. (JSON API)
+    반환값: ({'products': [...], 'next_cursor': ...}, None) 또는 (None, 오류 메시지)
+    """
+    query = sanitize_input(query).strip()
+    sort = sanitize_input(sort) or 'recent'
+    if sort not in repository.PRODUCT_SORTS:
+        return None, "지원하지 않는 정렬 방식입니다."
+    # 빈 값은 조건 없음으로 처리
+    min_price = safe_int(min_price, use_abort=True) if sanitize_input(min_price) else None
+    max_price = safe_int(max_price, use_abort=True) if sanitize_input(max_price) else None
+    if min_price is not None and max_price is not None and min_price > max_price:
+        return None, "최소 가격이 최대 가격보다 큽니다."
+
+    after = None
+    if cursor:
+        values = decode_cursor(sanitize_input(cursor))
+        # 가격순 커서는 (정수, id), 최신순 커서는 (등록 시각 문자열, id)
+        value_type = str if sort == 'recent' else int
+        if (not values or len(values) != 2 or not isinstance(values[1], str)
+                or not isinstance(values[0], value_type) or isinstance(values[0], bool)):
+            return None, "잘못된 커서입니다."
+        after = tuple(values)
+
+    products, next_after = repository.search_products_page(
+        query, min_price, max_price, sort, after, limit, fields
+    )
+    return {
+        'products': products,
+        'next_cursor': encode_cursor(*next_after) if next_after else None,
+    }, None
+
+# === JSON API ===
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# 선택할 수 있는 필드 (fields 파라미터가 없으면 전체)
+USER_API_FIELDS = repository.USER_API_COLUMNS
+PRODUCT_API_FIELDS = repository.PRODUCT_API_COLUMNS
+CHAT_API_FIELDS = ('id', 'sender_id', 'username', 'message', 'timestamp')
+
+def api_page_size(limit):
+    if not sanitize_input(limit):
+        return API_PAGE_SIZE
+    return min(max(safe_int(limit, use_abort=True), 1), API_MAX_PAGE_SIZE)
+
+def api_fields(value, allowed):
+    """fields 파라미터를 검증합니다. 반환값: (필드 튜플, None) 또는 (None, 오류 메시지)"""
+    fields = parse_fields(sanitize_input(value), allowed)
+    if fields is None:
+        return None, f"선택할 수 있는 필드는 {', '.join(allowed)} 입니다."
+    return fields, None
+
+def get_users_page(cursor=None, limit=API_PAGE_SIZE, fields=USER_API_FIELDS):
+    """
+    휴면이 아닌 사용자 목록 (가입 순서, 커서 기반 페이지네이션). 선택한 컬럼만 조회합니다.
+    반환값: ({'users': [...], 'next_cursor': ...}, None) 또는 (None, 오류 메시지)
+    """
+    after = None
+    if cursor:
+        values = decode_cursor(sanitize_input(cursor))
+        if not values or len(values) != 1 or not isinstance(values[0], str):
+            return None, "잘못된 커서입니다."
+        after = values[0]
+    users, next_after = repository.get_users_page(after, limit, fields)
+    return {
+        'users': users,
+        'next_cursor': encode_cursor(next_after) if next_after else None,
+    }, None
+
+def get_public_user(user_id, fields=USER_API_FIELDS):
+    return repository.get_public_user_fields(sanitize_input(user_id), fields)
+
+def get_product_fields(product_id, fields=PRODUCT_API_FIELDS):
+    return repository.get_product_fields(sanitize_input(product_id), fields)
+
 # === 신고 관련 ===
 # 신고 제한 상수들
 MAX_TARGET_ID_LENGTH = 36         # 예: UUID 형식이면 36자
@@ -190,6 +284,15 @@ MAX_REASON_LENGTH = 500           # 신고 사유 최대 길이
 DAILY_REPORT_LIMIT = 5            # 하루 최대 신고 건수
 SAME_TARGET_INTERVAL = timedelta(hours=24)  # 동일 대상 신고 제한 기간 (24시간)
 TARGET_REPORT_THRESHOLD = 10      # 동일 대상이 24시간 내에 신고된 건수 임계값
+REPORT_LIMITS = repository.ReportLimits(SAME_TARGET_INTERVAL, DAILY_REPORT_LIMIT, TARGET_REPORT_THRESHOLD)
+REPORT_LIMIT_MESSAGES = {
+    # 지난 24시간 동안 동일 대상을 신고한 적이 있음
+    'same_target': "이미 최근에 이 대상을 신고하셨습니다.",
+    # 하루 동안 신고한 건수가 DAILY_REPORT_LIMIT 이상
+    'daily': "오늘 신고 가능한 횟수를 초과하였습니다. 내일 다시 시도해 주세요.",
+    # 동일 대상이 최근 24시간 내에 TARGET_REPORT_THRESHOLD 이상 신고됨
+    'target': "해당 대상은 이미 다수 신고되어 관리자의 검토가 진행 중입니다.",
+}
 
 def file_report(reporter_id, target_id, reason):
     reporter_id = sanitize_input(reporter_id)
@@ -214,58 +317,56 @@ def file_report(reporter_id, target_id, reason):
     if len(reason) > MAX_REASON_LENGTH:
         return None, f"신고 사유의 길이는 최대 {MAX_REASON_LENGTH}자까지 허용됩니다."
 
-    now = datetime.utcnow()
-    since_time = (now - SAME_TARGET_INTERVAL).strftime('%Y-%m-%d %H:%M:%S')
-
-    # 3. 동일 대상 신고 제한: 지난 24시간 동안 동일 대상을 신고한 적이 있는지 확인
-    existing_reports = repository.get_reports_by_reporter_target(reporter_id, target_id, since_time)
-    if existing_reports:
-        return None, "이미 최근에 이 대상을 신고하셨습니다."
-
-    # 4. 신고 건수 제한: 하루 동안 신고한 건수가 DAILY_REPORT_LIMIT 이상이면 차단
-    start_of_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).strftime('%Y-%m-%d %H:%M:%S')
-    daily_count = repository.get_daily_report_count(reporter_id, start_of_day)
-    if daily_count >= DAILY_REPORT_LIMIT:
-        return None, "오늘 신고 가능한 횟수를 초과하였습니다. 내일 다시 시도해 주세요."
-
-    # 5. 대상 신고 누적 제한: 동일 대상이 최근 24시간 내에 TARGET_REPORT_THRESHOLD 이상 신고되었다면 차단
-    target_reports = repository.get_report_count_for_target(target_id, since_time)
-    if target_reports >= TARGET_REPORT_THRESHOLD:
-        return None, "해당 대상은 이미 다수 신고되어 관리자의 검토가 진행 중입니다."
-
-    # 모든 검증 통과 시 신고 생성
-    report_id = repository.create_report(reporter_id, target_id, reason)
+    # 3~5. 동일 대상 재신고, 하루 신고 건수, 대상 누적 신고 제한은 신고 저장과 같은 트랜잭션에서 검사
+    try:
+        report_id = repository.create_report(reporter_id, target_id, reason, REPORT_LIMITS)
+    except repository.ReportLimitExceeded as exc:
+        return None, REPORT_LIMIT_MESSAGES[exc.kind]
     return report_id, None
 
 # === 채팅 관련 서비스 ===
+def check_chat_message(message):
+    """채팅 메시지 검증 (ASGI 모드의 비동기 핸들러와 공유). 문제가 없으면 None 반환"""
+    if not message:
+        return "빈 메시지"
+    if len(message) > 500:
+        return "메시지는 500자 이내로 작성해 주세요."
+    return None
+
 def save_chat_message(sender_id, recipient_id, message):
     sender_id = sanitize_input(sender_id)
     recipient_id = sanitize_input(recipient_id)
     message = sanitize_input(message)
     
-    if not message:
-        return None, "빈 메시지"
-    if len(message) > 500:
-        return None, "메시지는 500자 이내로 작성해 주세요."
+    error_message = check_chat_message(message)
+    if error_message:
+        return None, error_message
     
-    return repository.create_chat_message(sender_id, recipient_id, message), None
+    return repository.create_chat_message(sender_id, recipient_id, message)['message'], None
 
 def save_global_chat_message(sender_id, message):
+    """
+    전역 채팅 메시지 저장 (recipient_id는 'global').
+    저장한 메시지(username 포함)를 최근 메시지 버퍼에 추가하고 반환합니다.
+    """
     sender_id = sanitize_input(sender_id)
     message = sanitize_input(message)
     
-    if not message:
-        return None, "빈 메시지"
-    if len(message) > 500:
-        return None, "메시지는 500자 이내로 작성해 주세요."
+    error_message = check_chat_message(message)
+    if error_message:
+        return None, error_message
     
-    """전역 채팅 메시지 저장 (recipient_id는 'global')"""
-    return repository.create_global_chat_message(sender_id, message), None
+    entry = repository.create_global_chat_message(sender_id, message)
+    sender = repository.get_user_by_id(sender_id)
+    entry['username'] = sender.username if sender else sender_id
+    recent_chats.global_chats.append(entry)
+    return entry, None
 
 def get_global_chats(limit=50):
+    """최근 전역 메시지를 오래된 순으로 반환합니다. (DB 대신 최근 메시지 버퍼에서 읽음)"""
     limit = safe_int(limit, use_abort=True)
     
-    return repository.get_global_chat_history(limit)
+    return recent_chats.global_chats.latest(limit)
 
 def get_private_chats(user1, user2, limit=50):
     user1 = sanitize_input(user1)
@@ -274,7 +375,60 @@ def get_private_chats(user1, user2, limit=50):
     
     return repository.get_private_chat_history(user1, user2, limit)
 
+CHAT_HISTORY_MAX_LIMIT = 100
+
+def get_chat_history(user_id, other_id=None, cursor=None, limit=50):
+    """
+    커서 기반 채팅 내역 조회 (최신순). other_id가 없으면 전역 채팅입니다.
+    보관 기간이 지나 보관 파일로 옮겨진 메시지도 이어서 조회됩니다.
+    """
+    user_id = sanitize_input(user_id)
+    other_id = sanitize_input(other_id) or None
+    limit = min(max(safe_int(limit, use_abort=True), 1), CHAT_HISTORY_MAX_LIMIT)
+    before = None
+    if cursor:
+        values = decode_cursor(sanitize_input(cursor))
+        if not values or len(values) != 2 or not all(isinstance(value, str) for value in values):
+            return None, "잘못된 커서입니다."
+        before = tuple(values)
+
+    messages = None
+    if other_id is None and before is None:
+        # 전역 채팅 첫 페이지는 최근 메시지 버퍼에서 읽음
+        messages = recent_chats.global_chats.page(limit)
+    if messages is None:
+        messages = chat_archive.get_history_page(user_id if other_id else None, other_id, before, limit)
+    # 보낸 사람 이름은 메시지마다 조회하지 않고 한 번에 조회 (버퍼의 메시지는 이미 username이 있음)
+    usernames = repository.get_usernames_by_ids(
+        message['sender_id'] for message in messages if 'username' not in message
+    )
+    next_cursor = None
+    if len(messages) == limit:
+        next_cursor = encode_cursor(messages[-1]['cursor_timestamp'], messages[-1]['id'])
+    return {
+        'messages': [{
+            'id': message['id'],
+            'sender_id': message['sender_id'],
+            'username': message.get('username') or usernames.get(message['sender_id'], message['sender_id']),
+            'message': message['message'],
+            'timestamp': message['timestamp'],
+        } for message in messages],
+        'next_cursor': next_cursor,
+    }, None
+
 # === 지갑 관련 서비스 ===
+TRANSFER_WINDOW = timedelta(minutes=10)   # 송금 속도 검사 기간
+MAX_TRANSFERS_PER_WINDOW = 20             # 기간 내 최대 송금 수
+SMALL_TRANSFER_AMOUNT = 1000              # 소액 송금 기준 금액 (이하)
+MAX_SMALL_TRANSFERS_TO_RECIPIENT = 5      # 기간 내 같은 사용자에게 보낼 수 있는 최대 소액 송금 수
+TRANSFER_LIMITS = fraud.TransferLimits(
+    TRANSFER_WINDOW, MAX_TRANSFERS_PER_WINDOW, SMALL_TRANSFER_AMOUNT, MAX_SMALL_TRANSFERS_TO_RECIPIENT
+)
+TRANSFER_LIMIT_MESSAGES = {
+    'transfers': "짧은 시간에 송금이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+    'small_transfers': "같은 사용자에게 소액 송금을 반복할 수 없습니다. 잠시 후 다시 시도해 주세요.",
+}
+
 def record_wallet_transaction(sender_id, recipient_id, amount, transaction_type):
     sender_id = sanitize_input(sender_id)   # 보낸 사용자 ID를 문자열로 변환
     recipient_id = sanitize_input(recipient_id)   # 받는 사용
@@ -301,9 +455,17 @@ def transfer_funds(sender_id, recipient_id, amount):
         return False, "잔액이 부족합니다."
     if amount <= 0:
         return False, "송금 금액은 0보다 커야 합니다."
+    # 송금 속도 검사 (프로세스 내 최근 송금 기록으로 DB 조회 없이 검사하고, 통과하면 기록)
+    exceeded = fraud.transfer_windows.admit(sender_id, recipient_id, amount, TRANSFER_LIMITS)
+    if exceeded:
+        return False, TRANSFER_LIMIT_MESSAGES[exceeded]
     
-    # 잔액 업데이트
-    repository.transfer_wallet(sender_id, recipient_id, amount)
+    # 잔액 업데이트 (실패하면 송금 속도 기록도 취소)
+    try:
+        repository.transfer_wallet(sender_id, recipient_id, amount)
+    except Exception:
+        fraud.transfer_windows.release(sender_id, recipient_id, amount, TRANSFER_LIMITS)
+        raise
     
     # 거래 내역 기록 (이체: sender와 recipient 모두 기록됨)
     record_wallet_transaction(sender_id, recipient_id, amount, "transfer")
@@ -1,7 +1,16 @@
 import html
 import re
+import json
+import time
+import uuid
+import base64
+import binascii
+import secrets
 from flask import abort
 
+# 태그 제거용 정규식 (호출마다 컴파일하지 않도록 미리 컴파일)
+TAG_PATTERN = re.compile(r'<.*?>')
+
 def safe_str(target):
     return f'{target}' if target else ''
 
@@ -17,7 +26,7 @@ def sanitize_input(text):
         return ""
 
     # 1. 모든 태그 제거 (기본 필터링이 필요할 경우)
-    tag_stripped = re.sub(r'<.*?>', '', text)
+    tag_stripped = TAG_PATTERN.sub('', text)
 
     # 2. HTML 엔티티 이스케이프 (가장 안전한 처리)
     escaped = html.escape(tag_stripped)
@@ -31,4 +40,52 @@ def safe_int(target, use_abort=False):
     except (ValueError, TypeError):
         if use_abort:
             abort(400)
-        return 0
\ No newline at end of file
+        return 0
+
+# === 식별자 ===
+
+def new_id():
+    """
+    시간순으로 증가하는 UUIDv7 문자열을 생성합니다.
+    앞 48비트가 밀리초 단위 생성 시각이므로 새 행이 기본 키 B-tree의 끝에 모여 삽입됩니다.
+    (무작위 uuid4는 삽입 위치가 트리 전체에 흩어짐) 형식은 uuid4와 같아 기존 id와 섞여도 됩니다.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                     # version 7
+    value |= secrets.randbits(12) << 64
+    value |= 0b10 << 62                    # RFC 4122 variant
+    value |= secrets.randbits(62)
+    return str(uuid.UUID(int=value))
+
+# === 페이지네이션 커서 ===
+
+def encode_cursor(*values):
+    """키셋 페이지네이션 위치(예: timestamp, id)를 URL에 안전한 불투명 문자열로 인코딩합니다."""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """encode_cursor로 만든 문자열을 값 목록으로 되돌립니다. 형식이 잘못되면 None을 반환합니다."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+# === 필드 선택 ===
+
+def parse_fields(value, allowed):
+    """
+    'id,title,price' 형식의 필드 목록을 검증해 튜플로 반환합니다.
+    비어 있으면 allowed 전체, 허용하지 않는 필드가 있으면 None을 반환합니다.
+    """
+    if not value:
+        return tuple(allowed)
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields or any(field not in allowed for field in fields):
+        return None
+    return fields
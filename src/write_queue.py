@@ -0,0 +1,124 @@
+# write_queue.py
+"""
+쓰기 작업 묶음 커밋(group commit).
+
+repository의 쓰기 함수는 작업(session을 받아 변경을 적용하는 함수)을 DB별 큐에 넣고,
+DB마다 하나인 writer 스레드가 그동안 쌓인 작업을 최대 max_batch개씩 한 트랜잭션으로 커밋합니다.
+커밋(fsync)이 작업마다가 아니라 묶음마다 한 번 일어나므로 동시에 들어오는 쓰기가 많을수록
+묶음이 커지고 처리량이 늘어납니다. (쓰기가 드물면 묶음은 작업 하나이며 지금과 같음)
+
+호출한 쪽은 Future로 커밋 완료(또는 예외)를 기다리거나, 기다리지 않고 넘어갈 수 있습니다.
+eventlet 환경에서도 writer 스레드, 큐, Future의 잠금은 monkey patch되지 않은 원래 threading/queue를 사용합니다.
+(커밋이 허브를 막지 않도록 하며, 기다리는 쪽도 db_offload의 tpool 스레드에서 기다려야 합니다)
+"""
+import logging
+from concurrent.futures import Future
+
+try:
+    from eventlet import patcher
+    _native_threading = patcher.original('threading')
+    _native_queue = patcher.original('queue')
+except ImportError:  # eventlet은 선택 의존성
+    import threading as _native_threading
+    import queue as _native_queue
+
+logger = logging.getLogger(__name__)
+
+# 한 트랜잭션으로 커밋할 최대 작업 수
+DEFAULT_MAX_BATCH = 64
+
+
+def native_lock():
+    """writer/tpool 스레드가 함께 쓰는 자료용 잠금 (green 잠금을 네이티브 스레드가 기다리면 멈추므로)"""
+    return _native_threading.Lock()
+
+
+class _NativeFuture(Future):
+    """네이티브 Condition으로 완료를 알리는 Future (green Condition은 네이티브 스레드 사이에서 깨어나지 않음)"""
+
+    def __init__(self):
+        super().__init__()
+        self._condition = _native_threading.Condition()
+
+
+class WriteQueue:
+    """
+    session_factory로 만든 세션에서 작업을 순서대로 실행하고 묶음 단위로 커밋합니다.
+    한 작업이 예외를 내면 그 작업만 예외로 끝내고, 나머지 작업은 새 트랜잭션에서 다시 실행합니다.
+    """
+
+    def __init__(self, session_factory, max_batch=DEFAULT_MAX_BATCH, name='write-queue'):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.queue = _native_queue.Queue()
+        self.thread = _native_threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, operation, args=()):
+        """operation(session, *args)를 큐에 넣고 커밋 후 결과를 담을 Future를 반환합니다."""
+        future = _NativeFuture()
+        self.queue.put((operation, args, future))
+        return future
+
+    def close(self):
+        """큐에 남은 작업을 모두 커밋한 뒤 writer 스레드를 종료합니다."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _next_batch(self):
+        # 첫 작업은 기다리고, 그동안 쌓인 작업은 기다리지 않고 가져옴
+        batch = [self.queue.get()]
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except _native_queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        while batch:
+            session = self.session_factory()
+            results = []
+            failed, error = None, None
+            try:
+                for index, (operation, args, future) in enumerate(batch):
+                    try:
+                        results.append(operation(session, *args))
+                        # 제약 조건 위반 등을 해당 작업의 예외로 돌려주도록 작업마다 반영
+                        session.flush()
+                    except Exception as exc:
+                        failed, error = index, exc
+                        break
+                if failed is None:
+                    session.commit()
+            except Exception as exc:
+                # 커밋 실패는 묶음 전체의 실패
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                return
+            finally:
+                session.close()
+            if failed is None:
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+                return
+            batch[failed][2].set_exception(error)
+            batch = batch[:failed] + batch[failed + 1:]
+
+
+def log_failure(future):
+    """기다리지 않은(fire-and-forget) 작업의 실패를 기록합니다. (Future.add_done_callback용)"""
+    error = future.exception()
+    if error is not None:
+        logger.error("Queued write failed", exc_info=error)